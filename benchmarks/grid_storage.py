@@ -0,0 +1,55 @@
+# grid_storage.py
+"""
+Compares construction time and memory of the ``Cell`` backed :class:`Grid` against :class:`ArrayGrid` and
+:class:`ImplicitGrid`.
+
+All grids are built fully 4-connected with ``connect_neighbours`` so the numbers include the topology.
+
+Run from the repository root::
+
+    python -m benchmarks.grid_storage 100 500 1000
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+from src.array_grid import ArrayGrid
+from src.implicit_grid import ImplicitGrid
+from src.grid import Grid
+
+
+def build(grid_cls, size):
+    grid = grid_cls(size, size)
+    grid.connect_neighbours()
+    return grid
+
+
+def measure(grid_cls, size):
+    # Timed without tracemalloc, which slows allocation-heavy code down several times
+    gc.collect()
+    start = time.perf_counter()
+    grid = build(grid_cls, size)
+    elapsed = time.perf_counter() - start
+    del grid
+    gc.collect()
+
+    tracemalloc.start()
+    grid = build(grid_cls, size)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del grid
+    gc.collect()
+    return elapsed, memory
+
+
+def main(sizes):
+    print(f"{'size':>11} | {'backend':>12} | {'build (s)':>9} | {'memory (MB)':>11}")
+    for size in sizes:
+        for grid_cls in (Grid, ArrayGrid, ImplicitGrid):
+            elapsed, memory = measure(grid_cls, size)
+            print(f"{size:>5}x{size:<5} | {grid_cls.__name__:>12} | {elapsed:>9.3f} | {memory / 2 ** 20:>11.1f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [100, 500, 1000])
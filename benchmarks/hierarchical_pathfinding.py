@@ -0,0 +1,101 @@
+# hierarchical_pathfinding.py
+"""
+Compares flat A* with :class:`HierarchicalPathfinding` on long trips across warehouse-sized floors.
+
+Each map is an :class:`ImplicitGrid` with a seeded 10% of cells blocked and a wall every ten rows, each with two gaps.
+Queries run between random open cells at least half the map apart. Both searches start cold (no path cache, no intra-cluster distances). The hierarchy is
+then queried again warm, and finally one connection is removed to time the incremental update.
+
+Run from the repository root::
+
+    python -m benchmarks.hierarchical_pathfinding 250 500 1000
+"""
+import sys
+import time
+
+import numpy as np
+
+from src.grid import NEIGHBOUR_OFFSETS
+from src.hierarchical_pathfinding import HierarchicalPathfinding
+from src.implicit_grid import ImplicitGrid
+from src.pathfinding import Pathfinding
+
+
+def obstacle_map(size, density=0.1, wall_spacing=10, seed=0):
+    rng = np.random.default_rng(seed)
+    blocked = (rng.random((size, size)) < density)
+    # Long walls with two random gaps each force detours that a Manhattan heuristic does not foresee
+    for y in range(wall_spacing // 2, size, wall_spacing):
+        blocked[y] = True
+        blocked[y - 1:y + 2, rng.integers(0, size, 2)] = False
+    weights = np.ones((len(NEIGHBOUR_OFFSETS), size, size), dtype=np.float32)
+    for direction, (dx, dy) in enumerate(NEIGHBOUR_OFFSETS):
+        target_blocked = np.ones((size, size), dtype=bool)
+        target_blocked[max(0, -dy):size - max(0, dy), max(0, -dx):size - max(0, dx)] = \
+            blocked[max(0, dy):size - max(0, -dy), max(0, dx):size - max(0, -dx)]
+        weights[direction][blocked | target_blocked] = np.inf
+    grid = ImplicitGrid(size, size, weights=weights.reshape(len(NEIGHBOUR_OFFSETS), -1))
+    return grid, np.flatnonzero(~blocked.ravel())
+
+
+def queries(size, open_cells, count, seed=0):
+    rng = np.random.default_rng(seed)
+    pairs = []
+    while len(pairs) < count:
+        start, destination = rng.choice(open_cells, 2).tolist()
+        if abs(start % size - destination % size) + abs(start // size - destination // size) >= size // 2:
+            pairs.append((start, destination))
+    return pairs
+
+
+def timed(search, pairs):
+    start = time.perf_counter()
+    expanded = 0
+    lengths = []
+    for pair in pairs:
+        path, count = search(*pair)
+        expanded += count
+        lengths.append(len(path))
+    return (time.perf_counter() - start) / len(pairs), expanded / len(pairs), lengths
+
+
+def main(sizes, count=5, cluster_size=16):
+    print(f"{'size':>9} | {'A* (s)':>7} | {'A* expanded':>11} | {'HPA* build (s)':>14} | {'cold (s)':>8} | "
+          f"{'warm (s)':>8} | {'HPA* expanded':>13} | {'longer':>6} | {'update (ms)':>11}")
+    for size in sizes:
+        grid, open_cells = obstacle_map(size)
+        pairs = queries(size, open_cells, count)
+        pathfinding = Pathfinding(grid)
+
+        def flat(start, destination):
+            path = pathfinding.a_star_ids(start, destination, use_cache=False)
+            return path, pathfinding.expanded
+
+        started = time.perf_counter()
+        hierarchy = HierarchicalPathfinding(grid, cluster_size)
+        build = time.perf_counter() - started
+
+        def hierarchical(start, destination):
+            path = hierarchy.find_path(start, destination)
+            return path, hierarchy.expanded
+
+        flat_time, flat_expanded, flat_lengths = timed(flat, pairs)
+        cold_time, _, lengths = timed(hierarchical, pairs)
+        warm_time, warm_expanded, _ = timed(hierarchical, pairs)
+        longer = np.mean([length / flat_length - 1 for length, flat_length in zip(lengths, flat_lengths)
+                          if flat_length])
+
+        cell = int(open_cells[len(open_cells) // 2])
+        neighbour, _ = grid.neighbour_ids(cell)[0]
+        started = time.perf_counter()
+        grid.set_edge_weight(cell, neighbour, np.inf)
+        hierarchy.update()
+        update = time.perf_counter() - started
+
+        print(f"{size:>4}x{size:<4} | {flat_time:>7.3f} | {flat_expanded:>11,.0f} | {build:>14.3f} | "
+              f"{cold_time:>8.3f} | {warm_time:>8.3f} | {warm_expanded:>13,.0f} | {longer:>6.1%} | "
+              f"{update * 1000:>11.2f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [250, 500, 1000])
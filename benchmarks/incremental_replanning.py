@@ -0,0 +1,74 @@
+# incremental_replanning.py
+"""
+Compares repairing a leg with :class:`DStarLite` against planning it again from scratch after the route is cut.
+
+For each query on the obstacle maps of :mod:`benchmarks.hierarchical_pathfinding`, a robot walks a quarter of its
+path. Then the next cells ahead are closed, and the leg is repaired from the robot's new position. The same leg is
+also planned with a fresh A* and a fresh D* Lite. ``states`` is the peak number of cells the search keeps state for.
+
+Run from the repository root::
+
+    python -m benchmarks.incremental_replanning 250 500 1000
+"""
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.hierarchical_pathfinding import obstacle_map, queries
+from src.incremental_replanning import DStarLite
+from src.pathfinding import Pathfinding
+
+
+def close_cell(grid, cell_id):
+    changed = [cell_id]
+    for neighbour, _ in grid.neighbour_ids(cell_id):
+        grid.set_edge_weight(cell_id, neighbour, np.inf)
+        grid.set_edge_weight(neighbour, cell_id, np.inf)
+        changed.append(neighbour)
+    return changed
+
+
+def main(sizes, count=5, closed=3):
+    print(f"{'size':>9} | {'D* Lite (s)':>11} | {'states':>9} | {'repair (s)':>10} | {'repair expanded':>15} | "
+          f"{'A* (s)':>7} | {'A* expanded':>11} | {'D* Lite expanded':>16}")
+    for size in sizes:
+        grid, open_cells = obstacle_map(size)
+        pathfinding = Pathfinding(grid)
+        initial = repair = a_star = 0.0
+        repair_expanded = a_star_expanded = fresh_expanded = states = 0
+        for start, destination in queries(size, open_cells, count):
+            started = time.perf_counter()
+            search = DStarLite(grid, start, destination)
+            search.compute()
+            path = search.path()
+            initial += time.perf_counter() - started
+
+            position = path[len(path) // 4]
+            changed = []
+            for cell_id in path[len(path) // 4 + 2:len(path) // 4 + 2 + closed]:
+                changed.extend(close_cell(grid, cell_id))
+            started = time.perf_counter()
+            search.move_to(position)
+            search.update(changed)
+            search.compute()
+            search.path()
+            repair += time.perf_counter() - started
+            repair_expanded += search.expanded
+            states = max(states, len(search.rhs))
+
+            started = time.perf_counter()
+            pathfinding.a_star_ids(position, destination, use_cache=False)
+            a_star += time.perf_counter() - started
+            a_star_expanded += pathfinding.expanded
+            fresh = DStarLite(grid, position, destination)
+            fresh.compute()
+            fresh_expanded += fresh.expanded
+
+        print(f"{size:>4}x{size:<4} | {initial / count:>11.3f} | {states:>9,} | {repair / count:>10.3f} | "
+              f"{repair_expanded / count:>15,.0f} | {a_star / count:>7.3f} | {a_star_expanded / count:>11,.0f} | "
+              f"{fresh_expanded / count:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [250, 500, 1000])
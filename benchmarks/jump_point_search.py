@@ -0,0 +1,56 @@
+# jump_point_search.py
+"""
+Compares A* with Jump Point Search and JPS+ on uniform-cost warehouse floors.
+
+Each size runs on an open :class:`ImplicitGrid` and on one with a seeded 10% of cells blocked and a wall every ten
+rows (see :mod:`benchmarks.hierarchical_pathfinding`). Queries run between random open cells at least half the map
+apart, without the path cache. The JPS+ column includes building its jump distance table once.
+
+Run from the repository root::
+
+    python -m benchmarks.jump_point_search 250 500 1000
+"""
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.hierarchical_pathfinding import obstacle_map, queries, timed
+from src.implicit_grid import ImplicitGrid
+from src.jump_point_search import JumpPointSearch
+from src.pathfinding import Pathfinding
+
+
+def main(sizes, count=5):
+    print(f"{'size':>9} | {'map':>9} | {'A* (s)':>7} | {'A* expanded':>11} | {'JPS (s)':>7} | "
+          f"{'JPS expanded':>12} | {'JPS+ table (s)':>14} | {'JPS+ (s)':>8}")
+    for size in sizes:
+        open_grid = ImplicitGrid(size, size)
+        open_grid.connect_neighbours()
+        maps = [("open", open_grid, np.arange(size * size)), ("obstacles", *obstacle_map(size))]
+        for name, grid, open_cells in maps:
+            pairs = queries(size, open_cells, count)
+            pathfinding = Pathfinding(grid)
+            search = JumpPointSearch.for_grid(grid)
+
+            def flat(start, destination):
+                return pathfinding.a_star_ids(start, destination, use_cache=False), pathfinding.expanded
+
+            def jump(start, destination, plus=False):
+                return search.search(start, destination, plus), search.expanded
+
+            a_star_time, a_star_expanded, a_star_lengths = timed(flat, pairs)
+            jps_time, jps_expanded, lengths = timed(jump, pairs)
+            assert lengths == a_star_lengths
+            started = time.perf_counter()
+            search.precompute()
+            table = time.perf_counter() - started
+            plus_time, _, lengths = timed(lambda start, destination: jump(start, destination, True), pairs)
+            assert lengths == a_star_lengths
+
+            print(f"{size:>4}x{size:<4} | {name:>9} | {a_star_time:>7.3f} | {a_star_expanded:>11,.0f} | "
+                  f"{jps_time:>7.3f} | {jps_expanded:>12,.0f} | {table:>14.3f} | {plus_time:>8.3f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [250, 500, 1000])
@@ -0,0 +1,60 @@
+# metrics.py
+"""
+Measures what :meth:`FleetMetrics.record` adds to a simulation tick, by fleet size.
+
+Each run places the robots, 10 packages per robot and 8 goals at seeded random cells of an open 100x100 grid, and
+runs 100 ticks. Then ``record`` is timed on its own over the same fleet.
+
+Run from the repository root::
+
+    python -m benchmarks.metrics 50 200 800
+"""
+import random
+import sys
+import time
+
+from src.goal import Goal
+from src.grid import Grid
+from src.package import Package
+from src.position import Position
+from src.robot import Robot
+from src.sim import Simulation
+
+
+def scenario(robots, size=100, seed=0):
+    rng = random.Random(seed)
+    grid = Grid(size, size)
+    grid.connect_neighbours()
+    cells = [Position(x, y) for y in range(size) for x in range(size)]
+    for goal_id, position in enumerate(rng.sample(cells, 8)):
+        grid.add_goal(position, Goal(goal_id, position))
+    for robot_id, position in enumerate(rng.sample(cells, robots)):
+        grid.add_robot(position, Robot(robot_id, position))
+    for package_id in range(10 * robots):
+        position = rng.choice(cells)
+        grid.add_package(position, Package(package_id, position))
+    return grid
+
+
+def main(fleets, ticks=100):
+    print(f"{'robots':>6} | {'tick (ms)':>9} | {'record (ms)':>11} | {'share':>6} | {'utilization':>11} | "
+          f"{'throughput':>10} | {'wait p50':>8} | {'wait p90':>8}")
+    for robots in fleets:
+        simulation = Simulation(scenario(robots))
+        summary = simulation.run(ticks, seed=0)
+        tick = 1 / summary["ticks_per_second"]
+        metrics = simulation.metrics
+        utilization, throughput = metrics.utilization(), metrics.throughput()
+        p50, p90 = metrics.wait_percentiles((50, 90))
+
+        started = time.perf_counter()
+        for _ in range(ticks):
+            metrics.record()
+        record = (time.perf_counter() - started) / ticks
+
+        print(f"{robots:>6} | {tick * 1000:>9.2f} | {record * 1000:>11.3f} | {record / tick:>6.1%} | "
+              f"{utilization:>11.2f} | {throughput:>10.2f} | {p50:>8.0f} | {p90:>8.0f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [50, 200, 800])
@@ -0,0 +1,52 @@
+# order_stream.py
+"""
+Runs an :class:`OrderStream` into a generated 100x100 warehouse with 50 robots, starting with no packages, for a
+range of mean arrival rates (orders per tick).
+
+Each rate is run with Poisson arrivals and with bursty arrivals of the same mean: half the rate between bursts and
+six times the rate during bursts, which last 20 ticks every 200 on average. At most ``MAX_OUTSTANDING`` released
+orders await delivery and the backlog holds ``CAPACITY`` orders. Throughput is over the second half of the run,
+the other columns over the whole run.
+
+Run from the repository root::
+
+    python -m benchmarks.order_stream 0.2 0.5 1 2
+"""
+import sys
+
+from src.map_format import grid_from_map_data
+from src.map_generator.warehouse import generate_warehouse
+from src.order_stream import BurstyArrivals, OrderStream, PoissonArrivals
+from src.sim import Simulation
+
+SIZE = 100
+ROBOTS = 50
+TICKS = 2000
+CAPACITY = 500
+MAX_OUTSTANDING = 150
+
+
+def run(arrivals, seed=0):
+    layout = generate_warehouse(SIZE, SIZE, seed=seed, robots=ROBOTS, packages_per_robot=0)
+    grid = grid_from_map_data(layout)
+    stream = OrderStream(grid, arrivals, origins=layout.faces.nonzero()[0], capacity=CAPACITY,
+                         max_outstanding=MAX_OUTSTANDING, seed=seed)
+    simulation = Simulation(grid, orders=stream)
+    simulation.run(TICKS // 2, seed=seed)
+    summary = simulation.run(TICKS - TICKS // 2, seed=seed)
+    return summary["orders"], summary["ticks_per_second"]
+
+
+def main(rates):
+    print(f"{'rate':>5} | {'arrivals':>8} | {'delivered/tick':>14} | {'mean backlog':>12} | {'rejected':>8} | "
+          f"{'p50':>5} | {'p90':>5} | {'p99':>5} | {'ticks/s':>7}")
+    for rate in rates:
+        for name, arrivals in (("poisson", PoissonArrivals(rate)), ("bursty", BurstyArrivals(rate / 2, rate * 6))):
+            orders, ticks_per_second = run(arrivals)
+            print(f"{rate:>5} | {name:>8} | {orders['throughput']:>14.3f} | {orders['mean_backlog']:>12.1f} | "
+                  f"{orders['rejected']:>8} | {orders['latency_p50']:>5.0f} | {orders['latency_p90']:>5.0f} | "
+                  f"{orders['latency_p99']:>5.0f} | {ticks_per_second:>7.0f}")
+
+
+if __name__ == "__main__":
+    main([float(arg) for arg in sys.argv[1:]] or [0.2, 0.5, 1.0, 2.0])
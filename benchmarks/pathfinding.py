@@ -0,0 +1,79 @@
+# pathfinding.py
+"""
+Micro-benchmark of ``Pathfinding.a_star_ids`` reporting node expansions per second.
+
+Maps:
+  * open: fully 4-connected floor, queries between opposite corners.
+  * maze: perfect maze carved with a seeded randomized depth-first search, wall cells disconnected.
+
+Run from the repository root::
+
+    python -m benchmarks.pathfinding
+"""
+import random
+import time
+
+from src.array_grid import ArrayGrid
+from src.grid import Grid, NEIGHBOUR_OFFSETS
+from src.implicit_grid import ImplicitGrid
+from src.pathfinding import Pathfinding
+from src.position import Position
+
+
+def open_map(grid_cls, size):
+    grid = grid_cls(size, size)
+    grid.connect_neighbours()
+    return grid, [(0, size * size - 1), (size - 1, size * (size - 1))]
+
+
+def maze_map(grid_cls, size, seed=0):
+    # Rooms sit on even coordinates; carving removes the wall cell between two rooms
+    rng = random.Random(seed)
+    grid = grid_cls(size, size)
+    open_cells = {(0, 0)}
+    stack = [(0, 0)]
+    while stack:
+        x, y = stack[-1]
+        candidates = [(x + 2 * dx, y + 2 * dy) for dx, dy in NEIGHBOUR_OFFSETS
+                      if 0 <= x + 2 * dx < size and 0 <= y + 2 * dy < size and (x + 2 * dx, y + 2 * dy) not in open_cells]
+        if not candidates:
+            stack.pop()
+            continue
+        nx, ny = rng.choice(candidates)
+        open_cells.update({((x + nx) // 2, (y + ny) // 2), (nx, ny)})
+        stack.append((nx, ny))
+
+    for x, y in open_cells:
+        cell = grid.get_cell(Position(x, y))
+        for dx, dy in NEIGHBOUR_OFFSETS:
+            if (x + dx, y + dy) in open_cells:
+                cell.add_connection(grid.get_cell(Position(x + dx, y + dy)))
+
+    last = size - 1 if size % 2 else size - 2
+    return grid, [(0, last * size + last), (last, last * size)]
+
+
+def run(grid, queries, repeat):
+    pathfinding = Pathfinding(grid)
+    expanded = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for source, destination in queries:
+            pathfinding.a_star_ids(source, destination, use_cache=False)
+            expanded += pathfinding.expanded
+    elapsed = time.perf_counter() - start
+    return len(queries) * repeat / elapsed, expanded / elapsed
+
+
+def main(size=200, repeat=3):
+    print(f"{'map':>12} | {'backend':>12} | {'queries/s':>9} | {'expansions/s':>12}")
+    for name, build in (("open", open_map), ("maze", maze_map)):
+        for grid_cls in (Grid, ArrayGrid, ImplicitGrid):
+            grid, queries = build(grid_cls, size)
+            queries_per_second, expansions_per_second = run(grid, queries, repeat)
+            print(f"{name} {size}x{size}".rjust(12) +
+                  f" | {grid_cls.__name__:>12} | {queries_per_second:>9.1f} | {expansions_per_second:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
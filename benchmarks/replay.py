@@ -0,0 +1,62 @@
+# replay.py
+"""
+Measures the cost of recording a trace with :class:`TraceRecorder`, and of seeking in it with :class:`TracePlayer`.
+
+The scenarios are the ones of :mod:`benchmarks.metrics`. Each fleet runs 200 traced ticks, timing the calls to
+``record`` within them. Then 100 random seeks are timed.
+
+Run from the repository root::
+
+    python -m benchmarks.replay 50 200 800
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.metrics import scenario
+from src.replay import TracePlayer
+from src.sim import Simulation
+
+
+def main(fleets, ticks=200, seeks=100):
+    print(f"{'robots':>6} | {'tick (ms)':>9} | {'record (ms)':>11} | {'share':>6} | {'bytes/tick':>10} | "
+          f"{'open (ms)':>9} | {'seek (ms)':>9}")
+    handle, path = tempfile.mkstemp(suffix=".trace")
+    os.close(handle)
+    try:
+        for robots in fleets:
+            simulation = Simulation(scenario(robots), trace=path)
+            record = simulation.trace.record
+            spent = [0.0]
+
+            def timed_record(tick):
+                started = time.perf_counter()
+                record(tick)
+                spent[0] += time.perf_counter() - started
+
+            simulation.trace.record = timed_record
+            tick = 1 / simulation.run(ticks, seed=0)["ticks_per_second"]
+            simulation.trace.close()
+            recording = spent[0] / ticks
+
+            started = time.perf_counter()
+            player = TracePlayer(path)
+            opened = time.perf_counter() - started
+            rng = random.Random(0)
+            started = time.perf_counter()
+            for _ in range(seeks):
+                player.seek(rng.randrange(ticks + 1))
+            seek = (time.perf_counter() - started) / seeks
+            player.close()
+
+            print(f"{robots:>6} | {tick * 1000:>9.2f} | {recording * 1000:>11.3f} | "
+                  f"{recording / tick:>6.1%} | {os.path.getsize(path) / ticks:>10,.0f} | "
+                  f"{opened * 1000:>9.2f} | {seek * 1000:>9.2f}")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [50, 200, 800])
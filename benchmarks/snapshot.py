@@ -0,0 +1,69 @@
+# snapshot.py
+"""
+Measures :meth:`Simulation.snapshot`, :meth:`Simulation.restore` and :meth:`Simulation.fork` against deep-copying
+the grid's object graph, by fleet size.
+
+The scenarios are the ones of :mod:`benchmarks.metrics`, run for 50 ticks before the snapshot. The deep copy is of
+the ``Cell`` backed grid with its adjacency cache emptied, since the cached memoryviews cannot be copied. Copying
+the graph of cells and connections recurses once per cell along a chain of neighbours, so it runs in a thread with a
+large stack. Sizes are of the pickled snapshot and of the pickled grid.
+
+Run from the repository root::
+
+    python -m benchmarks.snapshot 50 200 800
+"""
+import copy
+import pickle
+import sys
+import threading
+import time
+
+from benchmarks.metrics import scenario
+from src.sim import Simulation
+
+
+def timed(function, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def deep(function):
+    # Runs ``function`` with room for the recursion of copying or pickling a graph of cells
+    result = []
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(10 ** 6)
+    threading.stack_size(1 << 30)
+    try:
+        thread = threading.Thread(target=lambda: result.append(function()))
+        thread.start()
+        thread.join()
+    finally:
+        threading.stack_size(0)
+        sys.setrecursionlimit(limit)
+    return result[0]
+
+
+def main(fleets, ticks=50):
+    print(f"{'robots':>6} | {'snapshot (ms)':>13} | {'restore (ms)':>12} | {'fork (ms)':>9} | "
+          f"{'deepcopy (ms)':>13} | {'snapshot (KB)':>13} | {'grid (KB)':>9}")
+    for robots in fleets:
+        simulation = Simulation(scenario(robots))
+        simulation.run(ticks, seed=0)
+        snapshot_time, snapshot = timed(simulation.snapshot)
+        restore_time, _ = timed(lambda: simulation.restore(snapshot))
+        fork_time, _ = timed(lambda: simulation.fork(snapshot))
+
+        simulation.grid.adjacency_cache.clear()
+        copy_time, _ = deep(lambda: timed(lambda: copy.deepcopy(simulation.grid), repeat=1))
+        grid_size = deep(lambda: len(pickle.dumps(simulation.grid)))
+        print(f"{robots:>6} | {snapshot_time * 1000:>13.2f} | {restore_time * 1000:>12.2f} | "
+              f"{fork_time * 1000:>9.2f} | {copy_time * 1000:>13.0f} | {len(pickle.dumps(snapshot)) / 1024:>13.1f} | "
+              f"{grid_size / 1024:>9,.0f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [50, 200, 800])
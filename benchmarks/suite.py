@@ -0,0 +1,277 @@
+# suite.py
+"""
+Benchmark suite over generated maps of several scale tiers, with results saved as JSON for comparing commits.
+
+Every tier is a square map with seeded obstacles (cells without connections), 8 goals, robots and 10 packages per
+robot of the largest fleet, all placed on open cells. The map is written as a binary map and as a JSON map, then
+measured for:
+
+- ``load``: seconds and peak memory of ``Grid.grid_from_json`` and of ``map_format.load_map``
+- ``queries_per_second``: ``Pathfinding.a_star_ids`` between seeded random open cells, path cache off
+- ``fleets``: ``Simulation.run`` ticks per second with the first 1, 10, 100, ... robots of the map
+- ``render``: ``GUI.update_canvas`` seconds for a full and an incremental redraw, ``null`` without a display or
+  above ``RENDER_LIMIT`` cells a side
+
+Every load runs in a fresh process, and its peak memory is the peak resident set of that process. This includes the
+interpreter and its imports, which the 10x10 tier shows, and the pages of a memory-mapped binary map the load touched.
+
+``--compare`` reads the results of an earlier run and prints the ratio of every metric, flagging the ones worse by
+more than ``--threshold``; the exit status is 1 if any is. Metrics ending in ``per_second`` are better higher, all
+others better lower. Timings of a loaded machine easily vary by 20%: ``--repeat`` keeps the best of several runs of
+each measurement, and the default threshold is 25%.
+
+Run from the repository root::
+
+    python -m benchmarks.suite --sizes 10 100 1000 --output results.json
+    python -m benchmarks.suite --output new.json --compare results.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.grid import Grid, NEIGHBOUR_OFFSETS
+from src.map_format import GOAL_DTYPE, PACKAGE_DTYPE, ROBOT_DTYPE, MapData, binary_to_json, load_map, \
+    open_cell_weights, write_map
+from src.pathfinding import Pathfinding
+from src.sim import Simulation
+
+RENDER_LIMIT = 316
+
+
+def generate_map(size, seed=0, obstacles=0.2, robots=100, goals=8, packages_per_robot=10):
+    """
+    A ``size`` x ``size`` map with a share ``obstacles`` of seeded random cells blocked.
+
+    :return: The :class:`MapData`, robots in random order so any prefix of them is a random fleet.
+    """
+    rng = np.random.default_rng(seed)
+    cells = size * size
+    open_cells = rng.random(cells) >= obstacles
+    weights = open_cell_weights(open_cells.reshape(size, size))
+    # Isolated open cells have no connections either, keep entities on cells they can leave
+    free = np.flatnonzero(np.isfinite(weights).reshape(len(NEIGHBOUR_OFFSETS), -1).any(axis=0))
+
+    goals = min(goals, len(free) // 2)
+    robots = min(robots, len(free) - goals)
+    placed = rng.permutation(free)[:goals + robots]
+    goal_records = np.zeros(goals, dtype=GOAL_DTYPE)
+    goal_records["cell"], goal_records["id"] = placed[:goals], np.arange(goals)
+    robot_records = np.zeros(robots, dtype=ROBOT_DTYPE)
+    robot_records["cell"], robot_records["id"], robot_records["max_packages"] = placed[goals:], np.arange(robots), 5
+    # Packages go anywhere but on goals, at most a cell's max load of 10 each
+    candidates = np.setdiff1d(free, placed[:goals])
+    package_cells = np.repeat(candidates, 10)[rng.permutation(len(candidates) * 10)[:packages_per_robot * robots]]
+    package_records = np.zeros(len(package_cells), dtype=PACKAGE_DTYPE)
+    package_records["cell"], package_records["id"] = np.sort(package_cells), np.arange(len(package_cells))
+    return MapData(size, size, np.full(cells, 10, dtype=np.int32), weights.reshape(len(NEIGHBOUR_OFFSETS), -1),
+                   robot_records, goal_records, package_records)
+
+
+def in_fresh_process(function, *args):
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(function, *args).result()
+
+
+def timed_load(map_format, path):
+    load = Grid.grid_from_json if map_format == "json" else load_map
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    started = time.perf_counter()
+    load(path)
+    elapsed = time.perf_counter() - started
+    return elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def measure_load(map_format, path, repeat=1):
+    """
+    Load ``path`` in ``repeat`` fresh processes.
+
+    :param map_format: ``"json"`` or ``"binary"``.
+    :return: The best seconds and the highest peak bytes.
+    """
+    runs = [in_fresh_process(timed_load, map_format, path) for _ in range(repeat)]
+    return min(elapsed for elapsed, _ in runs), max(peak for _, peak in runs)
+
+
+def measure_queries(grid, seed=0, budget=1.0, limit=1000):
+    """:return: A* queries per second between seeded random open cells, stopping after ``budget`` seconds."""
+    rng = np.random.default_rng(seed)
+    sources, _, _ = grid.edge_arrays()
+    free = np.unique(sources)
+    pairs = rng.choice(free, size=(limit, 2)).tolist()
+    pathfinding = Pathfinding(grid)
+    queries = 0
+    started = time.perf_counter()
+    for start, destination in pairs:
+        pathfinding.a_star_ids(start, destination, use_cache=False)
+        queries += 1
+        if time.perf_counter() - started > budget:
+            break
+    return queries / (time.perf_counter() - started)
+
+
+def measure_render(grid):
+    """:return: Seconds of a full and of an incremental canvas redraw, or ``None`` without a display."""
+    try:
+        import tkinter
+        from src.gui import GUI
+    except ImportError:
+        return None
+    try:
+        gui = GUI(grid)
+    except tkinter.TclError:
+        return None
+    try:
+        gui.root.update()
+        started = time.perf_counter()
+        gui.update_canvas()
+        full = time.perf_counter() - started
+        for robot in grid.robots:
+            grid.mark_dirty(robot.position)
+        started = time.perf_counter()
+        gui.update_canvas()
+        incremental = time.perf_counter() - started
+    finally:
+        gui.root.destroy()
+    return {"full_seconds": full, "incremental_seconds": incremental}
+
+
+def fleet_sizes(robots):
+    sizes = [1]
+    while sizes[-1] * 10 <= robots:
+        sizes.append(sizes[-1] * 10)
+    return sizes
+
+
+def benchmark_tier(size, directory, seed=0, robots=1000, ticks=50, query_budget=1.0, repeat=1):
+    data = generate_map(size, seed, robots=robots)
+    binary_path = os.path.join(directory, f"map_{size}.bin")
+    json_path = os.path.join(directory, f"map_{size}.json")
+    write_map(data, binary_path)
+    # Converting a large map takes gigabytes, which this process would keep through the measurements
+    in_fresh_process(binary_to_json, binary_path, json_path)
+
+    json_seconds, json_peak = measure_load("json", json_path, repeat)
+    binary_seconds, binary_peak = measure_load("binary", binary_path, repeat)
+    result = {
+        "open_cells": int(np.isfinite(data.weights).any(axis=0).sum()),
+        "load": {"json_seconds": json_seconds, "json_peak_rss_bytes": json_peak,
+                 "binary_seconds": binary_seconds, "binary_peak_rss_bytes": binary_peak},
+        "queries_per_second": max(measure_queries(load_map(binary_path), seed, query_budget)
+                                  for _ in range(repeat)),
+        "fleets": {},
+    }
+
+    fleet_path = os.path.join(directory, f"fleet_{size}.bin")
+    for fleet in fleet_sizes(len(data.robots)):
+        write_map(MapData(size, size, data.max_load, data.weights, data.robots[:fleet], data.goals, data.packages),
+                  fleet_path)
+        summaries = [Simulation(load_map(fleet_path, mmap=False)).run(ticks, seed=seed) for _ in range(repeat)]
+        result["fleets"][str(fleet)] = {"ticks_per_second": max(summary["ticks_per_second"] for summary in summaries),
+                                        "packages_delivered": summaries[0]["packages_delivered"]}
+
+    result["render"] = measure_render(load_map(binary_path, mmap=False)) if size <= RENDER_LIMIT else None
+    return result
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "numpy": np.__version__,
+            "platform": platform.platform(), "processor": platform.processor(), "cpus": os.cpu_count(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z")}
+
+
+def flatten(results, prefix=""):
+    """Nested result dicts as ``{"size/group/metric": value}`` for every numeric metric."""
+    metrics = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            metrics.update(flatten(value, name + "/"))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[name] = value
+    return metrics
+
+
+def compare(baseline, current, threshold=0.25):
+    """
+    Compare two suite results.
+
+    :param threshold: Relative change beyond which a worse metric is a regression.
+    :return: ``(name, baseline value, current value, ratio, regressed)`` per metric both results have, in name order.
+    """
+    before, after = flatten(baseline["tiers"]), flatten(current["tiers"])
+    rows = []
+    for name in sorted(before.keys() & after.keys()):
+        old, new = before[name], after[name]
+        ratio = new / old if old else (1.0 if new == old else float("inf"))
+        higher_is_better = name.endswith("per_second")
+        worse = 1 / ratio if higher_is_better and ratio else ratio
+        # Counts such as open cells or deliveries only tell whether the runs are alike
+        timed = name.endswith(("per_second", "seconds", "bytes"))
+        rows.append((name, old, new, ratio, timed and worse > 1 + threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pathfinding, simulation, loading and rendering "
+                                                 "on generated maps.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="Map side of every tier")
+    parser.add_argument("--robots", type=int, default=1000, help="Largest fleet, capped by the open cells")
+    parser.add_argument("--ticks", type=int, default=50, help="Ticks simulated per fleet")
+    parser.add_argument("--query-budget", type=float, default=1.0, help="Seconds of pathfinding queries per tier")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--compare", help="Results of an earlier run to compare against")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs of each measurement, the best one is kept")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Relative change beyond which a worse metric is a regression")
+    args = parser.parse_args(argv)
+
+    results = {"environment": environment(), "seed": args.seed, "ticks": args.ticks, "repeat": args.repeat, "tiers": {}}
+    print(f"{'size':>11} | {'json (s)':>8} | {'json (MB)':>9} | {'binary (s)':>10} | {'binary (MB)':>11} | "
+          f"{'queries/s':>9} | ticks/s by fleet")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            tier = benchmark_tier(size, directory, args.seed, args.robots, args.ticks, args.query_budget, args.repeat)
+            results["tiers"][str(size)] = tier
+            load = tier["load"]
+            fleets = ", ".join(f"{fleet}: {fleet_result['ticks_per_second']:,.0f}"
+                               for fleet, fleet_result in tier["fleets"].items())
+            print(f"{size:>5}x{size:<5} | {load['json_seconds']:>8.3f} | "
+                  f"{load['json_peak_rss_bytes'] / 2 ** 20:>9.1f} | {load['binary_seconds']:>10.3f} | "
+                  f"{load['binary_peak_rss_bytes'] / 2 ** 20:>11.1f} | "
+                  f"{tier['queries_per_second']:>9,.0f} | {fleets}")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = 0
+        for name, old, new, ratio, regressed in compare(baseline, results, args.threshold):
+            regressions += regressed
+            print(f"{name:<40} | {old:>14,.4g} | {new:>14,.4g} | {ratio:>7.2f}x{'  REGRESSION' if regressed else ''}")
+        print(f"{regressions} regressions against {args.compare}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
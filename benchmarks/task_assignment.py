@@ -0,0 +1,58 @@
+# task_assignment.py
+"""
+Times ``TaskAssigner`` against fleet size: building the travel-cost matrix and solving it with the Hungarian
+method and with the auction algorithm.
+
+Robots and as many (then twice as many) packages are scattered with a fixed seed over a fully 4-connected
+:class:`ImplicitGrid`. Both solvers must agree on the total cost.
+
+Run from the repository root::
+
+    python -m benchmarks.task_assignment 16 64 256 1024
+"""
+import random
+import sys
+import time
+
+from src.implicit_grid import ImplicitGrid
+from src.package import Package
+from src.robot import Robot
+from src.task_assignment import TaskAssigner, auction, hungarian
+
+
+def scenario(robots, packages, size=200, seed=0):
+    rng = random.Random(seed)
+    grid = ImplicitGrid(size, size)
+    grid.connect_neighbours()
+    cells = rng.sample(range(size * size), robots + packages)
+    for robot_id, cell in enumerate(cells[:robots]):
+        grid.add_robot(grid.position_of(cell), Robot(robot_id, grid.position_of(cell), max_packages=1))
+    for package_id, cell in enumerate(cells[robots:]):
+        grid.add_package(grid.position_of(cell), Package(package_id, grid.position_of(cell)))
+    return grid
+
+
+def timed(solver, cost):
+    start = time.perf_counter()
+    rows, columns = solver(cost)
+    return time.perf_counter() - start, cost[rows, columns].sum()
+
+
+def main(fleet_sizes):
+    print(f"{'robots':>6} | {'packages':>8} | {'cost matrix (s)':>15} | {'hungarian (s)':>13} | {'auction (s)':>11}")
+    for packages_per_robot in (1, 2):
+        for robots in fleet_sizes:
+            grid = scenario(robots, robots * packages_per_robot)
+            start = time.perf_counter()
+            cost = TaskAssigner(grid).cost_matrix(grid.robots, grid.packages)
+            cost_time = time.perf_counter() - start
+
+            hungarian_time, hungarian_total = timed(hungarian, cost)
+            auction_time, auction_total = timed(auction, cost)
+            assert abs(hungarian_total - auction_total) < 1e-6, (hungarian_total, auction_total)
+            print(f"{robots:>6} | {len(grid.packages):>8} | {cost_time:>15.3f} | {hungarian_time:>13.3f} | "
+                  f"{auction_time:>11.3f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [16, 64, 256, 1024])
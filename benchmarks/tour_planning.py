@@ -0,0 +1,65 @@
+# tour_planning.py
+"""
+Compares :class:`TourPlanner` tours with the greedy checkpoint chain of ``Robot.find_checkpoints``.
+
+Robots and packages are scattered with a fixed seed over a fully 4-connected floor with goals along the left wall.
+Every robot plans one tour from the initial state; the table shows the travel cost per picked-up package of both
+approaches and the planning time. The last columns run the simulation with each approach.
+
+Run from the repository root::
+
+    python -m benchmarks.tour_planning 50 100
+"""
+import random
+import sys
+import time
+
+from src.goal import Goal
+from src.grid import Grid
+from src.package import Package
+from src.position import Position
+from src.robot import Robot
+from src.sim import Simulation
+from src.tour_planning import TourPlanner
+
+
+def scenario(size, robots=10, packages=200, max_packages=5, seed=0):
+    rng = random.Random(seed)
+    grid = Grid(size, size)
+    grid.connect_neighbours()
+    for goal_id, y in enumerate(range(0, size, max(1, size // 4))):
+        grid.add_goal(Position(0, y), Goal(goal_id, Position(0, y)))
+    cells = rng.sample(range(size, size * size), robots + packages)
+    for robot_id, cell in enumerate(cells[:robots]):
+        position = grid.position_of(cell)
+        grid.add_robot(position, Robot(robot_id, position, max_packages=max_packages))
+    for package_id, cell in enumerate(cells[robots:]):
+        position = grid.position_of(cell)
+        grid.add_package(position, Package(package_id, position))
+    return grid
+
+
+def main(sizes, ticks=500):
+    print(f"{'size':>9} | {'greedy / package':>16} | {'tour / package':>14} | {'saved':>6} | {'plan (ms)':>9} | "
+          f"{'greedy delivered':>16} | {'tour delivered':>14}")
+    for size in sizes:
+        grid = scenario(size)
+        planner = TourPlanner(grid, time_budget=0.005, compare=True)
+        started = time.perf_counter()
+        for robot in grid.robots:
+            planner.plan(robot)
+        plan_time = (time.perf_counter() - started) / len(grid.robots)
+        totals = planner.totals
+
+        delivered = []
+        for tour_budget in (None, 0.005):
+            simulation = Simulation(scenario(size), tour_budget=tour_budget)
+            simulation.run(ticks, seed=0)
+            delivered.append(simulation.delivered_packages())
+        print(f"{size:>4}x{size:<4} | {totals['greedy_cost'] / totals['greedy_pickups']:>16.2f} | "
+              f"{totals['cost'] / totals['pickups']:>14.2f} | {planner.savings():>6.1%} | {plan_time * 1000:>9.2f} | "
+              f"{delivered[0]:>16} | {delivered[1]:>14}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [30, 60, 120])
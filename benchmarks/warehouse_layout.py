@@ -0,0 +1,51 @@
+# warehouse_layout.py
+"""
+Times :func:`generate_warehouse` against the cell by cell ``generate_grid``, and emitting the layout as a binary map
+file or straight into an :class:`ArrayGrid`.
+
+``generate_grid`` writes an open rectangle as JSON and is only timed up to ``JSON_LIMIT`` cells a side.
+
+Run from the repository root::
+
+    python -m benchmarks.warehouse_layout 100 1000 3000
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from src.map_format import grid_from_map_data, write_map
+from src.map_generator.generator import generate_grid
+from src.map_generator.warehouse import generate_warehouse
+
+JSON_LIMIT = 300
+
+
+def timed(function, *args, **kwargs):
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def main(sizes):
+    print(f"{'size':>11} | {'open cells':>10} | {'packages':>8} | {'generate (s)':>12} | {'write map (s)':>13} | "
+          f"{'ArrayGrid (s)':>13} | {'generate_grid (s)':>17}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            robots = min(size - 2, 1000)
+            layout, generate = timed(generate_warehouse, size, size, robots=robots)
+            _, write = timed(write_map, layout, os.path.join(directory, "warehouse.map"))
+            _, build = timed(grid_from_map_data, layout)
+            json = "-"
+            if size <= JSON_LIMIT:
+                _, seconds = timed(generate_grid, os.path.join(directory, f"grid{size}.json"), size, size)
+                json = f"{seconds:.3f}"
+            open_cells = int(np.isfinite(layout.weights).any(axis=0).sum())
+            print(f"{size:>5}x{size:<5} | {open_cells:>10,} | {len(layout.packages):>8,} | {generate:>12.3f} | "
+                  f"{write:>13.3f} | {build:>13.3f} | {json:>17}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [100, 1000, 3000])
@@ -0,0 +1,279 @@
+# array_grid.py
+import numpy as np
+
+from src.connection import Connection
+from src.grid import Grid, NEIGHBOUR_OFFSETS
+from src.position import Position
+
+INFINITY = float('inf')
+NO_ROBOT = -1
+NO_GOAL = -1
+
+
+class _SlotTable:
+    """Maps small integer slots to the Python objects referenced from the grid arrays."""
+
+    def __init__(self):
+        self.objects = []
+        self.free = []
+
+    def add(self, obj):
+        if self.free:
+            slot = self.free.pop()
+            self.objects[slot] = obj
+        else:
+            slot = len(self.objects)
+            self.objects.append(obj)
+        return slot
+
+    def get(self, slot):
+        return self.objects[slot] if slot >= 0 else None
+
+    def remove(self, slot):
+        self.objects[slot] = None
+        self.free.append(slot)
+
+    def clear(self):
+        self.objects = []
+        self.free = []
+
+
+class CellView:
+    """
+    Lightweight stand-in for :class:`Cell` that reads and writes the arrays of an :class:`ArrayGrid`.
+
+    Views are created on demand by :meth:`ArrayGrid.get_cell`; two views of the same cell compare equal.
+    """
+    __slots__ = ('_grid', 'id')
+
+    def __init__(self, grid: 'ArrayGrid', cell_id: int):
+        self._grid = grid
+        self.id = cell_id
+
+    @property
+    def position(self):
+        return self._grid.position_of(self.id)
+
+    @property
+    def max_load(self):
+        return int(self._grid.max_load[self.id])
+
+    @max_load.setter
+    def max_load(self, value):
+        self._grid.max_load[self.id] = value
+
+    @property
+    def robot(self):
+        return self._grid.robot_table.get(int(self._grid.occupancy[self.id]))
+
+    @robot.setter
+    def robot(self, robot):
+        grid = self._grid
+        slot = int(grid.occupancy[self.id])
+        if slot != NO_ROBOT:
+            grid.robot_table.remove(slot)
+        grid.occupancy[self.id] = NO_ROBOT if robot is None else grid.robot_table.add(robot)
+
+    @property
+    def goal(self):
+        return self._grid.goal_table.get(int(self._grid.goal_ids[self.id]))
+
+    @goal.setter
+    def goal(self, goal):
+        grid = self._grid
+        slot = int(grid.goal_ids[self.id])
+        if slot != NO_GOAL:
+            grid.goal_table.remove(slot)
+        grid.goal_ids[self.id] = NO_GOAL if goal is None else grid.goal_table.add(goal)
+
+    @property
+    def packages(self):
+        return self._grid.cell_packages.get(self.id, [])
+
+    @packages.setter
+    def packages(self, packages):
+        if packages:
+            self._grid.cell_packages[self.id] = list(packages)
+        else:
+            self._grid.cell_packages.pop(self.id, None)
+        self._grid.package_counts[self.id] = len(packages)
+
+    @property
+    def connections(self):
+        grid = self._grid
+        return [Connection(self, CellView(grid, to_id), weight) for to_id, weight in grid.neighbour_ids(self.id)]
+
+    def add_connection(self, to_cell, weight=1):
+        self._grid.set_edge_weight(self.id, to_cell.id, weight)
+
+    def remove_connection(self, to_cell):
+        return self._grid.set_edge_weight(self.id, to_cell.id, np.inf)
+
+    def update_connection(self, connection: 'Connection'):
+        self._grid.set_edge_weight(self.id, connection.to_cell.id, connection.weight)
+
+    def add_robot(self, robot):
+        if self.robot is None:
+            self.robot = robot
+
+    def add_package(self, package):
+        if self.can_load_package():
+            self._grid.cell_packages.setdefault(self.id, []).append(package)
+            self._grid.package_counts[self.id] += 1
+
+    def remove_package(self, package):
+        packages = self._grid.cell_packages.get(self.id)
+        if packages:
+            self.packages = [p for p in packages if p != package]
+
+    def add_goal(self, goal):
+        if not self.goal:
+            self.goal = goal
+
+    def has_robot(self):
+        return self._grid.occupancy[self.id] != NO_ROBOT
+
+    def has_package(self):
+        return self._grid.package_counts[self.id] > 0
+
+    def can_load_package(self):
+        return self._grid.package_counts[self.id] < self._grid.max_load[self.id]
+
+    def has_goal(self):
+        return self._grid.goal_ids[self.id] != NO_GOAL
+
+    def reset(self):
+        self.robot = None
+        self.packages = []
+        self.goal = None
+
+    def __eq__(self, other):
+        return isinstance(other, CellView) and other._grid is self._grid and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f"Cell({self.position}, Robot: {self.robot}, Goal: {self.goal}, Package: {self.packages})"
+
+
+class _CellRows:
+    """Row-major sequence of cell views so ``grid.grid[y][x]`` keeps working."""
+
+    def __init__(self, grid: 'ArrayGrid'):
+        self._grid = grid
+
+    def __len__(self):
+        return self._grid.height
+
+    def __getitem__(self, y):
+        grid = self._grid
+        if not 0 <= y < grid.height:
+            raise IndexError(y)
+        start = y * grid.width
+        return [CellView(grid, cell_id) for cell_id in range(start, start + grid.width)]
+
+    def __iter__(self):
+        for y in range(self._grid.height):
+            yield self[y]
+
+
+class ArrayGrid(Grid):
+    """
+    Grid backed by flat NumPy arrays indexed by cell id (``y * width + x``) instead of one ``Cell`` per position.
+
+    Occupancy, goal slots, package counts and ``max_load`` are one array each and edge weights are stored
+    per direction (see ``NEIGHBOUR_OFFSETS``), with ``inf`` marking a missing connection. Only connections
+    to the four direct neighbours can be represented.
+    """
+
+    def __init__(self, width: int, height: int, max_load=10, path_cache_size=1024, weights=None):
+        """
+        :param max_load: Package capacity of every cell, or an int32 array of one capacity per cell.
+        :param weights: Existing ``(4, width * height)`` float32 edge weights to use instead of an unconnected grid,
+            e.g. memory-mapped from a binary map file.
+        """
+        self._init_state(width, height, path_cache_size)
+
+        size = width * height
+        self.occupancy = np.full(size, NO_ROBOT, dtype=np.int32)
+        self.goal_ids = np.full(size, NO_GOAL, dtype=np.int32)
+        self.package_counts = np.zeros(size, dtype=np.int32)
+        self.max_load = np.full(size, max_load, dtype=np.int32) if np.isscalar(max_load) else max_load
+        self.id_steps = [dy * width + dx for dx, dy in NEIGHBOUR_OFFSETS]
+        self.init_topology(weights)
+
+        self.robot_table = _SlotTable()
+        self.goal_table = _SlotTable()
+        self.cell_packages = {}
+
+    def init_topology(self, weights=None):
+        if weights is None:
+            weights = np.full((len(NEIGHBOUR_OFFSETS), self.width * self.height), np.inf, dtype=np.float32)
+        self.weights = weights
+
+    @property
+    def grid(self):
+        return _CellRows(self)
+
+    def get_cell(self, position: Position):
+        return CellView(self, self.cell_id(position))
+
+    def is_valid_move(self, position: Position):
+        return self.is_inside_grid(position) and self.occupancy[self.cell_id(position)] == NO_ROBOT
+
+    def neighbour_ids(self, cell_id: int):
+        neighbours = []
+        for weight, step in zip(self.weights[:, cell_id].tolist(), self.id_steps):
+            if weight != INFINITY:
+                neighbours.append((cell_id + step, weight))
+        return neighbours
+
+    def edge_arrays(self):
+        sources, targets, weights = [], [], []
+        for direction, step in enumerate(self.id_steps):
+            cell_ids = np.flatnonzero(self.weights[direction] != np.inf)
+            sources.append(cell_ids)
+            targets.append(cell_ids + step)
+            weights.append(self.weights[direction, cell_ids].astype(np.float64))
+        return np.concatenate(sources), np.concatenate(targets), np.concatenate(weights)
+
+    def direction_between(self, from_id: int, to_id: int):
+        fx, fy = from_id % self.width, from_id // self.width
+        offset = (to_id % self.width - fx, to_id // self.width - fy)
+        if offset not in NEIGHBOUR_OFFSETS:
+            raise ValueError(f"ArrayGrid only supports connections between adjacent cells, got {offset}")
+        return NEIGHBOUR_OFFSETS.index(offset)
+
+    def set_edge_weight(self, from_id: int, to_id: int, weight):
+        direction = self.direction_between(from_id, to_id)
+        had_edge = self.weights[direction, from_id] != np.inf
+        self.weights[direction, from_id] = weight
+        self.topology_changed(from_id)
+        return bool(had_edge)
+
+    def connect_neighbours(self, weight=1):
+        weights = self.weights.reshape(len(NEIGHBOUR_OFFSETS), self.height, self.width)
+        for direction, (dx, dy) in enumerate(NEIGHBOUR_OFFSETS):
+            rows = slice(max(0, -dy), self.height - max(0, dy))
+            columns = slice(max(0, -dx), self.width - max(0, dx))
+            weights[direction, rows, columns] = weight
+        self.topology_changed()
+
+    def reset(self):
+        self.occupancy.fill(NO_ROBOT)
+        self.goal_ids.fill(NO_GOAL)
+        self.package_counts.fill(0)
+        self.robot_table.clear()
+        self.goal_table.clear()
+        self.cell_packages = {}
+        self.goals, self.robots, self.packages = [], [], []
+        self.goal_count = self.robot_count = self.package_count = 0
+        self.dormant.clear()
+        self.dirty_cells.update(range(self.width * self.height))
+        self.goal_fields.clear()
+        self.package_index.clear()
+
+    def nbytes(self):
+        return (self.occupancy.nbytes + self.goal_ids.nbytes + self.package_counts.nbytes +
+                self.max_load.nbytes + self.weights.nbytes)
@@ -7,6 +7,8 @@ from src.robot import Robot
 
 
 class Cell:
+    # Grid notified when the connections of this cell change
+    owner = None
 
     def __init__(self, position: 'Position', max_load=10):
         self.position = position
@@ -19,6 +21,7 @@ class Cell:
     def add_connection(self, to_cell: 'Cell', weight=1):
         connection = Connection(self, to_cell, weight)
         self.connections.append(connection)
+        self.notify_topology_change()
 
     def remove_connection(self, to_cell: 'Cell'):
         if self.connections:
@@ -28,9 +31,17 @@ class Cell:
                     updated_connections.append(c)
 
             self.connections = updated_connections
+            self.notify_topology_change()
             return True
         return False
 
+    def update_connection(self, connection: 'Connection'):
+        self.notify_topology_change()
+
+    def notify_topology_change(self):
+        if self.owner is not None:
+            self.owner.topology_changed(self.owner.cell_id(self.position))
+
     #def get_valid_connections(self):
         # TODO: needed?
 
@@ -0,0 +1,179 @@
+# conflict_based_search.py
+import heapq
+import itertools
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from src.pathfinding import Pathfinding
+
+if TYPE_CHECKING:
+    from src.grid import Grid
+    from src.reservation_table import ReservationTable
+
+
+class ConstraintTable:
+    """
+    Reservation-table interface over the vertex constraints of one agent, for :meth:`Pathfinding.space_time_a_star`.
+
+    Robots outside the batch are avoided through the optional background :class:`ReservationTable`.
+    """
+
+    def __init__(self, constraints, horizon: int, background: Optional['ReservationTable'] = None):
+        self.constraints = constraints
+        self.horizon = horizon
+        self.background = background
+        self.parked = background.parked if background is not None else {}
+
+    def can_occupy(self, robot, cell: int, tick: int):
+        if (cell, tick) in self.constraints:
+            return False
+        return self.background is None or self.background.can_occupy(robot, cell, tick)
+
+    def can_move(self, robot, from_cell: int, to_cell: int, tick: int):
+        if not self.can_occupy(robot, to_cell, tick + 1):
+            return False
+        return self.background is None or self.background.can_move(robot, from_cell, to_cell, tick)
+
+    def is_free_until(self, cell: int, tick: int, until_tick: int, robot):
+        return all(self.can_occupy(robot, cell, t) for t in range(tick, until_tick + 1))
+
+
+class Node:
+    __slots__ = ('constraints', 'paths', 'cost', 'conflicts')
+
+    def __init__(self, constraints, paths, cost, conflicts):
+        self.constraints = constraints
+        self.paths = paths
+        self.cost = cost
+        self.conflicts = conflicts
+
+
+def find_conflicts(paths: Dict[object, List[int]]):
+    """
+    Conflicts between paths that start at the same tick; agents stay on their last cell once a path ends.
+
+    Two agents conflict when they are on the same cell at the same tick, or when one enters the cell the other
+    was on the tick before (which also covers swaps), matching the rules of :class:`ReservationTable`.
+
+    :return: ``(agent, cell, tick, other_agent, other_tick)`` tuples, earliest first.
+    """
+    conflicts = []
+    length = max((len(path) for path in paths.values()), default=0)
+    previous = {}
+    for tick in range(length):
+        occupied = {}
+        for agent, path in paths.items():
+            cell = path[min(tick, len(path) - 1)]
+            other = occupied.get(cell)
+            if other is not None:
+                conflicts.append((other, cell, tick, agent, tick))
+            else:
+                occupied[cell] = agent
+            left = previous.get(cell)
+            if left is not None and left != agent:
+                conflicts.append((left, cell, tick - 1, agent, tick))
+        previous = occupied
+    return conflicts
+
+
+class ConflictBasedSearch:
+    """
+    Conflict-Based Search for a batch of robots planned together.
+
+    The high level searches a tree of vertex constraints; the low level is
+    :meth:`Pathfinding.space_time_a_star` run for one agent against its constraints. With ``suboptimality`` above
+    1 the high level expands, among the open nodes whose cost is within that factor of the cheapest, the one with
+    the fewest conflicts (the focal search of Enhanced CBS), trading solution cost for speed. When the node or time
+    budget runs out the best node seen so far (fewest conflicts, then lowest cost) is returned and ``solved`` is
+    ``False``.
+
+    :ivar stats: ``high_level_expanded``, ``conflicts_resolved``, ``low_level_expanded``, ``runtime``.
+    """
+
+    def __init__(self, grid: 'Grid', reservations: Optional['ReservationTable'] = None, suboptimality=1.0,
+                 max_nodes=500, time_limit=0.05, horizon=32):
+        self.grid = grid
+        self.reservations = reservations
+        self.suboptimality = suboptimality
+        self.max_nodes = max_nodes
+        self.time_limit = time_limit
+        self.horizon = horizon
+        self.pathfinding = Pathfinding(grid)
+        self.solved = False
+        self.stats = {}
+
+    def plan(self, agent, start: int, goal: int, constraints, start_tick: int):
+        latest = max((tick for _, tick in constraints), default=start_tick)
+        table = ConstraintTable(constraints, max(self.horizon, latest - start_tick + 1), self.reservations)
+        path = self.pathfinding.space_time_a_star(start, goal, start_tick, table, agent)
+        self.stats["low_level_expanded"] += self.pathfinding.expanded
+        return path
+
+    def solve(self, agents: List[Tuple[object, int, int]], start_tick: int):
+        """
+        :param agents: ``(agent, start_cell, goal_cell)`` for every robot to plan.
+        :param start_tick: Tick at which every agent is on its start cell.
+        :return: Agent to path (one cell id per tick, starting at ``start_tick``); agents without any path are
+            left out.
+        """
+        self.stats = {"high_level_expanded": 0, "conflicts_resolved": 0, "low_level_expanded": 0, "runtime": 0.0}
+        self.solved = False
+        started = time.perf_counter()
+        ends = {agent: (start, goal) for agent, start, goal in agents}
+
+        paths = {}
+        for agent, (start, goal) in ends.items():
+            path = self.plan(agent, start, goal, frozenset(), start_tick)
+            if path:
+                paths[agent] = path
+
+        counter = itertools.count()
+        root = Node({}, paths, self.cost(paths), find_conflicts(paths))
+        best = root
+        open_list = [(root.cost, len(root.conflicts), next(counter), root)]
+
+        while open_list:
+            if (self.stats["high_level_expanded"] >= self.max_nodes
+                    or time.perf_counter() - started > self.time_limit):
+                break
+
+            node = self.pop(open_list)
+            self.stats["high_level_expanded"] += 1
+            if (len(node.conflicts), node.cost) < (len(best.conflicts), best.cost):
+                best = node
+            if not node.conflicts:
+                self.solved = True
+                best = node
+                break
+
+            agent, cell, tick, other, other_tick = node.conflicts[0]
+            self.stats["conflicts_resolved"] += 1
+            for constrained, constrained_tick in ((agent, tick), (other, other_tick)):
+                constraints = dict(node.constraints)
+                constraints[constrained] = constraints.get(constrained, frozenset()) | {
+                    (cell, start_tick + constrained_tick)}
+                start, goal = ends[constrained]
+                path = self.plan(constrained, start, goal, constraints[constrained], start_tick)
+                if not path:
+                    continue
+                child_paths = dict(node.paths)
+                child_paths[constrained] = path
+                child = Node(constraints, child_paths, self.cost(child_paths), find_conflicts(child_paths))
+                heapq.heappush(open_list, (child.cost, len(child.conflicts), next(counter), child))
+
+        self.stats["runtime"] = time.perf_counter() - started
+        return best.paths
+
+    def pop(self, open_list):
+        if self.suboptimality <= 1.0:
+            return heapq.heappop(open_list)[-1]
+
+        bound = open_list[0][0] * self.suboptimality
+        focal = min((entry for entry in open_list if entry[0] <= bound), key=lambda entry: (entry[1], entry[0], entry[2]))
+        open_list.remove(focal)
+        heapq.heapify(open_list)
+        return focal[-1]
+
+    @staticmethod
+    def cost(paths):
+        return sum(len(path) - 1 for path in paths.values())
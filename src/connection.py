@@ -4,7 +4,16 @@ class Connection:
     def __init__(self, from_cell, to_cell, weight=1):
         self.from_cell = from_cell
         self.to_cell = to_cell
-        self.weight = weight
+        self._weight = weight
+
+    @property
+    def weight(self):
+        return self._weight
+
+    @weight.setter
+    def weight(self, weight):
+        self._weight = weight
+        self.from_cell.update_connection(self)
 
     def __repr__(self):
         return f"Connection(from: {self.from_cell.position}, to: {self.to_cell.position}, weight: {self.weight})"
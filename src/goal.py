@@ -5,13 +5,17 @@ from src.position import Position
 
 class Goal:
 	color = "green"
-	packages = []
 
 	def __init__(self, id, position: 'Position'):
 		self.id = id
 		self.position = position
+		self.packages = []
 		self.delivered_packages = 0
 
+	@classmethod
+	def from_json(cls, data, position: 'Position'):
+		return cls(data['id'], position)
+
 	def deliver_package(self, package: 'Package'):
 		self.packages.append(package)
 		self.delivered_packages += 1
@@ -0,0 +1,123 @@
+# goal_fields.py
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from src.pathfinding import Pathfinding
+
+if TYPE_CHECKING:
+    from src.goal import Goal
+    from src.grid import Grid
+
+NO_GOAL = -1
+
+
+class GoalDistanceFields:
+    """
+    Travel cost from every cell to every goal, computed with a reverse Dijkstra per goal.
+
+    Alongside the per-goal fields a combined field keeps, for every cell, the nearest goal's cell id and its
+    distance, so nearest-goal queries are a single array lookup. Adding a goal folds its field into the combined
+    field; removing one only recomputes the cells it was nearest to. Fields are computed lazily on the next query
+    and rebuilt from scratch when the grid's topology version changes. Ties go to the goal with the smaller cell id.
+
+    Fields computed for the same topology elsewhere can be handed over with :meth:`share` and are used instead of
+    searching again when their goal is added.
+    """
+
+    def __init__(self, grid: 'Grid'):
+        self.grid = grid
+        self.goals = {}
+        self.fields = {}
+        self.pending = set()
+        # Fields of cells that are not goals here, computed for this topology
+        self.spare = {}
+        self.version = grid.topology_version
+        self.nearest_goal = None
+        self.nearest_distance = None
+
+    def add_goal(self, cell_id: int, goal: 'Goal'):
+        self.goals[cell_id] = goal
+        self.pending.add(cell_id)
+
+    def remove_goal(self, cell_id: int):
+        self.goals.pop(cell_id, None)
+        self.pending.discard(cell_id)
+        field = self.fields.pop(cell_id, None)
+        if field is None or self.nearest_goal is None:
+            return
+
+        affected = np.flatnonzero(self.nearest_goal == cell_id)
+        self.nearest_goal[affected] = NO_GOAL
+        self.nearest_distance[affected] = np.inf
+        if self.fields and affected.size:
+            goal_ids = sorted(self.fields)
+            stacked = np.stack([self.fields[goal_id][affected] for goal_id in goal_ids])
+            best = np.argmin(stacked, axis=0)
+            distances = stacked[best, np.arange(affected.size)]
+            reachable = distances != np.inf
+            self.nearest_goal[affected[reachable]] = np.array(goal_ids, dtype=np.int32)[best[reachable]]
+            self.nearest_distance[affected[reachable]] = distances[reachable]
+
+    def clear(self):
+        self.goals.clear()
+        self.fields.clear()
+        self.pending.clear()
+        self.spare.clear()
+        self.nearest_goal = None
+        self.nearest_distance = None
+
+    def share(self, source: 'GoalDistanceFields'):
+        """
+        Take over the fields ``source`` computed, for a grid with the same topology as this one. Fields are never
+        written in place, so both keep the same arrays.
+        """
+        if source.version != source.grid.topology_version:
+            return
+        self.check_version()
+        for cell_id, field in list(source.spare.items()) + list(source.fields.items()):
+            if cell_id not in self.fields:
+                self.spare[cell_id] = field
+
+    def check_version(self):
+        if self.nearest_goal is None or self.version != self.grid.topology_version:
+            size = self.grid.width * self.grid.height
+            if self.version != self.grid.topology_version:
+                self.spare.clear()
+            self.version = self.grid.topology_version
+            self.fields.clear()
+            self.pending = set(self.goals)
+            self.nearest_goal = np.full(size, NO_GOAL, dtype=np.int32)
+            self.nearest_distance = np.full(size, np.inf, dtype=np.float32)
+
+    def refresh(self):
+        self.check_version()
+        if not self.pending:
+            return
+
+        pathfinding = Pathfinding(self.grid)
+        for cell_id in sorted(self.pending):
+            field = self.spare.pop(cell_id, None)
+            if field is None:
+                field = pathfinding.distance_field([cell_id], reverse=True).astype(np.float32)
+            self.fields[cell_id] = field
+            closer = (field < self.nearest_distance) | (
+                    (field == self.nearest_distance) & (field != np.inf) & (cell_id < self.nearest_goal))
+            self.nearest_goal[closer] = cell_id
+            self.nearest_distance[closer] = field[closer]
+        self.pending.clear()
+
+    def nearest(self, cell_id: int):
+        """
+        :return: ``(goal, distance)`` for the goal with the lowest travel cost from ``cell_id``, or
+            ``(None, inf)`` if no goal is reachable.
+        """
+        self.refresh()
+        goal_id = int(self.nearest_goal[cell_id])
+        if goal_id == NO_GOAL:
+            return None, float('inf')
+        return self.goals[goal_id], float(self.nearest_distance[cell_id])
+
+    def distance(self, goal_cell_id: int, cell_id: int):
+        self.refresh()
+        return float(self.fields[goal_cell_id][cell_id])
@@ -1,24 +1,26 @@
 # grid.py
 import json
+import os
+from contextlib import contextmanager
+
+import numpy as np
 
 from src.cell import Cell
 from src.goal import Goal
+from src.goal_fields import GoalDistanceFields
 from src.package import Package
+from src.package_index import PackageIndex
+from src.path_cache import PathCache
 from src.position import Position
 from src.robot import Status, Robot
 
+# Offsets of the 4-neighbourhood, in the same order generate_grid writes them
+NEIGHBOUR_OFFSETS = ((-1, 0), (1, 0), (0, -1), (0, 1))
 
-class Grid:
-	def __init__(self, width: int, height: int):
-		self.goals = []
-		self.goal_count = 0
-		self.robots = []
-		self.robot_count = 0
-		self.packages = []
-		self.package_count = 0
 
-		self.width = width
-		self.height = height
+class Grid:
+	def __init__(self, width: int, height: int, path_cache_size=1024):
+		self._init_state(width, height, path_cache_size)
 
 		# Generate grid
 		self.grid = []
@@ -26,39 +28,75 @@ class Grid:
 			row = []
 			for x in range(width):
 				cell = Cell(Position(x, y))
+				cell.owner = self
 				row.append(cell)
 
 			self.grid.append(row)
 
+	def _init_state(self, width: int, height: int, path_cache_size: int):
+		# Entities, clock and caches every grid storage shares; subclasses build their own cell storage after it
+		self.goals = []
+		self.goal_count = 0
+		self.robots = []
+		self.robot_count = 0
+		# Robots with nothing to do, skipped by move_robots and planning until something may give them work
+		self.dormant = set()
+		# Ids of cells whose robot, packages or goal changed since the GUI last drew them
+		self.dirty_cells = set()
+		# Sets that collect the id of every cell whose packages change, e.g. for a trace recorder
+		self.package_watchers = []
+		self.packages = []
+		self.package_count = 0
+
+		self.width = width
+		self.height = height
+
+		# Simulation clock, advanced by Simulation; robots time their statuses in ticks
+		self.tick = 0
+		self.topology_version = 0
+		# Callables told the id of every cell whose connections change, e.g. to update a cluster abstraction
+		self.topology_listeners = []
+		# Nesting depth of batch_topology_changes, and whether a change arrived inside it
+		self.topology_batch_depth = 0
+		self.topology_batch_changed = False
+		self.path_cache = PathCache(path_cache_size)
+		self.adjacency_cache = {}
+		self.goal_fields = GoalDistanceFields(self)
+		self.package_index = PackageIndex(width, height)
+
 	@classmethod
 	def grid_from_json(cls, json_file: str):
-		with open(f'./maps/{json_file}') as f:
+		"""
+		Load a map written by ``map_generator.generate_grid``.
+
+		:param json_file: Path to the map, or the name of a file in ``./maps``.
+		"""
+		path = json_file if os.path.isfile(json_file) else os.path.join('maps', json_file)
+		with open(path) as f:
 			data = json.load(f)
 
 		grid = cls(data['width'], data['height'])
 
-		for item in data['cells']:
-
-			position = Position(item['position']['x'], item['position']['y'])
-			cell = Cell(position, item['max_load'])
-			for connection in item['connections']:
-				connection_position = Position(connection['to_cell']['x'], connection['to_cell']['y'])
-				connection_cell = grid.get_cell(connection_position)
-				cell.add_connection(connection_cell, connection['weight'])
-
-			if item['robot'] is not None:
-				robot = Robot.from_json(item['robot'])
-				cell.add_robot(robot)
+		# One topology change for the whole map rather than one per connection
+		with grid.batch_topology_changes():
+			for item in data['cells']:
+				position = Position(item['position']['x'], item['position']['y'])
+				cell = grid.get_cell(position)
+				# The generator writes camelCase keys, accept both spellings
+				cell.max_load = item.get('maxLoad', item.get('max_load', cell.max_load))
+				for connection in item['connections']:
+					to_cell = connection.get('toCell', connection.get('to_cell'))
+					connection_cell = grid.get_cell(Position(to_cell['x'], to_cell['y']))
+					cell.add_connection(connection_cell, connection['weight'])
 
-			if item['goal'] is not None:
-				goal = Goal.from_json(item['goal'])
-				cell.add_goal(goal)
+				if item.get('robot') is not None:
+					grid.add_robot(position, Robot.from_json(item['robot'], position))
 
-			for package_data in item['packages']:
-				package = Package.from_json(package_data)
-				cell.add_package(package)
+				if item.get('goal') is not None:
+					grid.add_goal(position, Goal.from_json(item['goal'], position))
 
-			grid.grid[item['position']['y']][item['position']['x']] = cell
+				for package_data in item.get('packages', []):
+					grid.add_package(position, Package.from_json(package_data, position))
 
 		return grid
 
@@ -66,6 +104,98 @@ class Grid:
 		x, y = position.x, position.y
 		return self.grid[y][x]
 
+	def cell_id(self, position: Position):
+		return position.y * self.width + position.x
+
+	def position_of(self, cell_id: int):
+		return Position(cell_id % self.width, cell_id // self.width)
+
+	def topology_changed(self, cell_id=None):
+		"""
+		Record a change to the connection graph and tell the ``topology_listeners``.
+
+		:param cell_id: Cell whose outgoing connections changed, ``None`` when it may be any cell.
+		"""
+		if self.topology_batch_depth:
+			self.topology_batch_changed = True
+			return
+		self.topology_version += 1
+		for listener in self.topology_listeners:
+			listener(cell_id)
+		self.wake_robots()
+
+	@contextmanager
+	def batch_topology_changes(self):
+		"""
+		Hold back topology change notifications, e.g. while a map is built edge by edge, and send a single
+		``topology_changed(None)`` at the end if anything changed.
+		"""
+		self.topology_batch_depth += 1
+		try:
+			yield self
+		finally:
+			self.topology_batch_depth -= 1
+			if not self.topology_batch_depth and self.topology_batch_changed:
+				self.topology_batch_changed = False
+				self.topology_changed()
+
+	def neighbour_ids(self, cell_id: int):
+		width = self.width
+		cell = self.grid[cell_id // width][cell_id % width]
+		neighbours = []
+		for connection in cell.connections:
+			to_position = connection.to_cell.position
+			neighbours.append((to_position.y * width + to_position.x, connection.weight))
+		return neighbours
+
+	def edge_arrays(self):
+		sources, targets, weights = [], [], []
+		for cell_id in range(self.width * self.height):
+			for neighbour, weight in self.neighbour_ids(cell_id):
+				sources.append(cell_id)
+				targets.append(neighbour)
+				weights.append(weight)
+		return np.array(sources, dtype=np.int64), np.array(targets, dtype=np.int64), np.array(weights, dtype=np.float64)
+
+	def adjacency(self, reverse=False):
+		"""
+		Compressed sparse row adjacency of the connection graph, rebuilt when the topology version changes.
+
+		:param reverse: Index edges by their target cell instead of their source cell.
+		:return: ``(offsets, neighbours, weights)`` memoryviews; the edges of cell ``i`` are
+			``offsets[i]:offsets[i + 1]``.
+		"""
+		cached = self.adjacency_cache.get(reverse)
+		if cached is not None and cached[0] == self.topology_version:
+			return cached[1]
+
+		sources, targets, weights = self.edge_arrays()
+		if reverse:
+			sources, targets = targets, sources
+		order = np.argsort(sources, kind='stable')
+		counts = np.bincount(sources, minlength=self.width * self.height)
+		offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+		csr = (memoryview(offsets), memoryview(targets[order].copy()), memoryview(weights[order].copy()))
+		self.adjacency_cache[reverse] = (self.topology_version, csr)
+		return csr
+
+	def incoming_ids(self, cell_id: int):
+		""":return: ``(cell id, weight)`` of every connection leading into ``cell_id``, looked up in the reverse
+			:meth:`adjacency`."""
+		offsets, sources, weights = self.adjacency(reverse=True)
+		start, end = offsets[cell_id], offsets[cell_id + 1]
+		return list(zip(sources[start:end], weights[start:end]))
+
+	def connect_neighbours(self, weight=1):
+		with self.batch_topology_changes():
+			for y in range(self.height):
+				for x in range(self.width):
+					cell = self.grid[y][x]
+					for dx, dy in NEIGHBOUR_OFFSETS:
+						nx, ny = x + dx, y + dy
+						if 0 <= nx < self.width and 0 <= ny < self.height:
+							cell.add_connection(self.grid[ny][nx], weight)
+
 	def is_inside_grid(self, position: Position):
 		x, y = position.x, position.y
 		return 0 <= x < self.width and 0 <= y < self.height
@@ -74,35 +204,71 @@ class Grid:
 		return self.is_inside_grid(position) and not self.get_cell(position).has_robot()
 
 	def move_robots(self):
-		for row in self.grid:
-			for cell in row:
-				if cell.robot:
-					old_position = cell.robot.position
-					next_position = cell.robot.update_position(self)
-					if next_position == old_position:
-						cell.robot.change_status(Status.IDLE)
-					else:
-						cell.robot.change_status(Status.ACTIVE)
-						next_cell = self.get_cell(next_position)
-						if next_cell.has_package():
-							# TODO: Load while robot has capacity
-							cell.robot.load(package=next_cell.packages)
-						elif next_cell.has_goal():
-							cell.robot.unload(grid_manager=self)
+		for robot in self.active_robots():
+			old_position = robot.position
+			next_position = robot.update_position(self)
+			if next_position != old_position:
+				self.mark_dirty(old_position)
+				self.mark_dirty(next_position)
+				if self.get_cell(old_position).has_package():
+					# Packages this robot was standing on can be picked up by others again
+					self.wake_robots()
+
+			next_cell = self.get_cell(next_position)
+			if next_cell.has_package() and robot.can_load():
+				while next_cell.has_package() and robot.can_load():
+					robot.load(self.remove_package(next_position))
+			elif next_cell.has_goal():
+				robot.unload(grid_manager=self)
+
+	def mark_dirty(self, position: Position):
+		self.dirty_cells.add(position.y * self.width + position.x)
+
+	def take_dirty_cells(self):
+		"""Ids of the cells changed since the last call, clearing the dirty set."""
+		dirty, self.dirty_cells = self.dirty_cells, set()
+		return dirty
+
+	def robot_at(self, position: Position):
+		return self.get_cell(position).robot
+
+	def active_robots(self):
+		"""
+		Robots that are not dormant, in row-major order of their cells so every run steps them identically.
+
+		Costs O(robots), independent of the size of the grid.
+		"""
+		width = self.width
+		robots = [robot for robot in self.robots if robot not in self.dormant] if self.dormant else self.robots
+		return sorted(robots, key=lambda robot: robot.position.y * width + robot.position.x)
+
+	def sleep_robot(self, robot: Robot):
+		robot.change_status(Status.IDLE, self.tick)
+		self.dormant.add(robot)
+
+	def wake_robot(self, robot: Robot):
+		self.dormant.discard(robot)
+
+	def wake_robots(self):
+		self.dormant.clear()
 
 	def add_robot(self, position: Position, robot: Robot):
 		cell = self.get_cell(position)
 		if not cell.has_robot():
 			cell.add_robot(robot)
+			robot.status_changed_tick = self.tick
 			self.robots.append(robot)
 			self.robot_count += 1
+			self.mark_dirty(position)
 
 	def remove_robot(self, position: Position):
 		cell = self.get_cell(position)
 		if cell.has_robot():
+			self.robots.remove(cell.robot)
+			self.dormant.discard(cell.robot)
 			cell.robot = None
-			# lacks line to remove from grid's robot list
 			self.robot_count -= 1
+			self.mark_dirty(position)
 
 	def add_package(self, position: Position, package: Package):
 		cell = self.get_cell(position)
@@ -110,14 +276,26 @@ class Grid:
 			cell.add_package(package)
 			self.packages.append(package)
 			self.package_count += 1
+			self.mark_dirty(position)
+			self.watch_packages(position)
+			self.package_index.add(package)
+			self.wake_robots()
 
 	def remove_package(self, position: Position):
 		cell = self.get_cell(position)
 		if len(cell.packages) > 0:
-			# TODO: add logic to pop item (FIFO)
-			cell.package = None
-			# lacks line to remove from grid's packages list
+			package = cell.packages[0]
+			cell.remove_package(package)
+			self.packages.remove(package)
 			self.package_count -= 1
+			self.mark_dirty(position)
+			self.watch_packages(position)
+			self.package_index.discard(package)
+			return package
+
+	def watch_packages(self, position: Position):
+		for watcher in self.package_watchers:
+			watcher.add(position.y * self.width + position.x)
 
 	def add_goal(self, position: Position, goal: Goal):
 		cell = self.get_cell(position)
@@ -125,15 +303,29 @@ class Grid:
 			cell.add_goal(goal)
 			self.goals.append(goal)
 			self.goal_count += 1
+			self.mark_dirty(position)
+			self.goal_fields.add_goal(self.cell_id(position), goal)
+			self.wake_robots()
 
 	def remove_goal(self, position: Position):
 		cell = self.get_cell(position)
 		if cell.has_goal():
+			self.goals.remove(cell.goal)
 			cell.goal = None
-			# lacks line to remove from grid's goal list
 			self.goal_count -= 1
+			self.mark_dirty(position)
+			self.goal_fields.remove_goal(self.cell_id(position))
+
+	def nearest_goal(self, position: Position):
+		return self.goal_fields.nearest(self.cell_id(position))
 
 	def reset(self):
 		for row in self.grid:
 			for cell in row:
 				cell.reset()
+		self.goals, self.robots, self.packages = [], [], []
+		self.goal_count = self.robot_count = self.package_count = 0
+		self.dormant.clear()
+		self.dirty_cells.update(range(self.width * self.height))
+		self.goal_fields.clear()
+		self.package_index.clear()
@@ -1,4 +1,6 @@
 # gui.py
+import threading
+import time
 import tkinter as tk
 from tkinter import ttk
 
@@ -7,23 +9,52 @@ from src.robot import Robot
 from src.package import Package
 from src.goal import Goal
 from src.position import Position
+from src.replay import TracePlayer
+from src.sim import RateCounter, Simulation, SimulationLoop
 
 
 class GUI:
-    def __init__(self, grid: 'Grid'):
+    def __init__(self, grid: 'Grid', simulation: 'Simulation' = None, fps=30, tick_rate=10.0,
+                 player: 'TracePlayer' = None):
+        """
+        :param simulation: Simulation to step in the background, a default one of ``grid`` if not given.
+        :param fps: Maximum frames drawn per second.
+        :param tick_rate: Target simulation ticks per second, ``None`` for as fast as possible.
+        :param player: Trace to play back instead of simulating, ``grid`` is then ignored. See :meth:`playback`.
+        """
         self.root = tk.Tk()
         self.root.title("Warehouse Robot Simulation")
 
-        self.grid = grid
+        # In playback the player stands in for the grid: it has the size, the dirty cells and what each cell shows
+        self.player = player
+        self.grid = grid if player is None else player
+        # Held by the simulation thread for every tick and by the GUI whenever it reads or edits the grid
+        self.lock = threading.Lock()
+        self.simulation_loop = SimulationLoop(simulation or Simulation(grid), self.lock, tick_rate) \
+            if player is None else None
+        self.tick_rate = tick_rate or 10.0
+        # Wall-clock time and tick playback last started from, None while paused
+        self.playback_origin = None
+        self.frame_interval = max(1, round(1000 / fps))
+        self.frames = RateCounter()
         self.cell_size = 0
         self.current_action = None
         self.highlight_rect = None
+        self.canvas_size = None
+        # Canvas rectangle of every cell and text of the cells that showed something, by cell id
+        self.cell_items = {}
+        self.text_items = {}
 
         self.default_color = 'white'
 
         self.create_widgets()
         self.root.bind("<Configure>", self.on_resize)
 
+    @classmethod
+    def playback(cls, path, fps=30, tick_rate=10.0):
+        """A GUI replaying the trace file at ``path`` (see :class:`TraceRecorder`) without simulating."""
+        return cls(None, fps=fps, tick_rate=tick_rate, player=TracePlayer(path))
+
     def create_widgets(self):
         self.canvas = tk.Canvas(self.root, bg='white')
         self.canvas.grid(row=0, column=1, columnspan=3, sticky="nsew", padx=10, pady=10)
@@ -33,6 +64,10 @@ class GUI:
         self.left_frame = ttk.Frame(self.root)
         self.left_frame.grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
 
+        if self.player is not None:
+            self.create_playback_widgets()
+            return
+
         self.button_add_robot = ttk.Button(self.left_frame, text="Add Robot", command=self.prepare_add_robot)
         self.button_add_robot.pack(side="top", padx=5, pady=5)
 
@@ -42,10 +77,57 @@ class GUI:
         self.button_select_goal = ttk.Button(self.left_frame, text="Select Goal", command=self.prepare_add_goal)
         self.button_select_goal.pack(side="top", padx=5, pady=5)
 
+        self.button_play = ttk.Button(self.left_frame, text="Start", command=self.toggle_simulation)
+        self.button_play.pack(side="top", padx=5, pady=5)
+
+        self.counters = ttk.Label(self.left_frame, text="", justify="left")
+        self.counters.pack(side="top", padx=5, pady=5)
+
         self.root.grid_rowconfigure(0, weight=1)
         self.root.grid_columnconfigure(0, weight=1)
         self.root.grid_columnconfigure(1, weight=1)
 
+    def create_playback_widgets(self):
+        self.button_play = ttk.Button(self.left_frame, text="Play", command=self.toggle_playback)
+        self.button_play.pack(side="top", padx=5, pady=5)
+
+        self.seek_bar = ttk.Scale(self.left_frame, from_=self.player.first_tick, to=self.player.last_tick,
+                                  orient="horizontal", command=self.on_seek)
+        self.seek_bar.pack(side="top", fill="x", padx=5, pady=5)
+
+        self.counters = ttk.Label(self.left_frame, text="", justify="left")
+        self.counters.pack(side="top", padx=5, pady=5)
+
+        self.root.grid_rowconfigure(0, weight=1)
+        self.root.grid_columnconfigure(0, weight=1)
+        self.root.grid_columnconfigure(1, weight=1)
+
+    def toggle_playback(self):
+        if self.playback_origin is not None:
+            self.playback_origin = None
+            self.button_play.config(text="Play")
+        else:
+            if self.player.tick >= self.player.last_tick:
+                self.player.seek(self.player.first_tick)
+            self.playback_origin = (time.perf_counter(), self.player.tick)
+            self.button_play.config(text="Pause")
+
+    def on_seek(self, value):
+        tick = round(float(value))
+        if tick != self.player.tick:
+            self.player.seek(tick)
+            if self.playback_origin is not None:
+                self.playback_origin = (time.perf_counter(), self.player.tick)
+
+    def advance_playback(self):
+        started, tick = self.playback_origin
+        target = tick + int((time.perf_counter() - started) * self.tick_rate)
+        if target != self.player.tick:
+            self.player.seek(target)
+            self.seek_bar.set(self.player.tick)
+        if self.player.tick >= self.player.last_tick:
+            self.toggle_playback()
+
     def prepare_add_robot(self):
         self.current_action = 'add_robot'
         self.root.config(cursor="cross")
@@ -58,22 +140,35 @@ class GUI:
         self.current_action = 'add_goal'
         self.root.config(cursor="cross")
 
+    def toggle_simulation(self):
+        if self.simulation_loop.playing.is_set():
+            self.simulation_loop.pause()
+            self.button_play.config(text="Start")
+        else:
+            self.simulation_loop.play()
+            self.button_play.config(text="Pause")
+
     def on_canvas_click(self, event):
+        if self.player is not None:
+            return
         x = (event.x - self.padding_x) // self.cell_size
         y = (event.y - self.padding_y) // self.cell_size
         position = Position(x, y)
+        if not self.grid.is_inside_grid(position):
+            return
 
-        if self.current_action == 'add_robot':
-            robot = Robot(id=len(self.grid.robots), position=position)
-            self.grid.add_robot(position, robot)
+        with self.lock:
+            if self.current_action == 'add_robot':
+                robot = Robot(id=len(self.grid.robots), position=position)
+                self.grid.add_robot(position, robot)
 
-        elif self.current_action == 'add_package':
-            package = Package(id=len(self.grid.packages), position=position)
-            self.grid.add_package(position, package)
+            elif self.current_action == 'add_package':
+                package = Package(id=len(self.grid.packages), position=position)
+                self.grid.add_package(position, package)
 
-        elif self.current_action == 'add_goal':
-            goal = Goal(id=len(self.grid.goals), position=position)
-            self.grid.add_goal(position, goal)
+            elif self.current_action == 'add_goal':
+                goal = Goal(id=len(self.grid.goals), position=position)
+                self.grid.add_goal(position, goal)
 
         self.current_action = None
         self.root.config(cursor="")
@@ -111,44 +206,109 @@ class GUI:
             )
 
     def update_canvas(self):
-        self.canvas.delete("all")
+        """
+        Redraw the cells the grid marked dirty since the last frame, or everything after a resize.
+
+        The grid is read in one go while the simulation is between ticks; when a tick is in progress the frame is
+        skipped rather than waiting for it, so the event loop stays responsive.
+        """
         width = self.canvas.winfo_width()
         height = self.canvas.winfo_height()
+        rebuild = (width, height) != self.canvas_size or not self.cell_items
+        if not self.lock.acquire(blocking=False):
+            return False
+        try:
+            if rebuild:
+                self.grid.take_dirty_cells()
+                cells = range(self.grid.width * self.grid.height)
+            else:
+                cells = self.grid.take_dirty_cells()
+            snapshot = {cell_id: self.cell_appearance(cell_id) for cell_id in cells}
+        finally:
+            self.lock.release()
+
+        if rebuild:
+            self.rebuild_canvas(width, height)
+        for cell_id, (color, text) in snapshot.items():
+            if rebuild and not text:
+                continue
+            self.draw_cell(cell_id, color, text)
+        return True
+
+    def rebuild_canvas(self, width, height):
+        self.canvas.delete("all")
+        self.highlight_rect = None
+        self.cell_items = {}
+        self.text_items = {}
+        self.canvas_size = (width, height)
         self.cell_size = min(width // self.grid.width, height // self.grid.height)
 
         self.padding_x = (width - self.cell_size * self.grid.width) // 2
         self.padding_y = (height - self.cell_size * self.grid.height) // 2
 
-        for row in self.grid.grid:
-            for cell in row:
-                x1 = cell.position.x * self.cell_size + self.padding_x
-                y1 = cell.position.y * self.cell_size + self.padding_y
-                x2 = x1 + self.cell_size
-                y2 = y1 + self.cell_size
-
-                if cell.robot:
-                    self.canvas.create_rectangle(x1, y1, x2, y2, fill=Robot.color, outline="gray")
-                    self.canvas.create_text((x1 + x2) // 2,
-                                            (y1 + y2) // 2,
-                                            text=str(cell.robot.id),
-                                            fill=self.default_color)
-                elif cell.packages:
-                    self.canvas.create_rectangle(x1, y1, x2, y2, fill=Package.color, outline="gray")
-                    self.canvas.create_text((x1 + x2) // 2,
-                                            (y1 + y2) // 2,
-                                            text=str(len(cell.packages)),
-                                            fill=self.default_color)
-                elif cell.goal:
-                    self.canvas.create_rectangle(x1, y1, x2, y2, fill=Goal.color, outline="gray")
-                    self.canvas.create_text((x1 + x2) // 2,
-                                            (y1 + y2) // 2,
-                                            text=str(cell.goal.id),
-                                            fill=self.default_color)
-                else:
-                    self.canvas.create_rectangle(x1, y1, x2, y2, fill=self.default_color, outline="gray")
+        for y in range(self.grid.height):
+            for x in range(self.grid.width):
+                x1 = x * self.cell_size + self.padding_x
+                y1 = y * self.cell_size + self.padding_y
+                self.cell_items[y * self.grid.width + x] = self.canvas.create_rectangle(
+                    x1, y1, x1 + self.cell_size, y1 + self.cell_size, fill=self.default_color, outline="gray")
+
+    def cell_appearance(self, cell_id):
+        if self.player is not None:
+            robot_id, packages, goal_id = self.player.cell(cell_id)
+            if robot_id is not None:
+                return Robot.color, str(robot_id)
+            elif packages:
+                return Package.color, str(packages)
+            elif goal_id is not None:
+                return Goal.color, str(goal_id)
+            return self.default_color, ""
+
+        cell = self.grid.get_cell(self.grid.position_of(cell_id))
+        if cell.robot:
+            return Robot.color, str(cell.robot.id)
+        elif cell.packages:
+            return Package.color, str(len(cell.packages))
+        elif cell.goal:
+            return Goal.color, str(cell.goal.id)
+        return self.default_color, ""
+
+    def draw_cell(self, cell_id, color, text):
+        self.canvas.itemconfigure(self.cell_items[cell_id], fill=color)
+
+        # Text items are created the first time a cell shows something and blanked afterwards
+        text_item = self.text_items.get(cell_id)
+        if text_item is None and text:
+            x1, y1, x2, y2 = self.canvas.coords(self.cell_items[cell_id])
+            self.text_items[cell_id] = self.canvas.create_text((x1 + x2) // 2, (y1 + y2) // 2, text=text,
+                                                               fill=self.default_color)
+        elif text_item is not None:
+            self.canvas.itemconfigure(text_item, text=text)
+
+    def render_frame(self):
+        if self.player is not None and self.playback_origin is not None:
+            self.advance_playback()
+        if self.update_canvas():
+            self.frames.tick()
+        if self.player is not None:
+            self.counters.config(text=f"Tick: {self.player.tick}/{self.player.last_tick}\n"
+                                      f"Render: {self.frames.rate:.0f} FPS")
+        else:
+            self.counters.config(text=f"Sim: {self.simulation_loop.ticks.rate:.0f} ticks/s\n"
+                                      f"Render: {self.frames.rate:.0f} FPS")
+        self.root.after(self.frame_interval, self.render_frame)
 
     def on_resize(self, event):
-        self.update_canvas()
+        # <Configure> fires for every widget of the window, only a new canvas size needs a rebuild
+        if event.widget is self.canvas:
+            self.update_canvas()
 
     def run(self):
-        self.root.mainloop()
+        if self.simulation_loop is not None:
+            self.simulation_loop.start()
+        self.root.after(self.frame_interval, self.render_frame)
+        try:
+            self.root.mainloop()
+        finally:
+            if self.simulation_loop is not None:
+                self.simulation_loop.stop()
@@ -0,0 +1,335 @@
+# hierarchical_pathfinding.py
+import heapq
+from typing import TYPE_CHECKING, Iterable
+
+from src.grid import NEIGHBOUR_OFFSETS
+from src.pathfinding import INFINITY, Pathfinding
+
+if TYPE_CHECKING:
+    from src.grid import Grid
+
+
+class HierarchicalPathfinding:
+    """
+    Hierarchical path-finding A* (HPA*) over square clusters of cells.
+
+    Wherever two neighbouring clusters touch, every run of connected border cells is an entrance: the middle pair of
+    a short run, or both end pairs of a run of at least ``long_entrance`` cells, become abstract nodes joined by their
+    border connections. Inside a cluster the abstract nodes are joined by their travel cost within the cluster,
+    computed the first time the cluster is searched. A query links start and destination to the abstract nodes of
+    their clusters, runs A* on the resulting small graph, and the abstract path is refined into cells one cluster at
+    a time, only when :meth:`route` is advanced that far. Refined segments are cached per cluster.
+
+    The grid's ``topology_listeners`` report every changed cell. Only its cluster, plus the neighbouring cluster when
+    the cell lies on a shared border, are recomputed on the next query. Connections are expected between adjacent
+    cells only, as in every grid backend and map format of this project.
+
+    :ivar expanded: Nodes expanded by the last :meth:`abstract_path`, abstract and cell-level searches combined.
+    :ivar clusters_rebuilt: Clusters whose intra-cluster distances were dropped after topology changes.
+    """
+
+    def __init__(self, grid: 'Grid', cluster_size=16, long_entrance=6, flat_distance=None):
+        """
+        :param cluster_size: Side of a cluster in cells.
+        :param long_entrance: Length from which a run of border cells gets two entrances instead of one.
+        :param flat_distance: Queries shorter than this (Manhattan distance) run plain A* instead, one cluster side
+            by default.
+        """
+        self.grid = grid
+        self.cluster_size = cluster_size
+        self.long_entrance = long_entrance
+        self.flat_distance = cluster_size if flat_distance is None else flat_distance
+        self.columns = -(-grid.width // cluster_size)
+        self.rows = -(-grid.height // cluster_size)
+        self.pathfinding = Pathfinding(grid)
+        self.expanded = 0
+
+        # Abstract nodes and border connections of every border, keyed (cluster, cluster) with the smaller first
+        self.border_nodes = {}
+        self.border_edges = {}
+        # Abstract node -> {abstract node in a neighbouring cluster: weight}
+        self.inter = {}
+        # Cluster -> {abstract node: {abstract node: cost within the cluster}}, filled on first use
+        self.intra = {}
+        # Cluster -> {(from cell, to cell): cell ids}, refined segments
+        self.segments = {}
+        # Clusters whose inner connections and borders whose connections changed since the last query
+        self.dirty = set()
+        self.dirty_borders = set()
+        self.clusters_rebuilt = 0
+
+        self.build()
+        grid.topology_listeners.append(self.topology_changed)
+
+    def cluster_of(self, cell_id: int):
+        width = self.grid.width
+        return (cell_id // width // self.cluster_size) * self.columns + cell_id % width // self.cluster_size
+
+    def bounds(self, cluster: int):
+        size = self.cluster_size
+        x0, y0 = cluster % self.columns * size, cluster // self.columns * size
+        return x0, y0, min(x0 + size, self.grid.width), min(y0 + size, self.grid.height)
+
+    def borders(self, cluster: int):
+        x, y = cluster % self.columns, cluster // self.columns
+        borders = []
+        if x + 1 < self.columns:
+            borders.append((cluster, cluster + 1))
+        if y + 1 < self.rows:
+            borders.append((cluster, cluster + self.columns))
+        if x > 0:
+            borders.append((cluster - 1, cluster))
+        if y > 0:
+            borders.append((cluster - self.columns, cluster))
+        return borders
+
+    def nodes(self, cluster: int):
+        nodes = set()
+        for border in self.borders(cluster):
+            nodes.update(node for node in self.border_nodes.get(border, ()) if self.cluster_of(node) == cluster)
+        return nodes
+
+    def build(self):
+        """(Re)compute every entrance and drop all intra-cluster distances."""
+        self.border_nodes.clear()
+        self.border_edges.clear()
+        self.inter.clear()
+        self.intra.clear()
+        self.segments.clear()
+        self.dirty.clear()
+        self.dirty_borders.clear()
+        for cluster in range(self.columns * self.rows):
+            for border in self.borders(cluster):
+                if border[0] == cluster:
+                    self.build_border(border)
+
+    def build_border(self, border):
+        for u, v, _ in self.border_edges.pop(border, ()):
+            self.inter[u].pop(v, None)
+        self.border_nodes.pop(border, None)
+
+        a, b = border
+        x0, y0, x1, y1 = self.bounds(a)
+        width = self.grid.width
+        if a // self.columns == b // self.columns:
+            # Vertical border between clusters of the same row, pairs (x1 - 1, y) -> (x1, y)
+            pairs = [(y * width + x1 - 1, y * width + x1) for y in range(y0, y1)]
+        else:
+            pairs = [((y1 - 1) * width + x, y1 * width + x) for x in range(x0, x1)]
+
+        weights = []
+        for first, second in pairs:
+            forward = dict(self.grid.neighbour_ids(first)).get(second)
+            backward = dict(self.grid.neighbour_ids(second)).get(first)
+            weights.append((forward, backward) if forward is not None or backward is not None else None)
+
+        # Runs of pairs connected in the same directions, so one-way lanes keep entrances both ways
+        directions = [None if pair is None else (pair[0] is not None, pair[1] is not None) for pair in weights]
+        directions.append(None)
+        nodes, edges = set(), []
+        run_start = None
+        for index, direction in enumerate(directions):
+            if run_start is not None and direction != directions[run_start]:
+                length = index - run_start
+                chosen = {run_start, index - 1} if length >= self.long_entrance else {run_start + length // 2}
+                for chosen_index in chosen:
+                    first, second = pairs[chosen_index]
+                    forward, backward = weights[chosen_index]
+                    nodes.update((first, second))
+                    if forward is not None:
+                        edges.append((first, second, forward))
+                    if backward is not None:
+                        edges.append((second, first, backward))
+                run_start = None
+            if run_start is None and direction is not None:
+                run_start = index
+
+        self.border_nodes[border] = nodes
+        self.border_edges[border] = edges
+        for u, v, weight in edges:
+            self.inter.setdefault(u, {})[v] = weight
+
+    def topology_changed(self, cell_id):
+        if cell_id is None:
+            self.dirty.add(None)
+            return
+        cluster = self.cluster_of(cell_id)
+        self.dirty.add(cluster)
+        x, y = cell_id % self.grid.width, cell_id // self.grid.width
+        for dx, dy in NEIGHBOUR_OFFSETS:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < self.grid.width and 0 <= ny < self.grid.height:
+                other = self.cluster_of(ny * self.grid.width + nx)
+                if other != cluster:
+                    self.dirty_borders.add((min(cluster, other), max(cluster, other)))
+
+    def update(self):
+        """Recompute the changed borders and drop the cached distances of the clusters changed since the last query."""
+        if not self.dirty and not self.dirty_borders:
+            return
+        if None in self.dirty:
+            self.build()
+            self.clusters_rebuilt += self.columns * self.rows
+            return
+        for border in self.dirty_borders:
+            nodes, edges = self.border_nodes.get(border), self.border_edges.get(border)
+            self.build_border(border)
+            if nodes != self.border_nodes[border] or edges != self.border_edges[border]:
+                # Entrances moved on both sides of the border
+                self.dirty.update(border)
+        for cluster in self.dirty:
+            self.intra.pop(cluster, None)
+            self.segments.pop(cluster, None)
+        self.clusters_rebuilt += len(self.dirty)
+        self.dirty.clear()
+        self.dirty_borders.clear()
+
+    def search(self, source: int, cluster: int, targets: Iterable[int], reverse=False, parents=False):
+        """
+        Dijkstra from ``source`` that stays inside ``cluster`` and stops once every target is settled.
+
+        :param reverse: Follow connections backwards, giving the cost from each target to ``source``.
+        :param parents: Also return the parent of every settled cell.
+        :return: Target to travel cost for the reachable targets, and the parents when requested.
+        """
+        grid = self.grid
+        width = grid.width
+        x0, y0, x1, y1 = self.bounds(cluster)
+        remaining = set(targets)
+        distance = {source: 0}
+        came_from = {}
+        found = {}
+        open_set = [(0, source)]
+        while open_set and remaining:
+            current_distance, current = heapq.heappop(open_set)
+            if current_distance > distance[current]:
+                continue
+            self.expanded += 1
+            if current in remaining:
+                remaining.discard(current)
+                found[current] = current_distance
+            for neighbour, weight in (grid.incoming_ids(current) if reverse else grid.neighbour_ids(current)):
+                x, y = neighbour % width, neighbour // width
+                if not (x0 <= x < x1 and y0 <= y < y1):
+                    continue
+                tentative_distance = current_distance + weight
+                if tentative_distance < distance.get(neighbour, INFINITY):
+                    distance[neighbour] = tentative_distance
+                    came_from[neighbour] = current
+                    heapq.heappush(open_set, (tentative_distance, neighbour))
+        return (found, came_from) if parents else found
+
+    def intra_edges(self, cluster: int):
+        edges = self.intra.get(cluster)
+        if edges is None:
+            nodes = self.nodes(cluster)
+            edges = {node: self.search(node, cluster, nodes - {node}) for node in nodes}
+            self.intra[cluster] = edges
+        return edges
+
+    def abstract_path(self, start: int, destination: int):
+        """
+        :return: Cell ids of the abstract path from ``start`` to ``destination``, both included, or an empty list if
+            the abstract graph does not connect them.
+        """
+        self.update()
+        self.expanded = 0
+        start_cluster, destination_cluster = self.cluster_of(start), self.cluster_of(destination)
+        start_nodes = self.nodes(start_cluster)
+        start_edges = self.search(start, start_cluster, (start_nodes | {destination}) - {start})
+        # Cost from every node of the destination's cluster to the destination
+        destination_edges = self.search(destination, destination_cluster, self.nodes(destination_cluster) - {destination},
+                                        reverse=True)
+
+        width = self.grid.width
+        destination_x, destination_y = destination % width, destination // width
+
+        def h(cell):
+            return abs(cell % width - destination_x) + abs(cell // width - destination_y)
+
+        g_score = {start: 0}
+        came_from = {}
+        open_set = [(h(start), 0, start)]
+        closed = set()
+        while open_set:
+            _, g, current = heapq.heappop(open_set)
+            if current in closed:
+                continue
+            if current == destination:
+                path = [current]
+                while current in came_from:
+                    current = came_from[current]
+                    path.append(current)
+                path.reverse()
+                return path
+            closed.add(current)
+            self.expanded += 1
+
+            if current == start:
+                edges = list(start_edges.items())
+            else:
+                edges = list(self.intra_edges(self.cluster_of(current)).get(current, {}).items())
+                if current in destination_edges:
+                    edges.append((destination, destination_edges[current]))
+            edges.extend(self.inter.get(current, {}).items())
+            for neighbour, weight in edges:
+                tentative_g = g + weight
+                if neighbour not in closed and tentative_g < g_score.get(neighbour, INFINITY):
+                    g_score[neighbour] = tentative_g
+                    came_from[neighbour] = current
+                    heapq.heappush(open_set, (tentative_g + h(neighbour), tentative_g, neighbour))
+        return []
+
+    def refine(self, first: int, second: int):
+        """Cell ids after ``first`` up to ``second`` for one step of an abstract path."""
+        if second in self.inter.get(first, ()):
+            return [second]
+        cluster = self.cluster_of(first)
+        cache = self.segments.setdefault(cluster, {})
+        segment = cache.get((first, second))
+        if segment is None:
+            found, came_from = self.search(first, cluster, {second}, parents=True)
+            if second not in found:
+                return []
+            segment = [second]
+            while segment[-1] in came_from:
+                segment.append(came_from[segment[-1]])
+            segment = segment[-2::-1]
+            # Only segments between entrances are worth keeping, start and destination cells rarely repeat
+            nodes = self.intra.get(cluster, {})
+            if first in nodes and second in nodes:
+                cache[(first, second)] = segment
+        return list(segment)
+
+    def route(self, start: int, checkpoints: Iterable[int]):
+        """
+        Lazily yield the path from ``start`` through ``checkpoints`` as lists of cell ids, one refined segment at a
+        time. Each leg is searched when the previous one is used up; the generator stops early at an unreachable
+        checkpoint.
+        """
+        current = start
+        for checkpoint in checkpoints:
+            x, y = current % self.grid.width, current // self.grid.width
+            if abs(x - checkpoint % self.grid.width) + abs(y - checkpoint // self.grid.width) < self.flat_distance:
+                path = self.pathfinding.a_star_ids(current, checkpoint)
+                if not path:
+                    return
+                if len(path) > 1:
+                    yield path[1:]
+            else:
+                abstract = self.abstract_path(current, checkpoint)
+                if not abstract:
+                    return
+                for first, second in zip(abstract, abstract[1:]):
+                    segment = self.refine(first, second)
+                    if not segment:
+                        return
+                    yield segment
+            current = checkpoint
+
+    def find_path(self, start: int, destination: int):
+        """Fully refined path from ``start`` to ``destination`` (both included), or an empty list if unreachable."""
+        path = [start]
+        for segment in self.route(start, [destination]):
+            path.extend(segment)
+        return path if path[-1] == destination else []
@@ -0,0 +1,120 @@
+# implicit_grid.py
+import numpy as np
+
+from src.array_grid import ArrayGrid
+from src.grid import NEIGHBOUR_OFFSETS
+
+INFINITY = float('inf')
+ALL_BLOCKED = (1 << len(NEIGHBOUR_OFFSETS)) - 1
+
+
+class ImplicitGrid(ArrayGrid):
+    """
+    :class:`ArrayGrid` whose 4-neighbourhood is implicit: neighbours follow from the coordinates, and only edges that
+    differ from plain floor are stored.
+
+    ``blocked`` holds one byte per cell with bit ``d`` set when there is no edge in direction ``NEIGHBOUR_OFFSETS[d]``,
+    and ``weight_overrides`` maps ``cell_id * 4 + d`` to the weight of every edge that is not ``default_weight``. A
+    uniform floor costs one byte per cell instead of four float32 weights (or four ``Connection`` objects).
+    """
+
+    def init_topology(self, weights=None):
+        self.default_weight = 1.0
+        self.weight_overrides = {}
+        self.blocked = bytearray([ALL_BLOCKED]) * (self.width * self.height)
+        # (direction, id step) of the open edges for every mask value
+        self.open_steps = [tuple((direction, step) for direction, step in enumerate(self.id_steps)
+                                 if not mask >> direction & 1) for mask in range(ALL_BLOCKED + 1)]
+        if weights is not None:
+            self.load_weights(np.asarray(weights))
+
+    def load_weights(self, weights):
+        """Take over a dense ``(4, cells)`` weight array, ``inf`` marking missing edges."""
+        finite = weights != np.inf
+        mask = np.zeros(self.width * self.height, dtype=np.uint8)
+        for direction in range(len(NEIGHBOUR_OFFSETS)):
+            mask |= (~finite[direction]).astype(np.uint8) << direction
+        self.blocked[:] = mask.tobytes()
+
+        values, counts = np.unique(weights[finite], return_counts=True)
+        self.default_weight = float(values[np.argmax(counts)]) if len(values) else 1.0
+        directions, cell_ids = np.nonzero(finite & (weights != self.default_weight))
+        self.weight_overrides = {cell_id * 4 + direction: float(weights[direction, cell_id])
+                                 for direction, cell_id in zip(directions.tolist(), cell_ids.tolist())}
+        self.topology_changed()
+
+    @property
+    def weights(self):
+        """Dense float32 copy of the edge weights, in the layout of :class:`ArrayGrid`."""
+        weights = np.full((len(NEIGHBOUR_OFFSETS), self.width * self.height), self.default_weight, dtype=np.float32)
+        blocked = self.blocked_mask()
+        for direction in range(len(NEIGHBOUR_OFFSETS)):
+            weights[direction, (blocked >> direction & 1).astype(bool)] = np.inf
+        for key, weight in self.weight_overrides.items():
+            weights[key % 4, key // 4] = weight
+        return weights
+
+    def blocked_mask(self):
+        return np.frombuffer(self.blocked, dtype=np.uint8)
+
+    def neighbour_ids(self, cell_id: int):
+        open_steps = self.open_steps[self.blocked[cell_id]]
+        overrides = self.weight_overrides
+        if not overrides:
+            weight = self.default_weight
+            return [(cell_id + step, weight) for _, step in open_steps]
+        default = self.default_weight
+        key = cell_id * 4
+        return [(cell_id + step, overrides.get(key + direction, default)) for direction, step in open_steps]
+
+    def edge_arrays(self):
+        blocked = self.blocked_mask()
+        overrides = [[] for _ in NEIGHBOUR_OFFSETS]
+        for key, weight in self.weight_overrides.items():
+            overrides[key % 4].append((key // 4, weight))
+
+        sources, targets, weights = [], [], []
+        for direction, step in enumerate(self.id_steps):
+            cell_ids = np.flatnonzero((blocked >> direction & 1) == 0)
+            edge_weights = np.full(len(cell_ids), self.default_weight)
+            if overrides[direction]:
+                override_ids, override_weights = zip(*overrides[direction])
+                edge_weights[np.searchsorted(cell_ids, override_ids)] = override_weights
+            sources.append(cell_ids)
+            targets.append(cell_ids + step)
+            weights.append(edge_weights)
+        return np.concatenate(sources), np.concatenate(targets), np.concatenate(weights)
+
+    def set_edge_weight(self, from_id: int, to_id: int, weight):
+        direction = self.direction_between(from_id, to_id)
+        key = from_id * 4 + direction
+        had_edge = not self.blocked[from_id] >> direction & 1
+        if weight == INFINITY:
+            self.blocked[from_id] |= 1 << direction
+            self.weight_overrides.pop(key, None)
+        else:
+            self.blocked[from_id] &= ALL_BLOCKED ^ (1 << direction)
+            if weight == self.default_weight:
+                self.weight_overrides.pop(key, None)
+            else:
+                self.weight_overrides[key] = float(weight)
+        self.topology_changed(from_id)
+        return had_edge
+
+    def connect_neighbours(self, weight=1):
+        # Only the borders stay blocked
+        mask = np.zeros((self.height, self.width), dtype=np.uint8)
+        for direction, (dx, dy) in enumerate(NEIGHBOUR_OFFSETS):
+            if dx:
+                mask[:, 0 if dx < 0 else -1] |= 1 << direction
+            if dy:
+                mask[0 if dy < 0 else -1, :] |= 1 << direction
+        self.blocked[:] = mask.tobytes()
+        self.default_weight = float(weight)
+        self.weight_overrides = {}
+        self.topology_changed()
+
+    def nbytes(self):
+        # Each override is a dict entry: roughly a key, a float and the hash table slot
+        return (self.occupancy.nbytes + self.goal_ids.nbytes + self.package_counts.nbytes + self.max_load.nbytes +
+                len(self.blocked) + 100 * len(self.weight_overrides))
@@ -0,0 +1,296 @@
+# incremental_replanning.py
+import heapq
+from typing import TYPE_CHECKING, Iterable, List
+
+from src.pathfinding import INFINITY, Pathfinding
+
+if TYPE_CHECKING:
+    from src.grid import Grid
+    from src.robot import Robot
+
+
+class DStarLite:
+    """
+    D* Lite (Koenig and Likhachev) from a moving start to a fixed destination.
+
+    The search runs backwards from the destination, so ``g[cell]`` is the cost from the cell to the destination and
+    stays valid while the start moves along the path. After connections change, :meth:`update` marks the affected
+    cells inconsistent and :meth:`compute` re-expands only those whose costs actually change on the way to the start.
+    Cells in ``blocked`` are treated as impassable, e.g. while another robot sits on them.
+
+    :ivar expanded: Cells expanded by the last :meth:`compute`.
+    """
+
+    def __init__(self, grid: 'Grid', start: int, destination: int, max_states=None):
+        """
+        :param max_states: Cells the search may hold state for before :meth:`compute` gives up.
+        """
+        self.grid = grid
+        self.start = start
+        self.destination = destination
+        self.max_states = max_states
+        self.blocked = set()
+        self.km = 0
+        self.g = {}
+        self.rhs = {destination: 0}
+        key = (self.h(destination), 0)
+        # Heap entries are stale unless their key is still the one recorded in open_keys
+        self.open_keys = {destination: key}
+        self.open_set = [(key, destination)]
+        self.expanded = 0
+
+    def h(self, cell: int):
+        width = self.grid.width
+        return abs(cell % width - self.start % width) + abs(cell // width - self.start // width)
+
+    def key(self, cell: int):
+        best = min(self.g.get(cell, INFINITY), self.rhs.get(cell, INFINITY))
+        return best + self.h(cell) + self.km, best
+
+    def successors(self, cell: int):
+        return [(neighbour, weight) for neighbour, weight in self.grid.neighbour_ids(cell)
+                if neighbour not in self.blocked]
+
+    def predecessors(self, cell: int):
+        return self.grid.incoming_ids(cell)
+
+    def update_vertex(self, cell: int):
+        # :return: Whether the cell is (still) inconsistent and queued
+        if cell != self.destination:
+            g = self.g
+            rhs = min((weight + g.get(neighbour, INFINITY) for neighbour, weight in self.successors(cell)),
+                      default=INFINITY)
+            if rhs != INFINITY or cell in self.rhs:
+                self.rhs[cell] = rhs
+        if self.g.get(cell, INFINITY) != self.rhs.get(cell, INFINITY):
+            key = self.key(cell)
+            self.open_keys[cell] = key
+            heapq.heappush(self.open_set, (key, cell))
+            return True
+        self.open_keys.pop(cell, None)
+        return False
+
+    def top(self):
+        open_set, open_keys = self.open_set, self.open_keys
+        while open_set:
+            key, cell = open_set[0]
+            if open_keys.get(cell) == key:
+                return key, cell
+            heapq.heappop(open_set)
+        return (INFINITY, INFINITY), None
+
+    def compute(self):
+        """
+        Bring the costs up to date for the current start.
+
+        :return: False if the search needed state for more than ``max_states`` cells, and is no longer usable.
+        """
+        g, rhs = self.g, self.rhs
+        self.expanded = 0
+        while True:
+            key, cell = self.top()
+            start = self.start
+            if cell is None or not (key < self.key(start) or rhs.get(start, INFINITY) != g.get(start, INFINITY)):
+                return True
+            if self.max_states is not None and len(rhs) > self.max_states:
+                return False
+            new_key = self.key(cell)
+            if key < new_key:
+                # The start moved since the cell was queued
+                self.open_keys[cell] = new_key
+                heapq.heapreplace(self.open_set, (new_key, cell))
+                continue
+            heapq.heappop(self.open_set)
+            del self.open_keys[cell]
+            self.expanded += 1
+            if g.get(cell, INFINITY) > rhs[cell]:
+                g[cell] = rhs[cell]
+            else:
+                g.pop(cell, None)
+                self.update_vertex(cell)
+            for predecessor, _ in self.predecessors(cell):
+                self.update_vertex(predecessor)
+
+    def path(self):
+        """:return: Cell ids from the start to the destination (both included), empty if unreachable."""
+        g = self.g
+        if g.get(self.start, INFINITY) == INFINITY:
+            return []
+        cell = self.start
+        path = [cell]
+        seen = {cell}
+        while cell != self.destination:
+            cost, cell = min(((weight + g.get(neighbour, INFINITY), neighbour)
+                              for neighbour, weight in self.successors(cell)), default=(INFINITY, None))
+            if cost == INFINITY or cell in seen:
+                return []
+            path.append(cell)
+            seen.add(cell)
+        return path
+
+    def move_to(self, cell: int):
+        """Move the start, keeping every queued key a valid lower bound."""
+        self.km += self.h(cell)
+        self.start = cell
+
+    def update(self, cells: Iterable[int]):
+        """
+        Mark the cells whose outgoing connections changed.
+
+        :return: Whether any of them became inconsistent, so :meth:`compute` has work to do.
+        """
+        inconsistent = False
+        for cell in cells:
+            inconsistent |= self.update_vertex(cell)
+        return inconsistent
+
+    def block(self, cell: int):
+        predecessors = self.predecessors(cell)
+        self.blocked.add(cell)
+        self.update(predecessor for predecessor, _ in predecessors)
+
+    def unblock(self, cell: int):
+        self.blocked.discard(cell)
+        self.update(predecessor for predecessor, _ in self.predecessors(cell))
+
+
+class IncrementalReplanner:
+    """
+    Repairs the active leg of every robot with a :class:`DStarLite` search kept for that leg, instead of planning the
+    robot's whole route again from scratch.
+
+    Robots record the length of every leg of their path in ``Robot.legs``, and the first one is the active leg. The
+    grid's ``topology_listeners`` report the cells whose connections changed. On the next :meth:`repair`, a robot
+    whose active leg lost a connection gets that leg repaired. A robot with a live search also picks up new
+    shortcuts. A later leg that broke is dropped, and is planned again when the robot reaches the end of the active
+    leg. A robot blocked by another robot for ``patience`` ticks treats that cell as impassable for the rest of the
+    leg, and takes the detour if it is at most ``max_detour`` steps longer.
+
+    A search that needs state for more than ``max_states`` cells is dropped, and that leg is planned with A* instead.
+
+    :ivar stats: ``repairs`` and ``repair_expanded`` for repairs that reused a search, ``searches`` and
+        ``search_expanded`` for searches started from scratch, ``fallbacks`` to A* after the memory cap was hit,
+        ``unreachable`` legs and ``detours`` taken around blocking robots. With ``compare``, ``full_expanded`` holds
+        what a fresh search would have expanded for each of the repairs.
+    """
+
+    def __init__(self, grid: 'Grid', max_states=4096, patience=3, max_detour=8, compare=False):
+        """
+        :param max_states: Cells each robot's search may hold state for.
+        :param patience: Ticks a robot waits behind another robot before looking for a detour.
+        :param max_detour: Extra steps a detour may take.
+        :param compare: Also run a fresh search for every repair, for :meth:`expansion_ratio`.
+        """
+        self.grid = grid
+        self.max_states = max_states
+        self.patience = patience
+        self.max_detour = max_detour
+        self.compare = compare
+        self.pathfinding = Pathfinding(grid)
+        self.searches = {}
+        # Cells whose connections changed since the last repair, None for any cell
+        self.changed = set()
+        self.stats = {"repairs": 0, "repair_expanded": 0, "searches": 0, "search_expanded": 0, "full_expanded": 0,
+                      "fallbacks": 0, "unreachable": 0, "detours": 0}
+        grid.topology_listeners.append(self.topology_changed)
+
+    def topology_changed(self, cell_id):
+        if cell_id is None or self.changed is None:
+            self.changed = None
+        else:
+            self.changed.add(cell_id)
+
+    def expansion_ratio(self):
+        """Cells re-expanded by repairs per cell a fresh search expands for the same legs, with ``compare`` set."""
+        if not self.stats["full_expanded"]:
+            return 0.0
+        return self.stats["repair_expanded"] / self.stats["full_expanded"]
+
+    def repair(self, robots: List['Robot']):
+        """Repair the paths of ``robots`` after topology changes or when they are stuck, before they plan."""
+        changed, self.changed = self.changed, set()
+        if changed is None:
+            self.searches.clear()
+        for robot in robots:
+            self.repair_robot(robot, changed)
+
+    def broken(self, cells, changed):
+        neighbour_ids = self.grid.neighbour_ids
+        for current, following in zip(cells, cells[1:]):
+            if current != following and (changed is None or current in changed) and \
+                    following not in dict(neighbour_ids(current)):
+                return True
+        return False
+
+    def repair_robot(self, robot: 'Robot', changed):
+        grid = self.grid
+        if not robot.legs:
+            self.searches.pop(robot.id, None)
+            return
+        leg = robot.legs[0]
+        cells = [grid.cell_id(robot.position)] + [grid.cell_id(position) for position in robot.path]
+        start, destination = cells[0], cells[leg]
+        search = self.searches.get(robot.id)
+        if search is not None and search.destination != destination:
+            # A new leg
+            del self.searches[robot.id]
+            search = None
+
+        outdated = False
+        if changed is None or changed:
+            if self.broken(cells[leg:], changed):
+                del robot.path[leg:]
+                del robot.legs[1:]
+            if search is not None:
+                outdated = search.update(changed)
+            else:
+                outdated = self.broken(cells[:leg + 1], changed)
+        blocker = cells[1] if robot.blocked_times == self.patience and cells[1] != destination and \
+            grid.get_cell(robot.path[0]).has_robot() else None
+        if blocker is None and not outdated:
+            return
+
+        fresh = search is None
+        if fresh:
+            search = DStarLite(grid, start, destination, self.max_states)
+        else:
+            search.move_to(start)
+        if blocker is not None:
+            search.block(blocker)
+        if not search.compute():
+            self.searches.pop(robot.id, None)
+            self.stats["fallbacks"] += 1
+            if blocker is None:
+                self.replace_leg(robot, self.pathfinding.a_star_ids(start, destination), leg)
+            return
+        self.searches[robot.id] = search
+        self.stats["searches" if fresh else "repairs"] += 1
+        self.stats["search_expanded" if fresh else "repair_expanded"] += search.expanded
+        path = search.path()
+        if self.compare and not fresh:
+            full = DStarLite(grid, start, destination)
+            full.blocked = set(search.blocked)
+            full.compute()
+            self.stats["full_expanded"] += full.expanded
+
+        if blocker is not None:
+            if not path or len(path) - 1 > leg + self.max_detour:
+                # Rather keep waiting
+                search.unblock(blocker)
+                return
+            self.stats["detours"] += 1
+            robot.blocked_times = 0
+        self.replace_leg(robot, path, leg)
+
+    def replace_leg(self, robot: 'Robot', path, leg):
+        if not path:
+            # The checkpoint can no longer be reached, plan the whole route again
+            self.stats["unreachable"] += 1
+            self.searches.pop(robot.id, None)
+            robot.clear_path()
+            return
+        robot.path[:leg] = [self.grid.position_of(cell_id) for cell_id in path[1:]]
+        if len(path) > 1:
+            robot.legs[0] = len(path) - 1
+        else:
+            robot.legs.pop(0)
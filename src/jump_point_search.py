@@ -0,0 +1,250 @@
+# jump_point_search.py
+import heapq
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from src.grid import Grid
+
+INFINITY = float('inf')
+CACHE_KEY = "jump_points"
+# Right, left, down, up as (dx, dy), matching the rows of the JPS+ distance table
+DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+
+
+def uniform_cost_mask(grid: 'Grid'):
+    """
+    Check whether ``grid`` is a uniform-cost grid map Jump Point Search can run on: every connection has the same
+    weight and joins adjacent cells, and two adjacent cells are connected (both ways) exactly when both have any
+    connection at all.
+
+    :return: ``(open_cells, weight)`` with a bool array marking the cells that have connections, or ``None`` if the
+        grid does not qualify.
+    """
+    width, height = grid.width, grid.height
+    sources, targets, weights = grid.edge_arrays()
+    if len(weights) == 0 or weights.min() != weights.max():
+        return None
+    open_cells = np.zeros(width * height, dtype=bool)
+    open_cells[sources] = True
+    open_cells[targets] = True
+    cells = open_cells.reshape(height, width)
+
+    actual = np.zeros((len(DIRECTIONS), width * height), dtype=bool)
+    expected = np.zeros((len(DIRECTIONS), height, width), dtype=bool)
+    steps = targets - sources
+    matched = 0
+    for direction, (dx, dy) in enumerate(DIRECTIONS):
+        # A step of +-1 must stay in the row, which the x coordinates tell
+        edges = (steps == dy * width + dx) & (targets % width - sources % width == dx)
+        actual[direction, sources[edges]] = True
+        matched += int(edges.sum())
+        rows = slice(max(0, -dy), height - max(0, dy))
+        columns = slice(max(0, -dx), width - max(0, dx))
+        neighbours = cells[max(0, dy):height - max(0, -dy), max(0, dx):width - max(0, -dx)]
+        expected[direction, rows, columns] = cells[rows, columns] & neighbours
+    if matched != len(weights) or not np.array_equal(actual, expected.reshape(len(DIRECTIONS), -1)):
+        return None
+    return open_cells, float(weights[0])
+
+
+class JumpPointSearch:
+    """
+    Jump Point Search on a 4-connected uniform-cost grid.
+
+    Instead of pushing every neighbour, a search scans straight lines and only stops at jump points: the destination,
+    cells with a forced neighbour (a side cell that opens up right after a blocked one), and, on vertical scans,
+    cells from which a horizontal scan finds a jump point. All the symmetric equivalent paths A* would expand are
+    skipped, and the jump points are expanded back into a cell-by-cell path.
+
+    With ``plus`` the jump distances of every cell in every direction are precomputed (JPS+), vectorized row by row
+    and column by column, so a scan becomes a table lookup.
+
+    Use :meth:`for_grid`, which checks the map with :func:`uniform_cost_mask` and keeps one instance per topology
+    version in the grid's ``adjacency_cache``.
+    """
+
+    def __init__(self, width: int, height: int, open_cells, weight=1.0):
+        self.width = width
+        self.height = height
+        self.weight = weight
+        self.open = bytearray(open_cells.astype(np.uint8).tobytes())
+        self.open_cells = open_cells
+        self.distances = None
+        self.expanded = 0
+
+    @classmethod
+    def for_grid(cls, grid: 'Grid'):
+        """:return: The search for the grid's current topology, or ``None`` if the grid does not qualify."""
+        cached = grid.adjacency_cache.get(CACHE_KEY)
+        if cached is not None and cached[0] == grid.topology_version:
+            return cached[1]
+        qualified = uniform_cost_mask(grid)
+        search = cls(grid.width, grid.height, *qualified) if qualified is not None else None
+        grid.adjacency_cache[CACHE_KEY] = (grid.topology_version, search)
+        return search
+
+    def walkable(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height and self.open[y * self.width + x]
+
+    def jump_horizontal(self, x, y, dx, destination):
+        walkable = self.walkable
+        while walkable(x, y):
+            if (x, y) == destination:
+                return x, y
+            if (walkable(x, y - 1) and not walkable(x - dx, y - 1)) or \
+                    (walkable(x, y + 1) and not walkable(x - dx, y + 1)):
+                return x, y
+            x += dx
+        return None
+
+    def jump_vertical(self, x, y, dy, destination):
+        walkable = self.walkable
+        while walkable(x, y):
+            if (x, y) == destination:
+                return x, y
+            if (walkable(x - 1, y) and not walkable(x - 1, y - dy)) or \
+                    (walkable(x + 1, y) and not walkable(x + 1, y - dy)):
+                return x, y
+            if self.jump_horizontal(x + 1, y, 1, destination) or self.jump_horizontal(x - 1, y, -1, destination):
+                return x, y
+            y += dy
+        return None
+
+    def precompute(self):
+        """
+        Fill the JPS+ table: ``distances[d, cell]`` is ``k > 0`` when a scan from ``cell`` in direction
+        ``DIRECTIONS[d]`` stops at a jump point ``k`` steps away, or ``-k`` when it runs into a wall after ``k`` steps.
+        """
+        width, height = self.width, self.height
+        cells = np.zeros((height + 2, width + 2), dtype=bool)
+        cells[1:-1, 1:-1] = self.open_cells.reshape(height, width)
+        distances = np.zeros((len(DIRECTIONS), height, width), dtype=np.int32)
+
+        def shifted(dx, dy):
+            # cells[y + dy, x + dx] for every (x, y) of the map, walls outside
+            return cells[1 + dy:height + 1 + dy, 1 + dx:width + 1 + dx]
+
+        here = shifted(0, 0)
+        up, down = shifted(0, -1), shifted(0, 1)
+        # Horizontal jump points: a vertical side cell opens up right after a blocked one
+        forced_from = {dx: (up & ~shifted(-dx, -1)) | (down & ~shifted(-dx, 1)) for dx in (1, -1)}
+        for direction, (dx, _) in enumerate(DIRECTIONS[:2]):
+            forced = here & forced_from[dx]
+            self.scan(distances[direction].T, here.T, forced.T, reverse=dx > 0)
+
+        left, right = shifted(-1, 0), shifted(1, 0)
+        horizontal = (distances[0] > 0) | (distances[1] > 0)
+        for direction, (_, dy) in enumerate(DIRECTIONS[2:], start=2):
+            forced = here & (((left & ~shifted(-1, -dy)) | (right & ~shifted(1, -dy))) | horizontal)
+            self.scan(distances[direction], here, forced, reverse=dy > 0)
+        self.distances = distances.reshape(len(DIRECTIONS), -1)
+
+    @staticmethod
+    def scan(distances, walkable, jump_point, reverse):
+        # Sweep the rows of these 2-D views from the far end back, one vectorized row at a time
+        rows = range(len(walkable) - 2, -1, -1) if reverse else range(1, len(walkable))
+        step = 1 if reverse else -1
+        for row in rows:
+            following = row + step
+            result = np.where(distances[following] > 0, distances[following] + 1, distances[following] - 1)
+            result = np.where(jump_point[following], 1, result)
+            distances[row] = np.where(walkable[following], result, 0)
+
+    def successors(self, x, y, directions, destination, distances=None):
+        # (x, y, steps) of the next jump point in each direction, scanned or looked up in the JPS+ ``distances``
+        destination_x, destination_y = destination
+        for dx, dy in directions:
+            if distances is None:
+                found = self.jump_horizontal(x + dx, y, dx, destination) if dx \
+                    else self.jump_vertical(x, y + dy, dy, destination)
+                if found is not None:
+                    yield found[0], found[1], abs(found[0] - x) + abs(found[1] - y)
+                continue
+
+            distance = int(distances[DIRECTIONS.index((dx, dy)), y * self.width + x])
+            reach = abs(distance)
+            if dx:
+                ahead = (destination_x - x) * dx
+                if destination_y == y and 0 < ahead <= reach:
+                    yield destination_x, y, ahead
+                    continue
+            else:
+                ahead = (destination_y - y) * dy
+                if 0 < ahead <= reach:
+                    # The destination's row is on the way: turn there (the destination itself if in this column)
+                    yield x, destination_y, ahead
+                    continue
+            if distance > 0:
+                yield x + dx * distance, y + dy * distance, distance
+
+    def search(self, start: int, destination: int, plus=False):
+        """
+        :param plus: Use (and on first use compute) the JPS+ distance table.
+        :return: Cell ids from start to destination (both included), or an empty list if unreachable.
+        """
+        if plus and self.distances is None:
+            self.precompute()
+        distances = self.distances if plus else None
+
+        width = self.width
+        self.expanded = 0
+        if start == destination:
+            return [start]
+        if not self.open[start] or not self.open[destination]:
+            return []
+        goal = (destination % width, destination // width)
+
+        def h(x, y):
+            return abs(x - goal[0]) + abs(y - goal[1])
+
+        start_xy = (start % width, start // width)
+        g_score = {start_xy: 0}
+        came_from = {}
+        open_set = [(h(*start_xy), 0, start_xy)]
+        closed = set()
+        while open_set:
+            _, negative_g, node = heapq.heappop(open_set)
+            if node in closed:
+                continue
+            if node == goal:
+                return self.expand(came_from, node)
+            closed.add(node)
+            self.expanded += 1
+            x, y = node
+            parent = came_from.get(node)
+            if parent is None:
+                directions = DIRECTIONS
+            elif parent[1] == y:
+                dx = 1 if x > parent[0] else -1
+                directions = ((dx, 0), (0, 1), (0, -1))
+            else:
+                dy = 1 if y > parent[1] else -1
+                directions = ((0, dy), (1, 0), (-1, 0))
+
+            g = -negative_g
+            for nx, ny, steps in self.successors(x, y, directions, goal, distances):
+                successor = (nx, ny)
+                tentative_g = g + steps
+                if successor not in closed and tentative_g < g_score.get(successor, INFINITY):
+                    g_score[successor] = tentative_g
+                    came_from[successor] = node
+                    heapq.heappush(open_set, (tentative_g + h(nx, ny), -tentative_g, successor))
+        return []
+
+    def expand(self, came_from, node):
+        # Jump points are aligned with their parent, fill in the straight runs between them
+        width = self.width
+        path = [node[1] * width + node[0]]
+        while node in came_from:
+            parent = came_from[node]
+            dx = (parent[0] > node[0]) - (parent[0] < node[0])
+            dy = (parent[1] > node[1]) - (parent[1] < node[1])
+            x, y = node
+            while (x, y) != parent:
+                x, y = x + dx, y + dy
+                path.append(y * width + x)
+            node = parent
+        path.reverse()
+        return path
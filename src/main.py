@@ -1,8 +1,14 @@
 # main.py
+import sys
+
 from gui import GUI
 from src.grid import Grid
 
 if __name__ == "__main__":
-    grid = Grid(15, 15)
-    app = GUI(grid)
+    if len(sys.argv) > 1:
+        # Play back a trace recorded with Simulation(grid, trace=...)
+        app = GUI.playback(sys.argv[1])
+    else:
+        grid = Grid(15, 15)
+        app = GUI(grid)
     app.run()
@@ -0,0 +1,269 @@
+# map_format.py
+import json
+import struct
+
+import numpy as np
+
+from src.array_grid import ArrayGrid
+from src.goal import Goal
+from src.grid import Grid, NEIGHBOUR_OFFSETS
+from src.package import Package
+from src.position import Position
+from src.robot import Robot
+
+MAGIC = b"WMAP"
+VERSION = 1
+# magic, version, flags, width, height, robot count, goal count, package count
+HEADER = struct.Struct("<4sHHIIIII")
+HEADER_SIZE = 64
+ALIGNMENT = 64
+
+ROBOT_DTYPE = np.dtype([("cell", "<u4"), ("id", "<i8"), ("max_packages", "<i4")])
+GOAL_DTYPE = np.dtype([("cell", "<u4"), ("id", "<i8")])
+PACKAGE_DTYPE = np.dtype([("cell", "<u4"), ("id", "<i8")])
+
+
+class MapData:
+    """
+    Contents of a binary map file.
+
+    ``max_load`` holds one int32 capacity per cell and ``weights`` one float32 row per direction of
+    ``NEIGHBOUR_OFFSETS`` (``inf`` where there is no edge), the layout :class:`ArrayGrid` uses. ``robots``, ``goals``
+    and ``packages`` are sparse record arrays keyed by cell id.
+    """
+
+    def __init__(self, width, height, max_load, weights, robots, goals, packages):
+        self.width = width
+        self.height = height
+        self.max_load = max_load
+        self.weights = weights
+        self.robots = robots
+        self.goals = goals
+        self.packages = packages
+
+
+def open_cell_weights(open_cells):
+    """
+    Edges of weight 1 joining every pair of adjacent open cells, the way :meth:`Grid.connect_neighbours` does.
+
+    :param open_cells: ``(height, width)`` boolean array, ``True`` for a cell robots may enter.
+    :return: ``(len(NEIGHBOUR_OFFSETS), height, width)`` float32 array; ``[d, y, x]`` is the weight of the edge from
+        ``(x, y)`` to ``(x + dx, y + dy)``, ``inf`` unless both cells are inside the map and open. Reshape it to
+        ``(len(NEIGHBOUR_OFFSETS), width * height)`` for :class:`MapData`.
+    """
+    height, width = open_cells.shape
+    weights = np.full((len(NEIGHBOUR_OFFSETS), height, width), np.inf, dtype=np.float32)
+    for direction, (dx, dy) in enumerate(NEIGHBOUR_OFFSETS):
+        rows = slice(max(0, -dy), height - max(0, dy))
+        columns = slice(max(0, -dx), width - max(0, dx))
+        neighbours = open_cells[max(0, dy):height - max(0, -dy), max(0, dx):width - max(0, -dx)]
+        weights[direction, rows, columns] = np.where(open_cells[rows, columns] & neighbours, 1.0, np.inf)
+    return weights
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _layout(width, height, robots, goals, packages):
+    # Byte offset of every section, each aligned so the arrays can be mapped directly
+    size = width * height
+    sections = [("max_load", np.dtype("<i4"), (size,)),
+                ("weights", np.dtype("<f4"), (len(NEIGHBOUR_OFFSETS), size)),
+                ("robots", ROBOT_DTYPE, (robots,)),
+                ("goals", GOAL_DTYPE, (goals,)),
+                ("packages", PACKAGE_DTYPE, (packages,))]
+    layout = {}
+    offset = HEADER_SIZE
+    for name, dtype, shape in sections:
+        offset = _align(offset)
+        layout[name] = (offset, dtype, shape)
+        offset += dtype.itemsize * int(np.prod(shape))
+    return layout, offset
+
+
+def write_map(data: MapData, path):
+    """Write ``data`` to ``path`` in the binary map format."""
+    layout, end = _layout(data.width, data.height, len(data.robots), len(data.goals), len(data.packages))
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, data.width, data.height,
+                            len(data.robots), len(data.goals), len(data.packages)).ljust(HEADER_SIZE, b"\0"))
+        for name, (offset, dtype, shape) in layout.items():
+            f.seek(offset)
+            f.write(np.ascontiguousarray(getattr(data, name), dtype=dtype).reshape(shape).tobytes())
+        f.truncate(end)
+
+
+def read_map(path, mmap=True):
+    """
+    Read a binary map file.
+
+    :param mmap: Memory-map ``max_load`` and ``weights`` copy-on-write instead of reading them: opening is
+        almost instant whatever the map size, pages are read on first access and changes never reach the file.
+    :raises ValueError: If the file is not a binary map or has an unsupported version.
+    """
+    with open(path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+    if len(header) < HEADER.size or header[:4] != MAGIC:
+        raise ValueError(f"{path} is not a binary map file")
+    _, version, _, width, height, robots, goals, packages = HEADER.unpack_from(header)
+    if version != VERSION:
+        raise ValueError(f"Unsupported map format version {version}, expected {VERSION}")
+
+    layout, _ = _layout(width, height, robots, goals, packages)
+    arrays = {}
+    for name, (offset, dtype, shape) in layout.items():
+        count = int(np.prod(shape))
+        if mmap and name in ("max_load", "weights") and count:
+            arrays[name] = np.memmap(path, dtype=dtype, mode="c", offset=offset, shape=shape)
+        else:
+            arrays[name] = np.fromfile(path, dtype=dtype, count=count, offset=offset).reshape(shape)
+    return MapData(width, height, **arrays)
+
+
+def _add_entities(grid, data: MapData):
+    for record in data.goals.tolist():
+        position = grid.position_of(record[0])
+        grid.add_goal(position, Goal(record[1], position))
+    for record in data.robots.tolist():
+        position = grid.position_of(record[0])
+        grid.add_robot(position, Robot(record[1], position, max_packages=record[2]))
+    for record in data.packages.tolist():
+        position = grid.position_of(record[0])
+        grid.add_package(position, Package(record[1], position))
+
+
+def load_map(path, grid_class=ArrayGrid, mmap=True):
+    """
+    Load a binary map into a grid.
+
+    With :class:`ArrayGrid` (the default) the grid uses the file's arrays directly, memory-mapped unless ``mmap``
+    is false. Any other :class:`Grid` class gets its cells and connections built from them.
+    """
+    return grid_from_map_data(read_map(path, mmap), grid_class)
+
+
+def grid_from_map_data(data: MapData, grid_class=ArrayGrid):
+    """
+    Build a grid from map data, e.g. a generated map, without going through a file.
+
+    An :class:`ArrayGrid` uses ``data``'s arrays as its storage; any other :class:`Grid` class gets cells and
+    connections built from them.
+    """
+    if issubclass(grid_class, ArrayGrid):
+        grid = grid_class(data.width, data.height, max_load=data.max_load, weights=data.weights)
+        _add_entities(grid, data)
+        return grid
+
+    grid = grid_class(data.width, data.height)
+    width = data.width
+    # One topology change for the whole map rather than one per connection
+    with grid.batch_topology_changes():
+        for cell_id, max_load in enumerate(data.max_load.tolist()):
+            grid.grid[cell_id // width][cell_id % width].max_load = max_load
+        for direction, (dx, dy) in enumerate(NEIGHBOUR_OFFSETS):
+            row = data.weights[direction]
+            for cell_id in np.flatnonzero(row != np.inf).tolist():
+                x, y = cell_id % width, cell_id // width
+                grid.grid[y][x].add_connection(grid.grid[y + dy][x + dx], row[cell_id].item())
+        _add_entities(grid, data)
+    return grid
+
+
+def grid_to_map_data(grid: Grid):
+    """
+    Capture the topology and entities of ``grid``.
+
+    :raises ValueError: If a connection joins cells that are not direct neighbours.
+    """
+    size = grid.width * grid.height
+    if isinstance(grid, ArrayGrid):
+        weights = np.array(grid.weights, dtype=np.float32)
+        max_load = np.array(grid.max_load, dtype=np.int32)
+    else:
+        weights = np.full((len(NEIGHBOUR_OFFSETS), size), np.inf, dtype=np.float32)
+        max_load = np.array([cell.max_load for row in grid.grid for cell in row], dtype=np.int32)
+        sources, targets, edge_weights = grid.edge_arrays()
+        offsets = list(zip((targets % grid.width - sources % grid.width).tolist(),
+                           (targets // grid.width - sources // grid.width).tolist()))
+        invalid = set(offsets) - set(NEIGHBOUR_OFFSETS)
+        if invalid:
+            raise ValueError(f"The binary map format only supports connections between adjacent cells, "
+                             f"got {min(invalid)}")
+        directions = np.array([NEIGHBOUR_OFFSETS.index(offset) for offset in offsets], dtype=np.int64)
+        weights[directions, sources] = edge_weights
+
+    def records(items, dtype, *fields):
+        return np.array([(grid.cell_id(item.position), item.id) + tuple(getattr(item, f) for f in fields)
+                         for item in items], dtype=dtype)
+
+    return MapData(grid.width, grid.height, max_load, weights,
+                   records(grid.robots, ROBOT_DTYPE, "max_packages"),
+                   records(grid.goals, GOAL_DTYPE),
+                   records([p for p in grid.packages if not p.moving], PACKAGE_DTYPE))
+
+
+def save_map(grid: Grid, path):
+    write_map(grid_to_map_data(grid), path)
+
+
+def json_to_binary(json_path, binary_path):
+    """Convert a map written by ``map_generator.generate_grid`` (or in the ``Grid.grid_from_json`` format)."""
+    with open(json_path) as f:
+        data = json.load(f)
+    width, height = data["width"], data["height"]
+    size = width * height
+    max_load = np.full(size, 10, dtype=np.int32)
+    weights = np.full((len(NEIGHBOUR_OFFSETS), size), np.inf, dtype=np.float32)
+    robots, goals, packages = [], [], []
+
+    for item in data["cells"]:
+        x, y = item["position"]["x"], item["position"]["y"]
+        cell_id = y * width + x
+        max_load[cell_id] = item.get("maxLoad", item.get("max_load", 10))
+        for connection in item["connections"]:
+            to_cell = connection.get("toCell", connection.get("to_cell"))
+            offset = (to_cell["x"] - x, to_cell["y"] - y)
+            if offset not in NEIGHBOUR_OFFSETS:
+                raise ValueError(f"The binary map format only supports connections between adjacent cells, "
+                                 f"got {offset}")
+            weights[NEIGHBOUR_OFFSETS.index(offset), cell_id] = connection["weight"]
+        if item.get("robot") is not None:
+            robots.append((cell_id, item["robot"]["id"], item["robot"].get("max_packages", 5)))
+        if item.get("goal") is not None:
+            goals.append((cell_id, item["goal"]["id"]))
+        for package in item.get("packages", []):
+            packages.append((cell_id, package["id"]))
+
+    write_map(MapData(width, height, max_load, weights, np.array(robots, dtype=ROBOT_DTYPE),
+                      np.array(goals, dtype=GOAL_DTYPE), np.array(packages, dtype=PACKAGE_DTYPE)), binary_path)
+
+
+def binary_to_json(binary_path, json_path):
+    """Convert a binary map to the JSON format written by ``map_generator.generate_grid``."""
+    data = read_map(binary_path, mmap=False)
+    width = data.width
+    robots = {record[0]: record for record in data.robots.tolist()}
+    goals = {record[0]: record for record in data.goals.tolist()}
+    packages = {}
+    for cell_id, package_id in data.packages.tolist():
+        packages.setdefault(cell_id, []).append({"id": package_id})
+
+    weights = data.weights.tolist()
+    cells = []
+    for cell_id, max_load in enumerate(data.max_load.tolist()):
+        x, y = cell_id % width, cell_id // width
+        robot, goal = robots.get(cell_id), goals.get(cell_id)
+        cells.append({
+            "position": {"x": x, "y": y},
+            "connections": [{"toCell": {"x": x + dx, "y": y + dy}, "weight": weights[direction][cell_id]}
+                            for direction, (dx, dy) in enumerate(NEIGHBOUR_OFFSETS)
+                            if weights[direction][cell_id] != float("inf")],
+            "robot": {"id": robot[1], "max_packages": robot[2]} if robot else None,
+            "goal": {"id": goal[1]} if goal else None,
+            "maxLoad": max_load,
+            "packages": packages.get(cell_id, []),
+        })
+
+    with open(json_path, "w") as f:
+        json.dump({"width": data.width, "height": data.height, "cells": cells}, f)
@@ -0,0 +1,148 @@
+# warehouse.py
+import argparse
+
+import numpy as np
+
+from src.grid import NEIGHBOUR_OFFSETS
+from src.map_format import GOAL_DTYPE, PACKAGE_DTYPE, ROBOT_DTYPE, MapData, open_cell_weights, write_map
+
+LEFT, RIGHT, UP, DOWN = (NEIGHBOUR_OFFSETS.index(offset) for offset in ((-1, 0), (1, 0), (0, -1), (0, 1)))
+
+
+class WarehouseLayout(MapData):
+    """
+    A generated warehouse: :class:`MapData` plus the masks the layout was built from.
+
+    ``shelves``, ``lanes`` and ``faces`` are flat boolean arrays over the cells: shelving (no connections), the
+    aisle cells between shelves and the open cells next to a shelf where packages are stored. ``stations`` and
+    ``bays`` are the cell ids of the pick stations (the goals) and the charging bays (where robots start).
+    """
+
+    def __init__(self, width, height, max_load, weights, robots, goals, packages, shelves, lanes, faces, bays):
+        super().__init__(width, height, max_load, weights, robots, goals, packages)
+        self.shelves = shelves
+        self.lanes = lanes
+        self.faces = faces
+        self.stations = goals["cell"]
+        self.bays = bays
+
+
+def _spread(count, width, name):
+    # ``count`` distinct columns spread evenly between the border roads
+    columns = np.unique(np.linspace(1, width - 2, count).round().astype(np.int64))
+    if len(columns) < count:
+        raise ValueError(f"{count} {name} do not fit along a {width} cells wide wall")
+    return columns
+
+
+def generate_warehouse(width, height, seed=0, aisle_width=1, shelf_depth=1, block_length=20, cross_aisle_width=2,
+                       one_way=True, stations=8, robots=50, charging_bays=None, packages_per_robot=10, max_load=10,
+                       max_packages=5):
+    """
+    A seeded ``width`` x ``height`` warehouse built with array operations only, fast enough for millions of cells.
+
+    The top row holds charging bays and the bottom row pick stations, each an alcove off a two-way road along the
+    wall; roads also run down both sides. Between them, blocks of ``block_length`` rows of shelving are cut by
+    cross-aisles ``cross_aisle_width`` rows wide. Inside a block, racks two shelves of ``shelf_depth`` deep back to
+    back alternate with aisles ``aisle_width`` wide. With ``one_way`` the aisles are one-way lanes, alternately down
+    and up, entered and left through the roads and cross-aisles, which stay two-way so every open cell can reach
+    every other.
+
+    Robots start in the first ``robots`` charging bays (``charging_bays`` defaults to one per robot). Packages,
+    ``packages_per_robot`` for each robot and at most ``max_load`` per cell, are stored on random shelf faces.
+
+    :raises ValueError: If the map is too small for the layout or the stations, bays or packages do not fit.
+    """
+    if width < 3 or height < 5:
+        raise ValueError(f"A warehouse needs at least 3x5 cells, got {width}x{height}")
+    if min(aisle_width, shelf_depth, block_length, cross_aisle_width) < 1:
+        raise ValueError("Aisles, shelves, blocks and cross-aisles must be at least one cell")
+    charging_bays = robots if charging_bays is None else charging_bays
+    if robots > charging_bays:
+        raise ValueError(f"{robots} robots need as many charging bays, got {charging_bays}")
+    rng = np.random.default_rng(seed)
+
+    ys = np.arange(height)[:, None]
+    xs = np.arange(width)[None, :]
+    # Storage lies between the wall roads: rows 2 .. height - 3 and columns 1 .. width - 2
+    storage = (ys >= 2) & (ys <= height - 3) & (xs >= 1) & (xs <= width - 2)
+    shelf_rows = (ys - 2) % (block_length + cross_aisle_width) < block_length
+    period = 2 * shelf_depth + aisle_width
+    aisle_columns = (xs - 1) % period >= 2 * shelf_depth
+    shelves = storage & shelf_rows & ~aisle_columns
+    lanes = storage & shelf_rows & aisle_columns
+
+    station_columns = _spread(stations, width, "pick stations")
+    bay_columns = _spread(charging_bays, width, "charging bays")
+    open_cells = ~shelves
+    open_cells[0] = open_cells[-1] = False
+    open_cells[0, bay_columns] = open_cells[-1, station_columns] = True
+
+    weights = open_cell_weights(open_cells)
+    # Alcoves only open onto the road
+    weights[[LEFT, RIGHT], 0] = weights[[LEFT, RIGHT], -1] = np.inf
+    if one_way:
+        down = lanes & ((xs - 1) // period % 2 == 0)
+        up = lanes & ~down
+        # No edge leads against a lane's direction, neither inside it nor into it from the road it leads to
+        against_down = down.copy()
+        against_down[1:] |= down[:-1]
+        against_up = up.copy()
+        against_up[:-1] |= up[1:]
+        weights[UP][against_down] = np.inf
+        weights[DOWN][against_up] = np.inf
+
+    # Open cells next to a shelf
+    faces = np.zeros_like(shelves)
+    faces[1:] |= shelves[:-1]
+    faces[:-1] |= shelves[1:]
+    faces[:, 1:] |= shelves[:, :-1]
+    faces[:, :-1] |= shelves[:, 1:]
+    faces &= open_cells
+
+    goal_records = np.zeros(len(station_columns), dtype=GOAL_DTYPE)
+    goal_records["cell"], goal_records["id"] = (height - 1) * width + station_columns, np.arange(len(station_columns))
+    robot_records = np.zeros(robots, dtype=ROBOT_DTYPE)
+    robot_records["cell"], robot_records["id"], robot_records["max_packages"] = bay_columns[:robots], \
+        np.arange(robots), max_packages
+
+    face_cells = np.flatnonzero(faces)
+    package_count = packages_per_robot * robots
+    if package_count > len(face_cells) * max_load:
+        raise ValueError(f"{package_count} packages do not fit on {len(face_cells)} shelf faces")
+    # Each face offers ``max_load`` slots, drawn without replacement
+    slots = rng.choice(len(face_cells) * max_load, size=package_count, replace=False)
+    package_records = np.zeros(package_count, dtype=PACKAGE_DTYPE)
+    package_records["cell"], package_records["id"] = np.sort(face_cells[slots // max_load]), np.arange(package_count)
+
+    cells = width * height
+    return WarehouseLayout(width, height, np.full(cells, max_load, dtype=np.int32),
+                           weights.reshape(len(NEIGHBOUR_OFFSETS), cells), robot_records, goal_records,
+                           package_records, shelves.reshape(-1), lanes.reshape(-1), faces.reshape(-1),
+                           bay_columns.astype(np.uint32))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a warehouse layout as a binary map file.")
+    parser.add_argument("width", type=int)
+    parser.add_argument("height", type=int)
+    parser.add_argument("output", help="path of the binary map file, load it with map_format.load_map")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--robots", type=int, default=50)
+    parser.add_argument("--stations", type=int, default=8)
+    parser.add_argument("--charging-bays", type=int)
+    parser.add_argument("--packages-per-robot", type=int, default=10)
+    parser.add_argument("--aisle-width", type=int, default=1)
+    parser.add_argument("--shelf-depth", type=int, default=1)
+    parser.add_argument("--block-length", type=int, default=20)
+    parser.add_argument("--cross-aisle-width", type=int, default=2)
+    parser.add_argument("--two-way", action="store_true", help="make the aisles two-way")
+    args = parser.parse_args(argv)
+    layout = generate_warehouse(args.width, args.height, args.seed, args.aisle_width, args.shelf_depth,
+                                args.block_length, args.cross_aisle_width, not args.two_way, args.stations,
+                                args.robots, args.charging_bays, args.packages_per_robot)
+    write_map(layout, args.output)
+
+
+if __name__ == "__main__":
+    main()
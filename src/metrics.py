@@ -0,0 +1,154 @@
+# metrics.py
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from src.robot import Status
+
+if TYPE_CHECKING:
+    from src.grid import Grid
+
+# Column of each status in FleetMetrics.status_ticks
+STATUS_CODES = {status: code for code, status in enumerate(Status)}
+ACTIVE = STATUS_CODES[Status.ACTIVE]
+BLOCKED = STATUS_CODES[Status.BLOCKED]
+
+
+def _grow(array, size):
+    # Double the first dimension until ``size`` fits, keeping the contents
+    if size <= len(array):
+        return array
+    grown = np.zeros((max(size, 2 * len(array)),) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class FleetMetrics:
+    """
+    Per-robot and per-tick counters of a simulation, kept in preallocated NumPy arrays that double when full.
+
+    :meth:`record` runs once per tick and reads every robot's position, status and load in one pass. The counters are
+    updated with array operations, so no Python objects are created per robot or per tick. Robots are identified by
+    their ``id``. Robots added to the grid later get the next free slot.
+
+    :ivar status_ticks: ``(robots, len(Status))`` ticks each robot spent in each status, columns in ``STATUS_CODES``
+        order.
+    :ivar moves: Ticks each robot moved to another cell.
+    :ivar waits: Ticks each robot was ``BLOCKED`` behind another robot.
+    :ivar deliveries: Packages each robot unloaded at a goal.
+    :ivar delivered: Packages delivered in each recorded tick.
+    :ivar wait_runs: Lengths of the completed stretches robots spent ``BLOCKED``.
+    """
+
+    def __init__(self, grid: 'Grid', robots=64, ticks=1024, waits=1024):
+        """
+        :param robots: Robot slots to preallocate.
+        :param ticks: Ticks to preallocate.
+        :param waits: Wait stretches to preallocate.
+        """
+        self.grid = grid
+        self.robots = []
+        self.slot_of = {}
+        self.slots = np.zeros(0, dtype=np.int64)
+        self.status_ticks = np.zeros((robots, len(STATUS_CODES)), dtype=np.int64)
+        self.moves = np.zeros(robots, dtype=np.int64)
+        self.waits = np.zeros(robots, dtype=np.int64)
+        self.deliveries = np.zeros(robots, dtype=np.int64)
+        # Cell, load and current stretch of BLOCKED ticks as of the last record
+        self.cells = np.zeros(robots, dtype=np.int64)
+        self.carried = np.zeros(robots, dtype=np.int64)
+        self.wait_run = np.zeros(robots, dtype=np.int64)
+        self.delivered = np.zeros(ticks, dtype=np.int64)
+        self.ticks = 0
+        self.wait_runs = np.zeros(waits, dtype=np.int64)
+        self.wait_run_count = 0
+        self.register(grid.robots)
+
+    def register(self, robots):
+        width = self.grid.width
+        for robot in robots:
+            if robot.id not in self.slot_of:
+                slot = len(self.slot_of)
+                self.slot_of[robot.id] = slot
+                for name in ("status_ticks", "moves", "waits", "deliveries", "cells", "carried", "wait_run"):
+                    setattr(self, name, _grow(getattr(self, name), slot + 1))
+                self.cells[slot] = robot.position.y * width + robot.position.x
+                self.carried[slot] = len(robot.packages)
+        self.robots = list(robots)
+        self.slots = np.array([self.slot_of[robot.id] for robot in robots], dtype=np.int64)
+
+    def record(self):
+        """Count the tick that just ran for every robot on the grid."""
+        robots = self.grid.robots
+        if robots != self.robots:
+            self.register(robots)
+        width = self.grid.width
+        state = np.fromiter((value for robot in robots for value in (
+            robot.position.y * width + robot.position.x, STATUS_CODES[robot.status], len(robot.packages))),
+            dtype=np.int64, count=3 * len(robots)).reshape(-1, 3)
+        slots = self.slots
+        cells, codes, carried = state[:, 0], state[:, 1], state[:, 2]
+
+        self.status_ticks[slots, codes] += 1
+        self.moves[slots] += cells != self.cells[slots]
+        self.cells[slots] = cells
+        # Loads only drop when a robot unloads at a goal
+        unloaded = np.maximum(self.carried[slots] - carried, 0)
+        self.deliveries[slots] += unloaded
+        self.carried[slots] = carried
+
+        waiting = codes == BLOCKED
+        self.waits[slots] += waiting
+        runs = self.wait_run[slots]
+        ended = runs[~waiting & (runs > 0)]
+        if len(ended):
+            self.wait_runs = _grow(self.wait_runs, self.wait_run_count + len(ended))
+            self.wait_runs[self.wait_run_count:self.wait_run_count + len(ended)] = ended
+            self.wait_run_count += len(ended)
+        self.wait_run[slots] = np.where(waiting, runs + 1, 0)
+
+        self.delivered = _grow(self.delivered, self.ticks + 1)
+        self.delivered[self.ticks] = unloaded.sum()
+        self.ticks += 1
+
+    def status_totals(self):
+        """:return: Robot-ticks spent in each status, in ``STATUS_CODES`` order."""
+        return self.status_ticks.sum(axis=0)
+
+    def utilization(self, per_robot=False):
+        """Share of recorded robot-ticks spent ``ACTIVE``, for the fleet or as an array in slot order."""
+        ticks = self.status_ticks[:len(self.slot_of)]
+        if per_robot:
+            totals = ticks.sum(axis=1)
+            return np.divide(ticks[:, ACTIVE], totals, out=np.zeros(len(totals)), where=totals > 0)
+        total = ticks.sum()
+        return float(ticks[:, ACTIVE].sum() / total) if total else 0.0
+
+    def throughput(self, window=None):
+        """Packages delivered per tick, over the last ``window`` ticks or the whole run."""
+        start = 0 if window is None else max(0, self.ticks - window)
+        ticks = self.ticks - start
+        return float(self.delivered[start:self.ticks].sum() / ticks) if ticks else 0.0
+
+    def wait_percentiles(self, percentiles=(50, 90, 99)):
+        """:return: Percentiles of the completed stretches robots waited behind another robot, in ticks."""
+        runs = self.wait_runs[:self.wait_run_count]
+        if not len(runs):
+            return np.zeros(len(percentiles))
+        return np.percentile(runs, percentiles)
+
+    def summary(self):
+        p50, p90, p99 = self.wait_percentiles()
+        robots = len(self.slot_of)
+        return {
+            "ticks": self.ticks,
+            "robots": robots,
+            "utilization": self.utilization(),
+            "throughput": self.throughput(),
+            "moves": int(self.moves[:robots].sum()),
+            "waits": int(self.waits[:robots].sum()),
+            "deliveries": int(self.deliveries[:robots].sum()),
+            "wait_p50": float(p50),
+            "wait_p90": float(p90),
+            "wait_p99": float(p99),
+        }
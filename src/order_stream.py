@@ -0,0 +1,242 @@
+# order_stream.py
+from collections import deque
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from src.package import Package
+
+if TYPE_CHECKING:
+    from src.grid import Grid
+
+# Origin of an order that may appear on any of the stream's origin cells
+ANY_CELL = -1
+
+
+class PoissonArrivals:
+    """Orders arriving independently at ``rate`` per tick on average."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+
+    def arrivals(self, tick: int, rng: np.random.Generator):
+        """:return: Origin cell of every order arriving in ``tick``, ``ANY_CELL`` to let the stream pick one."""
+        return np.full(rng.poisson(self.rate), ANY_CELL, dtype=np.int64)
+
+
+class BurstyArrivals:
+    """
+    Poisson arrivals whose rate switches between a calm ``rate`` and a ``burst_rate``, a two-state Markov-modulated
+    Poisson process. Calm stretches last ``calm_ticks`` and bursts ``burst_ticks`` on average.
+    """
+
+    def __init__(self, rate: float, burst_rate: float, calm_ticks=200, burst_ticks=20):
+        self.rate = rate
+        self.burst_rate = burst_rate
+        self.calm_ticks = calm_ticks
+        self.burst_ticks = burst_ticks
+        self.bursting = False
+
+    def arrivals(self, tick: int, rng: np.random.Generator):
+        if rng.random() < 1 / (self.burst_ticks if self.bursting else self.calm_ticks):
+            self.bursting = not self.bursting
+        return np.full(rng.poisson(self.burst_rate if self.bursting else self.rate), ANY_CELL, dtype=np.int64)
+
+
+class TraceArrivals:
+    """
+    Orders replayed from a trace file of ``tick`` or ``tick,x,y`` lines, one per order (``#`` starts a comment).
+    Orders without a position appear on a random origin cell. Ticks count from the tick the stream starts at.
+
+    :raises ValueError: If the lines have another number of columns, a tick is negative or a position is outside
+        the ``width`` x ``height`` grid.
+    """
+
+    def __init__(self, path, width: int, height: int):
+        rows = np.loadtxt(path, delimiter=",", comments="#", dtype=np.int64, ndmin=2)
+        if rows.size and rows.shape[1] not in (1, 3):
+            raise ValueError(f"Expected tick or tick,x,y lines in {path}, got {rows.shape[1]} columns")
+        invalid = rows[:, 0] < 0
+        if rows.shape[1] == 3:
+            invalid |= (rows[:, 1] < 0) | (rows[:, 1] >= width) | (rows[:, 2] < 0) | (rows[:, 2] >= height)
+        if invalid.any():
+            row = int(np.argmax(invalid))
+            values = ",".join(map(str, rows[row].tolist()))
+            raise ValueError(f"Order {row + 1} of {path} ({values}) has a negative tick or lies outside the "
+                             f"{width}x{height} grid")
+        order = np.argsort(rows[:, 0], kind="stable")
+        self.ticks = rows[order, 0]
+        self.cells = rows[order, 2] * width + rows[order, 1] if rows.shape[1] == 3 \
+            else np.full(len(rows), ANY_CELL, dtype=np.int64)
+        self.start = None
+
+    def arrivals(self, tick: int, rng: np.random.Generator):
+        if self.start is None:
+            self.start = tick
+        first, last = np.searchsorted(self.ticks, [tick - self.start, tick - self.start + 1])
+        return self.cells[first:last]
+
+
+class OrderStream:
+    """
+    Turns an arrival process into packages added to the grid as the simulation runs.
+
+    Every tick, :meth:`feed` queues the orders that arrive in a FIFO backlog of at most ``capacity`` orders; orders
+    arriving when it is full are rejected. It then releases queued orders, oldest first, onto their cells with
+    ``Grid.add_package`` as long as the cell's ``max_load`` allows, so orders wait instead of being dropped by a
+    full cell. With ``max_outstanding``, orders also wait while that many released orders await delivery.
+    :meth:`collect` spots released packages delivered to a goal and records their latency: ticks from arrival to
+    delivery.
+
+    Statistics are running totals and a histogram of latencies, so a stream's memory does not grow with the number
+    of ticks or orders.
+
+    :ivar latency_counts: Deliveries by latency in ticks.
+    """
+
+    def __init__(self, grid: 'Grid', arrivals, origins=None, capacity=1000, max_outstanding=None, seed=None):
+        """
+        :param arrivals: Arrival process, e.g. :class:`PoissonArrivals`, :class:`BurstyArrivals` or
+            :class:`TraceArrivals`.
+        :param origins: Cell ids orders without a position appear on, by default every connected cell without a
+            goal.
+        :param capacity: Maximum length of the backlog.
+        :param max_outstanding: Maximum number of released orders not delivered yet, ``None`` for no limit.
+        :param seed: Seed of the generator arrivals and origins are drawn from, until :meth:`reseed`
+            (``Simulation.run`` reseeds it with its own seed).
+        :raises ValueError: If there are no origins.
+        """
+        self.grid = grid
+        self.arrivals = arrivals
+        self.capacity = capacity
+        self.max_outstanding = max_outstanding
+        self.rng = np.random.default_rng(seed)
+        if origins is None:
+            goal_cells = [grid.cell_id(goal.position) for goal in grid.goals]
+            origins = np.setdiff1d(grid.edge_arrays()[0], goal_cells)
+        self.origins = np.asarray(origins, dtype=np.int64)
+        if not len(self.origins):
+            raise ValueError("An order stream needs at least one origin cell, the grid has no connected cell without "
+                             "a goal")
+        # Continue after the ids of the packages already in the simulation
+        existing = [package.id for package in grid.packages]
+        existing += [package.id for holder in grid.robots + grid.goals for package in holder.packages]
+        self.next_id = max(existing, default=-1) + 1
+
+        self.backlog = deque()
+        self.arrived_at = {}
+        self.delivered_seen = {}
+        self.orders = 0
+        self.rejected = 0
+        self.released = 0
+        self.delivered = 0
+        self.ticks = 0
+        self.feeds = 0
+        self.backlog_total = 0
+        self.max_backlog = 0
+        self.wait_total = 0
+        self.latency_counts = []
+
+    def reseed(self, seed):
+        """Draw arrivals and origins from a new generator seeded with ``seed``, e.g. the seed of a run."""
+        self.rng = np.random.default_rng(seed)
+
+    def feed(self, tick: int):
+        """Queue the orders arriving in ``tick`` and release what the cells can hold."""
+        cells = self.arrivals.arrivals(tick, self.rng)
+        if len(cells):
+            anywhere = cells == ANY_CELL
+            cells = cells.copy()
+            cells[anywhere] = self.rng.choice(self.origins, size=int(anywhere.sum()))
+        accepted = min(len(cells), self.capacity - len(self.backlog))
+        self.orders += len(cells)
+        self.rejected += len(cells) - accepted
+        for cell in cells[:accepted].tolist():
+            self.backlog.append((self.next_id, cell, tick))
+            self.next_id += 1
+        self.release(tick)
+        self.feeds += 1
+        self.backlog_total += len(self.backlog)
+        self.max_backlog = max(self.max_backlog, len(self.backlog))
+
+    def release(self, tick: int):
+        grid = self.grid
+        free = {}
+        waiting = deque()
+        backlog = self.backlog
+        while backlog:
+            if self.max_outstanding is not None and len(self.arrived_at) >= self.max_outstanding:
+                waiting.extend(backlog)
+                break
+            order = backlog.popleft()
+            package_id, cell_id, arrived = order
+            if cell_id not in free:
+                cell = grid.get_cell(grid.position_of(cell_id))
+                free[cell_id] = cell.max_load - len(cell.packages)
+            if free[cell_id] <= 0:
+                waiting.append(order)
+                continue
+            free[cell_id] -= 1
+            position = grid.position_of(cell_id)
+            grid.add_package(position, Package(package_id, position))
+            self.arrived_at[package_id] = arrived
+            self.wait_total += tick - arrived
+            self.released += 1
+        self.backlog = waiting
+
+    def collect(self, tick: int):
+        """Record the latency of the stream's packages delivered since the last call, as of ``tick``."""
+        counts = self.latency_counts
+        for goal in self.grid.goals:
+            seen = self.delivered_seen.get(goal, 0)
+            if len(goal.packages) > seen:
+                for package in goal.packages[seen:]:
+                    arrived = self.arrived_at.pop(package.id, None)
+                    if arrived is not None:
+                        latency = tick - arrived
+                        if latency >= len(counts):
+                            counts.extend([0] * (latency + 1 - len(counts)))
+                        counts[latency] += 1
+                        self.delivered += 1
+                self.delivered_seen[goal] = len(goal.packages)
+        self.ticks += 1
+
+    def checkpoint(self):
+        """:return: Ticks collected and orders delivered so far, to measure :meth:`throughput` from."""
+        return self.ticks, self.delivered
+
+    def throughput(self, since=None):
+        """Orders delivered per tick, since a :meth:`checkpoint` or over the whole stream."""
+        ticks, delivered = since if since is not None else (0, 0)
+        return (self.delivered - delivered) / (self.ticks - ticks) if self.ticks > ticks else 0.0
+
+    def latency_percentiles(self, percentiles=(50, 90, 99)):
+        """:return: Percentiles of the ticks from an order's arrival to its delivery, interpolated as by
+            ``np.percentile``."""
+        if not self.delivered:
+            return np.zeros(len(percentiles))
+        cumulative = np.cumsum(self.latency_counts)
+        # Rank of each percentile among the sorted latencies; the latency of rank k is the first with more than k
+        # deliveries at or below it
+        ranks = np.asarray(percentiles, dtype=np.float64) / 100 * (self.delivered - 1)
+        lower = np.searchsorted(cumulative, np.floor(ranks), side="right")
+        upper = np.searchsorted(cumulative, np.ceil(ranks), side="right")
+        return lower + (upper - lower) * (ranks - np.floor(ranks))
+
+    def summary(self, since=None):
+        """:param since: :meth:`checkpoint` to measure throughput from, ``None`` for the whole stream."""
+        p50, p90, p99 = self.latency_percentiles()
+        return {
+            "orders": self.orders,
+            "rejected": self.rejected,
+            "released": self.released,
+            "delivered": self.delivered,
+            "throughput": self.throughput(since),
+            "backlog": len(self.backlog),
+            "mean_backlog": self.backlog_total / self.feeds if self.feeds else 0.0,
+            "max_backlog": self.max_backlog,
+            "mean_wait": self.wait_total / self.released if self.released else 0.0,
+            "latency_p50": float(p50),
+            "latency_p90": float(p90),
+            "latency_p99": float(p99),
+        }
@@ -1,13 +1,17 @@
 # package.py
-from typing import List, TYPE_CHECKING
+from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
     from src.position import Position
-    from src.goal import Goal
+    from src.grid import Grid
 
 
 class Package:
     color = "red"
+    # Spatial index of the grid this package was added to
+    index = None
+    # Id of the robot the package was assigned to, other robots leave it alone
+    reserved_by = None
 
     def __init__(self, id, position: 'Position'):
         self.id = id
@@ -15,30 +19,28 @@ class Package:
         self.moving = False
         self.searchable = True
 
-    def find_nearest_goal(self, goals: List['Goal']):
-        min_distance = float('inf')
-        nearest_goal = None
-
-        for goal in goals:
-            distance = abs(self.position[0] - goal.position[0]) + abs(self.position[1] - goal.position[1])
-            if distance < min_distance:
-                nearest_goal = goal
-                min_distance = distance
-
+    @classmethod
+    def from_json(cls, data, position: 'Position'):
+        return cls(data['id'], position)
+
+    @property
+    def searchable(self):
+        return self._searchable
+
+    @searchable.setter
+    def searchable(self, searchable):
+        self._searchable = searchable
+        if self.index is not None:
+            if searchable:
+                self.index.update(self)
+            else:
+                self.index.remove(self)
+
+    def find_nearest_goal(self, grid: 'Grid'):
+        # Travel cost through the connection graph, looked up in the grid's goal distance fields
+        nearest_goal, _ = grid.nearest_goal(self.position)
         return nearest_goal
 
-    def find_nearest_package(self, packages: List['Package']):
-        nearest_package = None
-        min_distance = float('inf')
-        if packages:
-            for package in packages:
-                if package.searchable:
-                    distance = abs(self.position[0] - package.position[0]) + abs(self.position[1] - package.position[1])
-
-                    if distance < min_distance:
-                        nearest_package = package
-                        min_distance = distance
-
-            return nearest_package
-        else:
-            return None
+    def find_nearest_package(self, grid: 'Grid'):
+        nearest = grid.package_index.nearest(self.position, predicate=lambda package: package is not self)
+        return nearest[0] if nearest else None
@@ -0,0 +1,132 @@
+# package_index.py
+import heapq
+from typing import TYPE_CHECKING, Callable, Optional
+
+if TYPE_CHECKING:
+    from src.package import Package
+    from src.position import Position
+
+
+def manhattan(a: 'Position', b: 'Position'):
+    return abs(a.x - b.x) + abs(a.y - b.y)
+
+
+class PackageIndex:
+    """
+    Uniform bucket grid over the searchable packages of a grid.
+
+    Packages register themselves on :meth:`add` and leave the index when their ``searchable`` flag is cleared
+    (see :class:`Package`), so pick-ups and drops keep the index current without rescanning. Distances are
+    Manhattan distances between positions.
+    """
+
+    def __init__(self, width: int, height: int, bucket_size=8):
+        self.bucket_size = bucket_size
+        self.columns = max(1, -(-width // bucket_size))
+        self.rows = max(1, -(-height // bucket_size))
+        self.buckets = {}
+        self.locations = {}
+
+    def __len__(self):
+        return len(self.locations)
+
+    def __contains__(self, package: 'Package'):
+        return package in self.locations
+
+    def bucket_of(self, position: 'Position'):
+        return position.x // self.bucket_size, position.y // self.bucket_size
+
+    def add(self, package: 'Package'):
+        package.index = self
+        if package.searchable:
+            self.update(package)
+
+    def update(self, package: 'Package'):
+        bucket = self.bucket_of(package.position)
+        previous = self.locations.get(package)
+        if previous == bucket:
+            return
+        if previous is not None:
+            self.buckets[previous].remove(package)
+        self.buckets.setdefault(bucket, []).append(package)
+        self.locations[package] = bucket
+
+    def remove(self, package: 'Package'):
+        bucket = self.locations.pop(package, None)
+        if bucket is not None:
+            packages = self.buckets[bucket]
+            packages.remove(package)
+            if not packages:
+                del self.buckets[bucket]
+
+    def discard(self, package: 'Package'):
+        self.remove(package)
+        if package.index is self:
+            package.index = None
+
+    def clear(self):
+        for package in self.locations:
+            package.index = None
+        self.buckets.clear()
+        self.locations.clear()
+
+    def ring(self, center, radius):
+        cx, cy = center
+        for by in range(max(0, cy - radius), min(self.rows, cy + radius + 1)):
+            if abs(by - cy) == radius:
+                bxs = range(max(0, cx - radius), min(self.columns, cx + radius + 1))
+            else:
+                bxs = [bx for bx in (cx - radius, cx + radius) if 0 <= bx < self.columns]
+            for bx in bxs:
+                packages = self.buckets.get((bx, by))
+                if packages:
+                    yield from packages
+
+    def nearest(self, position: 'Position', k=1, predicate: Optional[Callable[['Package'], bool]] = None):
+        """
+        :param position: Query position.
+        :param k: Number of packages to return.
+        :param predicate: Optional filter, packages for which it returns ``False`` are skipped.
+        :return: Up to ``k`` packages ordered by distance, ties going to the package found first.
+        """
+        if not self.locations or k <= 0:
+            return []
+
+        center = self.bucket_of(position)
+        max_radius = max(center[0], self.columns - 1 - center[0], center[1], self.rows - 1 - center[1])
+        best = []
+        order = 0
+        for radius in range(max_radius + 1):
+            # Every bucket in this ring has at least radius - 1 full buckets between it and the query
+            if len(best) == k and -best[0][0] <= (radius - 1) * self.bucket_size:
+                break
+            for package in self.ring(center, radius):
+                if predicate is not None and not predicate(package):
+                    continue
+                distance = manhattan(position, package.position)
+                order += 1
+                entry = (-distance, -order, package)
+                if len(best) < k:
+                    heapq.heappush(best, entry)
+                elif entry[:2] > best[0][:2]:
+                    heapq.heapreplace(best, entry)
+
+        return [package for _, _, package in sorted(best, key=lambda entry: (-entry[0], -entry[1]))]
+
+    def within(self, position: 'Position', radius: int):
+        """
+        :return: All packages at Manhattan distance ``radius`` or less, ordered by distance.
+        """
+        size = self.bucket_size
+        low_x, low_y = max(0, position.x - radius) // size, max(0, position.y - radius) // size
+        high_x = min(self.columns - 1, (position.x + radius) // size)
+        high_y = min(self.rows - 1, (position.y + radius) // size)
+        found = []
+        for by in range(low_y, high_y + 1):
+            for bx in range(low_x, high_x + 1):
+                for package in self.buckets.get((bx, by), ()):
+                    distance = manhattan(position, package.position)
+                    if distance <= radius:
+                        found.append((distance, package))
+        found.sort(key=lambda item: item[0])
+        return [package for _, package in found]
@@ -0,0 +1,55 @@
+# path_cache.py
+from collections import OrderedDict
+
+
+class PathCache:
+    """
+    Bounded LRU cache of A* results keyed on ``(start, destination, topology_version)``.
+
+    Entries computed for an older topology version are never matched again and age out of the cache.
+
+    :ivar hits: Lookups answered from the cache.
+    :ivar misses: Lookups that had to run a search.
+    :ivar evictions: Entries dropped because the cache was full.
+    """
+
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, start: int, destination: int, version: int):
+        key = (start, destination, version)
+        path = self.entries.get(key)
+        if path is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return list(path)
+
+    def put(self, start: int, destination: int, version: int, path):
+        if self.capacity <= 0:
+            return
+        key = (start, destination, version)
+        self.entries[key] = tuple(path)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self.entries),
+            "capacity": self.capacity,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
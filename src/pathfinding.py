@@ -1,11 +1,21 @@
 import heapq
+from array import array
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Iterable
+
+import numpy as np
+
+from src.jump_point_search import JumpPointSearch
 
 if TYPE_CHECKING:
     from src.cell import Cell
     from src.grid import Grid
     from src.position import Position
+    from src.reservation_table import ReservationTable
+
+INFINITY = float('inf')
+NO_PARENT = -1
+JUMP_POINT_MODES = (None, "jps", "jps+")
 
 
 def get_neighbours(cell: 'Cell'):
@@ -26,45 +36,246 @@ def reconstruct_path(came_from, current):
     return path
 
 
+def reconstruct_id_path(came_from: array, current: int):
+    path = [current]
+    while came_from[current] != NO_PARENT:
+        current = came_from[current]
+        path.append(current)
+    path.reverse()
+    return path
+
+
 class Pathfinding:
-    def __init__(self, grid: 'Grid'):
+    def __init__(self, grid: 'Grid', jump_points=None):
+        """
+        :param jump_points: ``"jps"`` or ``"jps+"`` to answer :meth:`path_ids` with Jump Point Search (JPS+ with
+            precomputed jump distances) whenever the grid is a uniform-cost grid map, ``None`` to always use A*.
+        """
+        if jump_points not in JUMP_POINT_MODES:
+            raise ValueError(f"Unknown jump point mode {jump_points}, expected one of {JUMP_POINT_MODES}")
         self.grid = grid
+        self.jump_points = jump_points
+        self.expanded = 0
 
     def a_star(self, start: 'Position', destination: 'Position'):
-        start_cell = self.grid.get_cell(start)
-        destination_cell = self.grid.get_cell(destination)
+        path = self.a_star_ids(self.grid.cell_id(start), self.grid.cell_id(destination))
+        return [self.grid.get_cell(self.grid.position_of(cell_id)) for cell_id in path]
 
-        open_set = []
-        heapq.heappush(open_set, (0, start_cell))
+    def path_ids(self, start: int, destination: int, use_cache=True):
+        """
+        Shortest path with Jump Point Search when enabled and the grid qualifies (see :func:`uniform_cost_mask`,
+        checked once per topology version), with :meth:`a_star_ids` otherwise. Same result format and cache.
+        """
+        grid = self.grid
+        search = JumpPointSearch.for_grid(grid) if self.jump_points is not None else None
+        if search is None:
+            return self.a_star_ids(start, destination, use_cache)
+        if use_cache:
+            path = grid.path_cache.get(start, destination, grid.topology_version)
+            if path is not None:
+                return path
+        path = search.search(start, destination, plus=self.jump_points == "jps+")
+        self.expanded = search.expanded
+        if use_cache:
+            grid.path_cache.put(start, destination, grid.topology_version, path)
+        return path
+
+    def a_star_ids(self, start: int, destination: int, use_cache=True):
+        """
+        A* over integer cell ids.
+
+        Closed set, g-scores and parents live in flat arrays indexed by cell id. Ties on f-score are broken
+        in favour of the larger g-score (the node closer to the destination), then the smaller id, so
+        results are deterministic. Improved nodes are pushed again and stale heap entries are skipped
+        when popped instead of being removed from the heap.
+
+        :param start: Cell id to start from.
+        :param destination: Cell id to reach.
+        :param use_cache: Look the path up in (and store it into) the grid's path cache.
+        :return: The cell ids from start to destination (both included), or an empty list if unreachable.
+        """
+        grid = self.grid
+        if use_cache:
+            path = grid.path_cache.get(start, destination, grid.topology_version)
+            if path is None:
+                path = self.a_star_ids(start, destination, use_cache=False)
+                grid.path_cache.put(start, destination, grid.topology_version, path)
+            return path
+
+        width = grid.width
+        size = width * grid.height
+        destination_x, destination_y = destination % width, destination // width
+        neighbour_ids = grid.neighbour_ids
+
+        closed = bytearray(size)
+        g_score = array('d', [INFINITY]) * size
+        came_from = array('l', [NO_PARENT]) * size
+        g_score[start] = 0
+        open_set = [(abs(start % width - destination_x) + abs(start // width - destination_y), 0, start)]
+        self.expanded = 0
+
+        while open_set:
+            _, negative_g, current = heapq.heappop(open_set)
+            if closed[current] or -negative_g > g_score[current]:
+                continue
+
+            if current == destination:
+                return reconstruct_id_path(came_from, current)
+
+            closed[current] = 1
+            self.expanded += 1
+            current_g = g_score[current]
+
+            for neighbour, weight in neighbour_ids(current):
+                if closed[neighbour]:
+                    continue
+                tentative_g_score = current_g + weight
+                if tentative_g_score < g_score[neighbour]:
+                    came_from[neighbour] = current
+                    g_score[neighbour] = tentative_g_score
+                    h = abs(neighbour % width - destination_x) + abs(neighbour // width - destination_y)
+                    heapq.heappush(open_set, (tentative_g_score + h, -tentative_g_score, neighbour))
+
+        return []
+
+    def space_time_a_star(self, start: int, destination: int, start_tick: int, reservations: 'ReservationTable',
+                          robot, horizon=None):
+        """
+        A* over ``(cell, tick)`` states that avoids the claims of other robots in a reservation table.
+
+        Each tick the robot either waits (cost 1) or follows a connection (its weight). Claims are only honoured
+        for the first ``horizon`` ticks; past that the search is a plain A* over cells, so waiting there is
+        pointless and not expanded. The destination is accepted only if the robot can stay there for the rest of
+        the horizon.
+
+        :param start: Cell id the robot is on at ``start_tick``.
+        :param destination: Cell id to reach.
+        :param start_tick: Current simulation tick.
+        :param reservations: Claims of the other robots.
+        :param robot: Id of the planning robot, its own claims are ignored.
+        :param horizon: Ticks to plan against reservations, defaults to the table's horizon.
+        :return: One cell id per tick starting with ``start`` (waits repeat the cell), or an empty list.
+        """
+        grid = self.grid
+        width = grid.width
+        size = width * grid.height
+        horizon = reservations.horizon if horizon is None else horizon
+        last_tick = start_tick + horizon
+        destination_x, destination_y = destination % width, destination // width
+        parked = reservations.parked.get(destination)
+        if parked is not None and parked[0] != robot:
+            return []
+
+        def h(cell):
+            return abs(cell % width - destination_x) + abs(cell // width - destination_y)
+
+        start_key = start
+        open_set = [(h(start), 0, 0, start, start_key)]
+        g_score = {start_key: 0}
         came_from = {}
-        g_score = {start_cell: 0}
-        f_score = {start_cell: heuristic(start, destination)}
-        close_set = []
+        closed = set()
+        self.expanded = 0
 
         while open_set:
-            current = heapq.heappop(open_set)[1]
+            _, negative_g, offset, current, key = heapq.heappop(open_set)
+            if key in closed or -negative_g > g_score[key]:
+                continue
 
-            if current == destination_cell:
-                return reconstruct_path(came_from, current)
+            tick = start_tick + offset
+            if current == destination and (
+                    tick >= last_tick or reservations.is_free_until(current, tick, last_tick, robot)):
+                path = [current]
+                while key in came_from:
+                    key = came_from[key]
+                    path.append(key % size)
+                path.reverse()
+                return path
 
-            close_set.append(current)
+            closed.add(key)
+            self.expanded += 1
+            current_g = -negative_g
+            constrained = tick < last_tick
+            next_offset = offset + 1 if constrained else offset
 
-            neighbors = get_neighbours(current)
+            moves = grid.neighbour_ids(current)
+            if constrained:
+                moves = [(neighbour, weight) for neighbour, weight in moves
+                         if reservations.can_move(robot, current, neighbour, tick)]
+                if reservations.can_occupy(robot, current, tick + 1):
+                    moves.append((current, 1))
 
-            for connection in neighbors:
-                neighbor = connection.to_cell
-                if neighbor in close_set:
+            for neighbour, weight in moves:
+                neighbour_key = min(next_offset, horizon) * size + neighbour
+                if neighbour_key in closed:
                     continue
-                tentative_g_score = g_score[current] + connection.weight
-
-                if neighbor not in g_score or tentative_g_score < g_score[neighbor]:
-                    came_from[neighbor] = current
-                    g_score[neighbor] = tentative_g_score
-                    f_score[neighbor] = g_score[neighbor] + heuristic(neighbor.position, destination)
-                    heapq.heappush(open_set, (f_score[neighbor], neighbor))
+                tentative_g_score = current_g + weight
+                if tentative_g_score < g_score.get(neighbour_key, INFINITY):
+                    came_from[neighbour_key] = key
+                    g_score[neighbour_key] = tentative_g_score
+                    heapq.heappush(open_set, (tentative_g_score + h(neighbour), -tentative_g_score,
+                                              next_offset, neighbour, neighbour_key))
 
         return []
 
+    def distance_field(self, origins: Iterable[int], reverse=False):
+        """
+        Multi-source Dijkstra over the whole connection graph.
+
+        :param origins: Cell ids the distances are measured from.
+        :param reverse: Follow connections backwards, giving the travel cost from every cell *to* the origins.
+        :return: ``float64`` array of travel costs indexed by cell id, ``inf`` where unreachable.
+        """
+        offsets, neighbours, weights = self.grid.adjacency(reverse)
+        distance = array('d', [INFINITY]) * (self.grid.width * self.grid.height)
+        open_set = []
+        for origin in origins:
+            distance[origin] = 0
+            open_set.append((0, origin))
+        heapq.heapify(open_set)
+
+        while open_set:
+            current_distance, current = heapq.heappop(open_set)
+            if current_distance > distance[current]:
+                continue
+            for edge in range(offsets[current], offsets[current + 1]):
+                neighbour = neighbours[edge]
+                tentative_distance = current_distance + weights[edge]
+                if tentative_distance < distance[neighbour]:
+                    distance[neighbour] = tentative_distance
+                    heapq.heappush(open_set, (tentative_distance, neighbour))
+
+        return np.frombuffer(distance, dtype=np.float64)
+
+    def nearest_targets(self, origin: int, targets, k: int):
+        """
+        Dijkstra from ``origin`` that stops once ``k`` of the ``targets`` are settled.
+
+        Only the area around ``origin`` up to the k-th nearest target is searched, so the cost does not grow with
+        the size of the grid.
+
+        :param targets: Container of target cell ids supporting ``in``.
+        :return: Target cell id to travel cost, for at most ``k`` targets, nearest first.
+        """
+        offsets, neighbours, weights = self.grid.adjacency()
+        distance = {origin: 0}
+        open_set = [(0, origin)]
+        found = {}
+        self.expanded = 0
+        while open_set and len(found) < k:
+            current_distance, current = heapq.heappop(open_set)
+            if current_distance > distance[current]:
+                continue
+            self.expanded += 1
+            if current in targets:
+                found[current] = current_distance
+            for edge in range(offsets[current], offsets[current + 1]):
+                neighbour = neighbours[edge]
+                tentative_distance = current_distance + weights[edge]
+                if tentative_distance < distance.get(neighbour, INFINITY):
+                    distance[neighbour] = tentative_distance
+                    heapq.heappush(open_set, (tentative_distance, neighbour))
+        return found
+
     # def dijkstra(self, start, destination):
     #     """
     #     :param start: The starting node for Dijkstra's algorithm.
@@ -5,5 +5,11 @@ class Position:
 		self.x = x
 		self.y = y
 
+	def __eq__(self, other):
+		return isinstance(other, Position) and self.x == other.x and self.y == other.y
+
+	def __hash__(self):
+		return hash((self.x, self.y))
+
 	def __repr__(self):
 		return f"Position({self.x}, {self.y})"
\ No newline at end of file
@@ -0,0 +1,303 @@
+# replay.py
+import mmap
+import struct
+from collections import Counter
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from src.grid import NEIGHBOUR_OFFSETS
+
+if TYPE_CHECKING:
+    from src.grid import Grid
+    from src.position import Position
+
+MAGIC = b"WTRC"
+VERSION = 1
+# magic, version, flags, width, height, keyframe interval
+HEADER = struct.Struct("<4sHHIII")
+# kind, tick, payload size
+RECORD = struct.Struct("<BII")
+KEYFRAME = 1
+DELTA = 2
+# Entry counts of a keyframe (robots, package cells, goals) and of a delta (steps, jumps, loads, package cells, goals)
+KEYFRAME_COUNTS = struct.Struct("<III")
+DELTA_COUNTS = struct.Struct("<IIIII")
+
+ROBOT_DTYPE = np.dtype([("id", "<i8"), ("cell", "<u4"), ("load", "<u2")])
+GOAL_DTYPE = np.dtype([("id", "<i8"), ("cell", "<u4"), ("delivered", "<u4")])
+# A robot moving to a neighbouring cell, as an index into NEIGHBOUR_OFFSETS
+STEP_DTYPE = np.dtype([("slot", "<u4"), ("direction", "u1")])
+JUMP_DTYPE = np.dtype([("slot", "<u4"), ("cell", "<u4")])
+LOAD_DTYPE = np.dtype([("slot", "<u4"), ("load", "<u2")])
+PACKAGES_DTYPE = np.dtype([("cell", "<u4"), ("count", "<u4")])
+DELIVERED_DTYPE = np.dtype([("goal", "<u4"), ("delivered", "<u4")])
+NO_ROBOT = -1
+
+
+class TraceRecorder:
+    """
+    Appends the state of a simulation after every tick to a compact binary trace, for :class:`TracePlayer`.
+
+    A keyframe holds every robot (id, cell, load), the package count of every cell with packages and every goal's
+    delivered count. It is written at the start, every ``keyframe_interval`` ticks, and whenever robots or goals are
+    added or removed. In between, a delta record holds only what changed: robots that stepped to a neighbouring cell
+    (slot and direction), robots that moved any other way, new loads, the package counts of cells whose packages
+    changed (collected through the grid's ``package_watchers``) and new delivered counts. Ticks where nothing
+    changed are not written, except that :meth:`flush` marks the last recorded tick with an empty delta.
+    """
+
+    def __init__(self, grid: 'Grid', path, keyframe_interval=256):
+        self.grid = grid
+        self.keyframe_interval = keyframe_interval
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, 0, grid.width, grid.height, keyframe_interval))
+        self.package_cells = set()
+        grid.package_watchers.append(self.package_cells)
+        self.robots = []
+        self.goals = []
+        self.cells = np.zeros(0, dtype=np.int64)
+        self.loads = np.zeros(0, dtype=np.int64)
+        self.delivered = np.zeros(0, dtype=np.int64)
+        self.keyframe_tick = None
+        # Last tick recorded and last tick written
+        self.tick = self.written_tick = None
+        self.keyframe(grid.tick)
+
+    def write(self, kind, tick, counts, arrays):
+        self.tick = self.written_tick = tick
+        payload = [counts] + [array.tobytes() for array in arrays]
+        self.file.write(RECORD.pack(kind, tick, sum(len(part) for part in payload)))
+        self.file.writelines(payload)
+
+    def robot_state(self):
+        width = self.grid.width
+        robots = self.grid.robots
+        state = np.fromiter((value for robot in robots for value in (
+            robot.position.y * width + robot.position.x, len(robot.packages))),
+            dtype=np.int64, count=2 * len(robots)).reshape(-1, 2)
+        return state[:, 0], state[:, 1]
+
+    def keyframe(self, tick):
+        grid = self.grid
+        self.robots = list(grid.robots)
+        self.goals = list(grid.goals)
+        self.cells, self.loads = self.robot_state()
+        self.delivered = np.array([goal.delivered_packages for goal in self.goals], dtype=np.int64)
+        self.package_cells.clear()
+        self.keyframe_tick = tick
+
+        robots = np.zeros(len(self.robots), dtype=ROBOT_DTYPE)
+        robots["id"] = [robot.id for robot in self.robots]
+        robots["cell"], robots["load"] = self.cells, self.loads
+        counts = Counter(grid.cell_id(package.position) for package in grid.packages)
+        packages = np.array(sorted(counts.items()), dtype=PACKAGES_DTYPE).reshape(-1)
+        goals = np.zeros(len(self.goals), dtype=GOAL_DTYPE)
+        goals["id"] = [goal.id for goal in self.goals]
+        goals["cell"] = [grid.cell_id(goal.position) for goal in self.goals]
+        goals["delivered"] = self.delivered
+        self.write(KEYFRAME, tick, KEYFRAME_COUNTS.pack(len(robots), len(packages), len(goals)),
+                   (robots, packages, goals))
+
+    def record(self, tick):
+        """Record the state after ``tick`` ticks."""
+        grid = self.grid
+        if grid.robots != self.robots or grid.goals != self.goals or \
+                tick - self.keyframe_tick >= self.keyframe_interval:
+            self.keyframe(tick)
+            return
+
+        self.tick = tick
+        cells, loads = self.robot_state()
+        moved = np.flatnonzero(cells != self.cells)
+        steps = jumps = np.zeros(0, dtype=np.int64)
+        if len(moved):
+            width = grid.width
+            old, new = self.cells[moved], cells[moved]
+            dx, dy = new % width - old % width, new // width - old // width
+            direction = np.full(len(moved), -1)
+            for index, (x, y) in enumerate(NEIGHBOUR_OFFSETS):
+                direction[(dx == x) & (dy == y)] = index
+            adjacent = direction >= 0
+            steps = np.zeros(int(adjacent.sum()), dtype=STEP_DTYPE)
+            steps["slot"], steps["direction"] = moved[adjacent], direction[adjacent]
+            jumps = np.zeros(len(moved) - len(steps), dtype=JUMP_DTYPE)
+            jumps["slot"], jumps["cell"] = moved[~adjacent], new[~adjacent]
+        changed_loads = np.flatnonzero(loads != self.loads)
+        load_changes = np.zeros(len(changed_loads), dtype=LOAD_DTYPE)
+        load_changes["slot"], load_changes["load"] = changed_loads, loads[changed_loads]
+        self.cells, self.loads = cells, loads
+
+        packages = np.zeros(len(self.package_cells), dtype=PACKAGES_DTYPE)
+        if self.package_cells:
+            touched = sorted(self.package_cells)
+            self.package_cells.clear()
+            packages["cell"] = touched
+            packages["count"] = [len(grid.get_cell(grid.position_of(cell_id)).packages) for cell_id in touched]
+        delivered = np.array([goal.delivered_packages for goal in self.goals], dtype=np.int64)
+        changed_goals = np.flatnonzero(delivered != self.delivered)
+        deliveries = np.zeros(len(changed_goals), dtype=DELIVERED_DTYPE)
+        deliveries["goal"], deliveries["delivered"] = changed_goals, delivered[changed_goals]
+        self.delivered = delivered
+
+        if len(steps) or len(jumps) or len(load_changes) or len(packages) or len(deliveries):
+            self.write(DELTA, tick, DELTA_COUNTS.pack(len(steps), len(jumps), len(load_changes), len(packages),
+                                                      len(deliveries)),
+                       (steps, jumps, load_changes, packages, deliveries))
+
+    def flush(self):
+        if self.tick != self.written_tick:
+            # Quiet ticks at the end still belong to the trace
+            empty = np.zeros(0, dtype=np.uint8)
+            self.write(DELTA, self.tick, DELTA_COUNTS.pack(0, 0, 0, 0, 0), (empty,))
+        self.file.flush()
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.flush()
+        if self.package_cells in self.grid.package_watchers:
+            self.grid.package_watchers.remove(self.package_cells)
+        self.file.close()
+
+
+class TracePlayer:
+    """
+    Replays a trace written by :class:`TraceRecorder` without running the simulation.
+
+    Opening a trace maps the file and indexes its records. :meth:`seek` restores the nearest keyframe at or before
+    the requested tick and applies the deltas after it, or only applies the deltas in between when moving forward
+    from the current tick past no keyframe. The player can stand in for the grid when drawing: cells changed by the
+    last seek are returned by :meth:`take_dirty_cells`, and :meth:`cell` tells what a cell shows.
+
+    :raises ValueError: If the file is not a trace or has an unsupported version.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.data) < HEADER.size or self.data[:4] != MAGIC:
+            raise ValueError(f"{path} is not a trace file")
+        _, version, _, self.width, self.height, self.keyframe_interval = HEADER.unpack_from(self.data)
+        if version != VERSION:
+            raise ValueError(f"Unsupported trace version {version}, expected {VERSION}")
+
+        kinds, ticks, offsets = [], [], []
+        offset = HEADER.size
+        # A record cut short by a crash while recording ends the trace
+        while offset + RECORD.size <= len(self.data):
+            kind, tick, size = RECORD.unpack_from(self.data, offset)
+            if offset + RECORD.size + size > len(self.data):
+                break
+            kinds.append(kind)
+            ticks.append(tick)
+            offsets.append(offset + RECORD.size)
+            offset += RECORD.size + size
+        self.kinds = np.array(kinds, dtype=np.int8)
+        self.ticks = np.array(ticks, dtype=np.int64)
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.keyframes = np.flatnonzero(self.kinds == KEYFRAME)
+        if not len(self.keyframes):
+            raise ValueError(f"{path} has no keyframe")
+
+        self.first_tick = int(self.ticks[0])
+        self.last_tick = int(self.ticks[-1])
+        size = self.width * self.height
+        self.occupant = np.full(size, NO_ROBOT, dtype=np.int32)
+        self.package_counts = np.zeros(size, dtype=np.int32)
+        self.goal_at = {}
+        self.robot_ids = np.zeros(0, dtype=np.int64)
+        self.robot_cells = np.zeros(0, dtype=np.int64)
+        self.robot_loads = np.zeros(0, dtype=np.int64)
+        self.goal_ids = np.zeros(0, dtype=np.int64)
+        self.goal_cells = np.zeros(0, dtype=np.int64)
+        self.delivered = np.zeros(0, dtype=np.int64)
+        self.record = -1
+        self.tick = None
+        self.dirty_cells = set()
+        self.seek(self.first_tick)
+
+    def arrays(self, record, counts_format, dtypes):
+        offset = int(self.offsets[record])
+        counts = counts_format.unpack_from(self.data, offset)
+        offset += counts_format.size
+        arrays = []
+        for count, dtype in zip(counts, dtypes):
+            arrays.append(np.frombuffer(self.data, dtype=dtype, count=count, offset=offset))
+            offset += count * dtype.itemsize
+        return arrays
+
+    def entity_cells(self):
+        return np.concatenate([self.robot_cells, np.flatnonzero(self.package_counts), self.goal_cells])
+
+    def load_keyframe(self, record):
+        robots, packages, goals = self.arrays(record, KEYFRAME_COUNTS, (ROBOT_DTYPE, PACKAGES_DTYPE, GOAL_DTYPE))
+        before = self.entity_cells()
+        self.occupant[self.robot_cells] = NO_ROBOT
+        self.package_counts[:] = 0
+        self.robot_ids = robots["id"].astype(np.int64)
+        self.robot_cells = robots["cell"].astype(np.int64)
+        self.robot_loads = robots["load"].astype(np.int64)
+        self.occupant[self.robot_cells] = np.arange(len(robots))
+        self.package_counts[packages["cell"]] = packages["count"]
+        self.goal_ids = goals["id"].astype(np.int64)
+        self.goal_cells = goals["cell"].astype(np.int64)
+        self.delivered = goals["delivered"].astype(np.int64)
+        self.goal_at = dict(zip(self.goal_cells.tolist(), range(len(goals))))
+        self.dirty_cells.update(before.tolist(), self.entity_cells().tolist())
+
+    def apply_delta(self, record):
+        steps, jumps, loads, packages, deliveries = self.arrays(
+            record, DELTA_COUNTS, (STEP_DTYPE, JUMP_DTYPE, LOAD_DTYPE, PACKAGES_DTYPE, DELIVERED_DTYPE))
+        slots = np.concatenate([steps["slot"], jumps["slot"]]).astype(np.int64)
+        if len(slots):
+            offsets = np.array([dy * self.width + dx for dx, dy in NEIGHBOUR_OFFSETS], dtype=np.int64)
+            old = self.robot_cells[slots]
+            new = np.concatenate([old[:len(steps)] + offsets[steps["direction"]], jumps["cell"]])
+            # Every target was free or left by another robot in the same tick
+            self.occupant[old] = NO_ROBOT
+            self.occupant[new] = slots
+            self.robot_cells[slots] = new
+            self.dirty_cells.update(old.tolist(), new.tolist())
+        self.robot_loads[loads["slot"]] = loads["load"]
+        self.package_counts[packages["cell"]] = packages["count"]
+        self.dirty_cells.update(packages["cell"].tolist())
+        self.delivered[deliveries["goal"]] = deliveries["delivered"]
+
+    def seek(self, tick: int):
+        """
+        Restore the state after ``tick`` ticks, clamped to the recorded range.
+
+        :return: The tick reached.
+        """
+        tick = min(max(tick, self.first_tick), self.last_tick)
+        target = int(np.searchsorted(self.ticks, tick, side="right")) - 1
+        keyframe = int(self.keyframes[np.searchsorted(self.keyframes, target, side="right") - 1])
+        if not keyframe <= self.record <= target:
+            self.load_keyframe(keyframe)
+            self.record = keyframe
+        for record in range(self.record + 1, target + 1):
+            if self.kinds[record] == KEYFRAME:
+                self.load_keyframe(record)
+            else:
+                self.apply_delta(record)
+        self.record = target
+        self.tick = tick
+        return tick
+
+    def take_dirty_cells(self):
+        dirty, self.dirty_cells = self.dirty_cells, set()
+        return dirty
+
+    def is_inside_grid(self, position: 'Position'):
+        return 0 <= position.x < self.width and 0 <= position.y < self.height
+
+    def cell(self, cell_id: int):
+        """:return: ``(robot id or None, package count, goal id or None)`` of the cell at the current tick."""
+        slot = int(self.occupant[cell_id])
+        goal = self.goal_at.get(cell_id)
+        return (int(self.robot_ids[slot]) if slot != NO_ROBOT else None, int(self.package_counts[cell_id]),
+                int(self.goal_ids[goal]) if goal is not None else None)
+
+    def close(self):
+        self.data.close()
@@ -0,0 +1,113 @@
+# reservation_table.py
+from collections import defaultdict
+
+
+class ReservationTable:
+    """
+    Shared space-time claims used for cooperative path planning.
+
+    A robot following a path claims ``(cell, tick)`` for every step and ``(from_cell, to_cell, tick)`` for every
+    move started at ``tick``. The last cell of a path stays claimed from its arrival tick onwards (the robot is
+    parked there) until the robot releases its claims to replan. Claims are bucketed by tick so
+    :meth:`expire` drops everything in the past in time proportional to what is dropped, keeping memory bounded by
+    ``robots * horizon`` instead of growing with the simulation length.
+
+    :ivar horizon: Number of ticks ahead in which planners honour the claims.
+    """
+
+    def __init__(self, horizon=32):
+        self.horizon = horizon
+        self.cells = {}
+        self.edges = {}
+        self.parked = {}
+        self.parked_cells = {}
+        self.by_tick = defaultdict(list)
+        self.current_tick = 0
+
+    def __len__(self):
+        return len(self.cells) + len(self.edges) + len(self.parked)
+
+    def reserve(self, robot, path, start_tick: int):
+        """
+        :param robot: Id of the robot claiming the path.
+        :param path: Cell ids, one per tick, starting with the robot's cell at ``start_tick``.
+        :param start_tick: Tick at which the robot is on ``path[0]``.
+        """
+        for offset, cell in enumerate(path):
+            tick = start_tick + offset
+            self.cells[(cell, tick)] = robot
+            self.by_tick[tick].append((self.cells, (cell, tick)))
+            if offset + 1 < len(path) and path[offset + 1] != cell:
+                edge = (cell, path[offset + 1], tick)
+                self.edges[edge] = robot
+                self.by_tick[tick].append((self.edges, edge))
+        self.park(robot, path[-1], start_tick + len(path) - 1)
+
+    def park(self, robot, cell: int, from_tick: int):
+        self.unpark(robot)
+        self.parked[cell] = (robot, from_tick)
+        self.parked_cells[robot] = cell
+
+    def unpark(self, robot):
+        cell = self.parked_cells.pop(robot, None)
+        if cell is not None and self.parked.get(cell, (None,))[0] == robot:
+            del self.parked[cell]
+
+    def release(self, robot):
+        """Drop every claim of ``robot`` from the current tick on."""
+        self.unpark(robot)
+        for tick in [tick for tick in self.by_tick if tick >= self.current_tick]:
+            kept = []
+            for table, key in self.by_tick[tick]:
+                if table.get(key) == robot:
+                    del table[key]
+                else:
+                    kept.append((table, key))
+            self.by_tick[tick] = kept
+
+    def clear(self):
+        self.cells.clear()
+        self.edges.clear()
+        self.parked.clear()
+        self.parked_cells.clear()
+        self.by_tick.clear()
+
+    def expire(self, tick: int):
+        """Forget all claims for ticks before ``tick``."""
+        for past in [past for past in self.by_tick if past < tick]:
+            for table, key in self.by_tick.pop(past):
+                table.pop(key, None)
+        self.current_tick = tick
+
+    def owner(self, cell: int, tick: int):
+        robot = self.cells.get((cell, tick))
+        if robot is None:
+            parked = self.parked.get(cell)
+            if parked is not None and tick >= parked[1]:
+                robot = parked[0]
+        return robot
+
+    def is_free(self, cell: int, tick: int, robot):
+        owner = self.owner(cell, tick)
+        return owner is None or owner == robot
+
+    def can_occupy(self, robot, cell: int, tick: int):
+        """
+        Whether ``robot`` may be on ``cell`` at ``tick``.
+
+        Besides the cell being free at ``tick``, no other robot may be on it the tick before or after: robots
+        never follow each other into a cell in the same tick, so the outcome of a tick does not depend on the
+        order in which robots are stepped.
+        """
+        return (self.is_free(cell, tick, robot) and self.is_free(cell, tick - 1, robot)
+                and self.is_free(cell, tick + 1, robot))
+
+    def can_move(self, robot, from_cell: int, to_cell: int, tick: int):
+        """Whether ``robot`` may move from ``from_cell`` at ``tick`` to ``to_cell`` at ``tick + 1``."""
+        if not self.can_occupy(robot, to_cell, tick + 1):
+            return False
+        swapping = self.edges.get((to_cell, from_cell, tick))
+        return swapping is None or swapping == robot
+
+    def is_free_until(self, cell: int, tick: int, until_tick: int, robot):
+        return all(self.is_free(cell, t, robot) for t in range(tick, until_tick + 1))
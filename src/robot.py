@@ -1,15 +1,17 @@
 # robot.py
-import math
+import logging
+from collections import deque
 from enum import Enum
-import time
 from typing import TYPE_CHECKING
 
-from src.pathfinding import Pathfinding
+from src.pathfinding import Pathfinding, heuristic
 
 if TYPE_CHECKING:
     from src.position import Position
     from src.goal import Goal
 
+logger = logging.getLogger(__name__)
+
 
 class Status(Enum):
     """
@@ -28,78 +30,184 @@ class Status(Enum):
 
 class Robot:
     color = 'blue'
-    packages = []
-    path = []
 
     def __init__(self, id, position, max_packages=5, max_blocked_times=10):
 
         self.id = id
         self.position = position
+        self.packages = []
+        self.path = []
+        # Rest of a hierarchical route, refined segment by segment as the path runs out
+        self.route = None
+        # Package reserved for this robot by a TaskAssigner, picked up first
+        self.assigned_package = None
+        # Steps left in each planned leg of the path, the first one being the leg under way
+        self.legs = []
 
         self.max_packages = max_packages
         self.blocked_times = 0
         self.max_blocked_times = max_blocked_times
 
+        # Ticks spent in each status, up to the tick of the last status change
         self.status = Status.IDLE
         self.off_time = 0
         self.active_time = 0
         self.idle_time = 0
 
         self.blocked_time = 0
-        self.time_status_changed = time.time()
+        self.status_changed_tick = 0
+
+    @classmethod
+    def from_json(cls, data, position: 'Position'):
+        return cls(data['id'], position, data.get('max_packages', 5), data.get('max_blocked_times', 10))
 
     # TODO: Think if it is needed to change Pathing Logic?
-    def calculate_path(self, grid):
+    def calculate_path(self, grid, reservations=None, tick=0, tour_planner=None, hierarchy=None, pathfinding=None):
+        """
+        Plan a path through the next pick-ups and drop-off when the robot has none.
+
+        :param grid: Grid the robot is on.
+        :param reservations: Shared :class:`ReservationTable`; when given, legs are planned with space-time A*
+            around the other robots' claims and the resulting path is claimed in turn.
+        :param tick: Current simulation tick, used with ``reservations``.
+        :param tour_planner: :class:`TourPlanner` choosing the pick-ups, instead of greedy chaining.
+        :param hierarchy: :class:`HierarchicalPathfinding` to route with instead of A* when there are no
+            ``reservations``. Only the first segment of the route is refined up front, the rest as the robot advances.
+        :param pathfinding: :class:`Pathfinding` planning the legs, a plain A* one by default.
+        """
         if not self.path:
-            print(f"Calculating new path for robot {self.id}")
-            nearest_package = self.find_nearest_package(grid.packages)
-
-            if nearest_package:
-                checkpoints = [self, nearest_package]
-
-                while True:
-                    last_visited = checkpoints[-1]
-                    nearest_package_from_last_visited = last_visited.find_nearest_package(grid.packages)
-                    nearest_goal_from_last_visited = last_visited.find_nearest_goal(grid.goals)
-                    if nearest_goal_from_last_visited.position.distance_to(
-                            last_visited.position) < nearest_package_from_last_visited.position.distance_to(
-                            last_visited.position):
-                        checkpoints.append(nearest_goal_from_last_visited)
-                        break
+            logger.debug("Calculating new path for robot %s", self.id)
+            if reservations is not None:
+                reservations.release(self.id)
+
+            checkpoints = self.find_checkpoints(grid, tour_planner)
+            if checkpoints and reservations is None and hierarchy is not None:
+                self.route = hierarchy.route(grid.cell_id(self.position),
+                                             [grid.cell_id(checkpoint) for checkpoint in checkpoints])
+                self.extend_route(grid)
+                logger.debug("Robot %s's route starts with: %s", self.id, self.path)
+            elif checkpoints:
+                pathfinding = pathfinding or Pathfinding(grid)
+                total_path = [grid.cell_id(self.position)]
+                for checkpoint in checkpoints:
+                    if reservations is None:
+                        path = pathfinding.path_ids(total_path[-1], grid.cell_id(checkpoint))
                     else:
-                        checkpoints.append(nearest_package_from_last_visited)
-
-                total_path = []
-                for i in range(len(checkpoints) - 1):
-                    start = checkpoints[i].position
-                    goal = checkpoints[i + 1].position
-                    path = Pathfinding(grid).a_star(start, goal)
+                        path = pathfinding.space_time_a_star(total_path[-1], grid.cell_id(checkpoint),
+                                                             tick + len(total_path) - 1, reservations, self.id)
+                    if not path:
+                        break
                     total_path.extend(path[1:])
-
-                self.add_to_path(total_path)
-                print(f"Robot {self.id}'s path: {self.path}")
+                    if len(path) > 1:
+                        # A checkpoint on the robot's own cell adds no steps, and no leg
+                        self.legs.append(len(path) - 1)
+
+                if reservations is not None:
+                    reservations.reserve(self.id, total_path, tick)
+                self.add_to_path([grid.position_of(cell_id) for cell_id in total_path[1:]])
+                logger.debug("Robot %s's path: %s", self.id, self.path)
             else:
-                print("No packages found")
+                logger.debug("No packages found for robot %s, going dormant", self.id)
+                grid.sleep_robot(self)
+                if reservations is not None:
+                    reservations.park(self.id, grid.cell_id(self.position), tick)
         else:
-            print(f"Robot {self.id} already has a path")
+            logger.debug("Robot %s already has a path", self.id)
+
+    def find_checkpoints(self, grid, tour_planner=None):
+        if tour_planner is not None:
+            tour = tour_planner.plan(self)
+            if tour:
+                return tour
+        capacity = self.max_packages - len(self.packages)
+        nearest_package = self.find_nearest_package(grid) if capacity > 0 else None
+        if not nearest_package:
+            # Nothing (more) to pick up, deliver what is on board
+            nearest_goal = self.find_nearest_goal(grid) if self.packages else None
+            if nearest_goal is not None:
+                return [nearest_goal.position]
+            return self.leave_goal_area(grid)
+
+        checkpoints = [self, nearest_package]
+        visited = {nearest_package}
+        while True:
+            last_visited = checkpoints[-1]
+            nearest_package_from_last_visited = None
+            if len(visited) < capacity:
+                nearest = grid.package_index.nearest(
+                    last_visited.position,
+                    predicate=lambda package: package not in visited and self.can_take_package(grid, package))
+                nearest_package_from_last_visited = nearest[0] if nearest else None
+            nearest_goal_from_last_visited, goal_distance = grid.nearest_goal(last_visited.position)
+            if nearest_package_from_last_visited is None or goal_distance < heuristic(
+                    last_visited.position, nearest_package_from_last_visited.position):
+                if nearest_goal_from_last_visited is not None:
+                    checkpoints.append(nearest_goal_from_last_visited)
+                break
+            else:
+                checkpoints.append(nearest_package_from_last_visited)
+                visited.add(nearest_package_from_last_visited)
+
+        return [checkpoint.position for checkpoint in checkpoints[1:]]
+
+    def leave_goal_area(self, grid, max_visited=256):
+        # An idle robot parked on or next to a goal blocks deliveries to it, move to the nearest free cell that is
+        # neither a goal nor next to one
+        def near_goal(cell_id):
+            return grid.get_cell(grid.position_of(cell_id)).has_goal() or any(
+                grid.get_cell(grid.position_of(neighbour)).has_goal() for neighbour, _ in grid.neighbour_ids(cell_id))
+
+        start = grid.cell_id(self.position)
+        if not near_goal(start):
+            return []
+        queue = deque([start])
+        visited = {start}
+        while queue and len(visited) < max_visited:
+            current = queue.popleft()
+            position = grid.position_of(current)
+            if current != start and not near_goal(current) and not grid.get_cell(position).has_robot():
+                return [position]
+            for neighbour, _ in grid.neighbour_ids(current):
+                if neighbour not in visited:
+                    visited.add(neighbour)
+                    queue.append(neighbour)
+        return []
+
+    def make_way(self, grid, robot: 'Robot' = None):
+        # Step to a free neighbour, off the path of ``robot`` if possible, to clear the way for it or (without
+        # ``robot``) to break a deadlock before replanning
+        start = grid.cell_id(self.position)
+        free = [grid.position_of(neighbour) for neighbour, _ in grid.neighbour_ids(start)]
+        free = [position for position in free if grid.is_valid_move(position)]
+        if free:
+            off_path = [position for position in free if robot is None or position not in robot.path]
+            self.add_to_path([(off_path or free)[0]])
+            grid.wake_robot(self)
+
+    def can_load(self):
+        return len(self.packages) < self.max_packages
 
     def load(self, package):
-        if len(self.packages) >= self.MAX_PACKAGES:
-            print("Can't Load")
+        if not self.can_load():
+            logger.debug("Robot %s can't load, already carrying %s packages", self.id, len(self.packages))
         else:
             self.packages.append(package)
             package.moving = True
             package.searchable = False
+            package.reserved_by = None
+            if self.assigned_package is package:
+                self.assigned_package = None
 
     def unload(self, grid_manager):
         if self.packages:
             # check if unload position is a goal or not
-            if grid_manager.has_goal(self.position):
+            cell = grid_manager.get_cell(self.position)
+            if cell.has_goal():
                 # Unload packages to the goal
                 for package in self.packages:
                     #TODO: [for later] Add logic for package to have specific destination goal to be checked
                     package.moving = False
-                    grid_manager.deliver_package_at_goal(package, self.position)
+                    cell.goal.deliver_package(package)
                 self.packages.clear()  # all packages have been delivered, clear the list
             else:
                 # Drop packages to the grid
@@ -107,93 +215,130 @@ class Robot:
                     package.position = self.position
                     package.moving = False
                     package.searchable = True
-                    grid_manager.add_package(package)
+                    grid_manager.add_package(self.position, package)
                 self.packages.clear()  # all packages have been dropped, clear the list
         return True
 
     def add_to_path(self, path_to_add):
         self.path.extend(path_to_add)
 
+    def extend_route(self, grid):
+        # Refine the next segment of the hierarchical route, if any
+        if self.route is not None:
+            segment = next(self.route, None)
+            if segment is None:
+                self.route = None
+            else:
+                self.add_to_path([grid.position_of(cell_id) for cell_id in segment])
+
+    def clear_path(self):
+        self.path = []
+        self.legs = []
+        self.route = None
+
+    def pop_step(self):
+        self.path.pop(0)
+        if self.legs:
+            self.legs[0] -= 1
+            if not self.legs[0]:
+                self.legs.pop(0)
+
     def update_position(self, grid):
         if len(self.path) > 0:
             next_position = self.path[0]
-            if grid.is_valid_move(next_position):
-                if grid.is_occupied_by_other_robot(position=next_position, robot=self):
-                    self.change_status(Status.IDLE)
-                    #Next step occupied by robot, waiting
-                    if self.blocked_times > self.max_blocked_times:
-                        print(f"[Robot-{self.id}] I've been waiting for too long bitch, i'll get angry")
-                        self.blocked_times = 0
-                        self.color = "magenta"
-
-                    print(f"[Robot-{self.id}] Waiting... {self.blocked_times}/{self.max_blocked_times}")
-
-                    self.blocked_times += 1
+            if self.position == next_position:
+                # Planned wait
+                self.pop_step()
+                self.change_status(Status.IDLE, grid.tick)
+                return self.position
+            elif grid.is_valid_move(next_position):
+                self.change_status(Status.ACTIVE, grid.tick)
+
+                #Remove previous position by setting it to None
+                grid.get_cell(self.position).robot = None
+
+                #Remove position from path
+                self.position = next_position
+                self.pop_step()
+                if not self.path:
+                    self.extend_route(grid)
+
+                #Place self at new position in grid manager's grid
+                grid.get_cell(next_position).add_robot(self)
+                self.blocked_times = 0
+                return next_position
+            elif grid.is_inside_grid(next_position):
+                self.change_status(Status.BLOCKED, grid.tick)
+                #Next step occupied by robot, waiting
+                if self.blocked_times > self.max_blocked_times:
+                    logger.debug("[Robot-%s] I've been waiting for too long, replanning", self.id)
+                    self.blocked_times = 0
+                    self.color = "magenta"
+                    self.clear_path()
+                    self.make_way(grid)
                     return self.position
-                else:
-                    self.change_status(Status.ACTIVE)
-                    x, y = self.position.x, self.position.y
 
-                    if self.position == next_position:
-                        self.change_status(Status.IDLE)
-                        return self.position
-                    else:
-                        #Remove previous position by setting it to None
-                        grid.grid[self.position[1]][self.position[0]].remove(self)
+                logger.debug("[Robot-%s] Waiting... %s/%s", self.id, self.blocked_times, self.max_blocked_times)
 
-                        #Remove position from path
-                        self.position = next_position
-                        self.path.pop(0)
-
-                        #Place self at new position in grid manager's grid
-                        grid.grid[next_position[1]][next_position[0]].append(self)
-                        self.blocked_times = 0
-                        return next_position
+                blocker = grid.get_cell(next_position).robot
+                if not blocker.path:
+                    blocker.make_way(grid, self)
+                elif blocker.path[0] == self.position and \
+                        (len(self.packages), self.id) < (len(blocker.packages), blocker.id):
+                    # Head-on in a corridor: the lighter robot backs off and replans once the other has passed
+                    self.clear_path()
+                    self.make_way(grid, blocker)
+                    return self.position
+                self.blocked_times += 1
+                return self.position
             else:
-                self.path = []
+                self.clear_path()
+                self.change_status(Status.IDLE, grid.tick)
                 return self.position
         else:
-            self.change_status(Status.IDLE)
+            self.change_status(Status.IDLE, grid.tick)
             return self.position
 
-    def find_nearest_package(self, packages):
-        nearest_package = None
-        min_distance = float('inf')
-        if packages:
-            for package in packages:
-                if package.searchable:
-                    # size of the vector between two points
-                    distance = math.sqrt(abs(self.position.x - package.position.x) +
-                                         abs(self.position.y - package.position.y))
-
-                    if distance < min_distance:
-                        nearest_package = package
-                        min_distance = distance
-
-            return nearest_package
-        else:
-            return None
-
-    def find_nearest_goal(self, goals):
-        nearest_goal = None
-        min_distance = float('inf')
-        for goal in goals:
-            distance = math.sqrt(abs(self.position.x - goal.position.x) +
-                                 abs(self.position.y - goal.position.y))
-            if distance < min_distance:
-                nearest_goal = goal
-                min_distance = distance
+    def find_nearest_package(self, grid):
+        if self.assigned_package is not None:
+            if self.assigned_package.searchable and self.can_take_package(grid, self.assigned_package):
+                return self.assigned_package
+            # Picked up by another robot on its way, or under a robot that may be waiting for us
+            self.release_assignment()
+        nearest = grid.package_index.nearest(self.position,
+                                             predicate=lambda package: self.can_take_package(grid, package))
+        return nearest[0] if nearest else None
+
+    def can_take_package(self, grid, package):
+        if package.reserved_by is not None and package.reserved_by != self.id:
+            return False
+        # A package under another robot is out of reach until that robot moves on (and may be waiting for us)
+        robot = grid.get_cell(package.position).robot
+        return robot is None or robot is self
+
+    def release_assignment(self):
+        if self.assigned_package is not None:
+            if self.assigned_package.reserved_by == self.id:
+                self.assigned_package.reserved_by = None
+            self.assigned_package = None
+
+    def find_nearest_goal(self, grid):
+        # Travel cost through the connection graph, looked up in the grid's goal distance fields
+        nearest_goal, _ = grid.nearest_goal(self.position)
         return nearest_goal
 
-    def change_status(self, new_status: Status):
+    def change_status(self, new_status: Status, tick: int):
+        """
+        :param tick: Simulation tick of the change (``grid.tick``), statuses are timed in ticks.
+        """
         if not isinstance(new_status, Status):
-            print(f"Invalid new status. Must be an instance of Status")
+            logger.warning("Invalid new status %r for robot %s, must be an instance of Status", new_status, self.id)
             return
 
         if new_status == self.status:
             return
 
-        time_in_current_status = time.time() - self.time_status_changed
+        time_in_current_status = tick - self.status_changed_tick
 
         if self.status == Status.IDLE:
             self.idle_time += time_in_current_status
@@ -205,22 +350,23 @@ class Robot:
             self.blocked_time += time_in_current_status
 
         self.status = new_status
-        self.time_status_changed = time.time()
+        self.status_changed_tick = tick
 
-    def get_status_time(self, status: Status):
+    def get_status_time(self, status: Status, tick: int):
+        """
+        :param tick: Current simulation tick.
+        :return: Ticks spent in ``status`` so far.
+        """
         if not isinstance(status, Status):
-            print("Invalid status. Must be an instance of Status enum.")
+            logger.warning("Invalid status %r, must be an instance of Status", status)
             return
 
-        if self.status == status:
-            return {
-                Status.IDLE: self.idle_time + time.time() - self.time_status_changed,
-                Status.ACTIVE: self.active_time + time.time() - self.time_status_changed,
-                Status.OFF: self.off_time + time.time() - self.time_status_changed,
-            }[status]
-
-        return {
+        total = {
             Status.IDLE: self.idle_time,
             Status.ACTIVE: self.active_time,
             Status.OFF: self.off_time,
+            Status.BLOCKED: self.blocked_time,
         }[status]
+        if self.status == status:
+            total += tick - self.status_changed_tick
+        return total
@@ -1,16 +1,100 @@
 # sim.py
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
-from gui import GUI
+import numpy as np
+
+from src.array_grid import ArrayGrid
+from src.conflict_based_search import ConflictBasedSearch
 from src.grid import Grid
+from src.hierarchical_pathfinding import HierarchicalPathfinding
+from src.incremental_replanning import IncrementalReplanner
+from src.metrics import STATUS_CODES, FleetMetrics
+from src.order_stream import OrderStream
+from src.pathfinding import Pathfinding
+from src.replay import TraceRecorder
+from src.reservation_table import ReservationTable
+from src.robot import Robot, Status
+from src.snapshot import Snapshot, capture_state, restore_state, shared_grid, topology
+from src.task_assignment import TaskAssigner
+from src.tour_planning import TourPlanner
+
+PLANNERS = ("independent", "cooperative", "cbs")
+
+# Simulation the current fork_runs worker process forks its continuations from, and the snapshot it holds
+_fork_base = None
 
 
 class Simulation:
-	def __init__(self, grid: Grid):
+	def __init__(self, grid: Grid, planner="independent", horizon=32, assignment=None, tour_budget=None,
+				 cluster_size=None, jump_points=None, replan_states=None, trace=None, orders: OrderStream = None,
+				 **solver_options):
+		"""
+		:param grid: Grid to simulate.
+		:param planner: ``"independent"`` plans each robot on its own and resolves conflicts at move time,
+			``"cooperative"`` plans robots one by one against a shared space-time reservation table so paths are
+			collision-free by construction, and ``"cbs"`` plans all robots that need a path together with
+			Conflict-Based Search, falling back to cooperative planning for robots it leaves without a path.
+		:param horizon: Ticks ahead reservations are honoured.
+		:param assignment: ``None`` to let every robot pick its own nearest package, or a :class:`TaskAssigner`
+			method (``"hungarian"``, ``"auction"``) to assign packages to robots globally before planning.
+		:param tour_budget: ``None`` to chain each robot's nearest packages greedily, or the seconds of local search
+			a :class:`TourPlanner` may spend on each robot's tour of pick-ups.
+		:param cluster_size: ``None`` to route with A*, or the cluster side of the :class:`HierarchicalPathfinding`
+			the ``"independent"`` planner routes long trips with.
+		:param jump_points: ``"jps"`` or ``"jps+"`` to let the ``"independent"`` planner use Jump Point Search on
+			uniform-cost maps (see :class:`Pathfinding`), ``None`` for A*.
+		:param replan_states: ``None`` to plan a robot's whole route again when it breaks, or the number of cells
+			each robot's search may hold state for in the :class:`IncrementalReplanner` that repairs the active leg
+			of the ``"independent"`` planner's A* routes.
+		:param trace: File to record every tick to with a :class:`TraceRecorder`, for playback in the GUI.
+		:param orders: :class:`OrderStream` feeding packages to the grid every tick. Forks run without it.
+		:param solver_options: Extra :class:`ConflictBasedSearch` arguments (``suboptimality``, ``max_nodes``,
+			``time_limit``).
+		"""
+		if planner not in PLANNERS:
+			raise ValueError(f"Unknown planner {planner}, expected one of {PLANNERS}")
+		# Everything but the trace and the order stream, for forks
+		self.options = dict(planner=planner, horizon=horizon, assignment=assignment, tour_budget=tour_budget,
+							cluster_size=cluster_size, jump_points=jump_points, replan_states=replan_states,
+							**solver_options)
 		self.grid = grid
 		self.simulation_running = False
+		self.tick = 0
+		self.metrics = FleetMetrics(grid)
+		self.trace = TraceRecorder(grid, trace) if trace is not None else None
+		self.orders = orders
+		# Seeded by run(), for random changes to the scenario such as add_robots
+		self.random = random.Random()
+		self.planner = planner
+		self.reservations = ReservationTable(horizon) if planner != "independent" else None
+		self.batch_solver = ConflictBasedSearch(grid, self.reservations, horizon=horizon, **solver_options) \
+			if planner == "cbs" else None
+		self.task_assigner = TaskAssigner(grid, assignment) if assignment is not None else None
+		self.tour_planner = TourPlanner(grid, tour_budget) if tour_budget is not None else None
+		self.hierarchy = HierarchicalPathfinding(grid, cluster_size) \
+			if cluster_size is not None and planner == "independent" else None
+		self.pathfinding = Pathfinding(grid, jump_points)
+		self.replanner = IncrementalReplanner(grid, replan_states) \
+			if replan_states is not None and planner == "independent" else None
+
+	@property
+	def tick(self):
+		# The clock lives on the grid, so robots can time their statuses with it
+		return self.grid.tick
+
+	@tick.setter
+	def tick(self, tick):
+		self.grid.tick = tick
 
 	def start_simulation(self):
-		if len(self.grid.goals) > 0 and len(self.grid.packages) > 0 and len(self.grid.robots) > 0:
+		has_packages = len(self.grid.packages) > 0 or self.orders is not None
+		if len(self.grid.goals) > 0 and has_packages and len(self.grid.robots) > 0:
 			self.simulation_running = True
 			self.update_simulation()
 		else:
@@ -24,9 +108,307 @@ class Simulation:
 
 	def update_simulation(self):
 		if self.simulation_running:
-			for row in self.grid.grid:
-				for cell in row:
-					if cell.robot:
-						cell.robot.calculate_path(self.grid)
+			if self.orders is not None:
+				self.orders.feed(self.tick)
+			robots = self.grid.active_robots()
+			if self.reservations is not None:
+				for robot in robots:
+					if robot.blocked_times:
+						# Off its reserved schedule, claim a fresh path
+						robot.clear_path()
+			if self.replanner is not None:
+				self.replanner.repair(robots)
+			if self.task_assigner is not None:
+				self.task_assigner.assign([robot for robot in robots if not robot.path])
+			if self.batch_solver is not None:
+				self.plan_batch(robots)
+			for robot in robots:
+				robot.calculate_path(self.grid, self.reservations, self.tick, self.tour_planner, self.hierarchy,
+									 self.pathfinding)
 
 			self.grid.move_robots()
+			self.metrics.record()
+			self.tick += 1
+			if self.orders is not None:
+				self.orders.collect(self.tick)
+			if self.trace is not None:
+				self.trace.record(self.tick)
+			if self.reservations is not None:
+				self.reservations.expire(self.tick)
+
+	def snapshot(self):
+		"""
+		Capture the mutable state of the simulation: robots (position, path, status, load), packages, goal
+		counters, the tick and the random generator. See :class:`Snapshot`.
+		"""
+		snapshot = capture_state(self.grid)
+		snapshot.random_state = self.random.getstate()
+		return snapshot
+
+	def restore(self, snapshot: Snapshot):
+		"""
+		Put the simulation back in the state of ``snapshot``, taken on this grid or on one with the same topology.
+
+		The robots, packages and goals are replaced with new objects. Metrics start over, reservations are claimed
+		again along the restored paths, and searches kept for the old robots are dropped.
+		"""
+		restore_state(self.grid, snapshot)
+		if snapshot.random_state is not None:
+			self.random.setstate(snapshot.random_state)
+		self.metrics = FleetMetrics(self.grid)
+		if self.reservations is not None:
+			self.reservations.clear()
+			self.reservations.expire(self.tick)
+			for robot in self.grid.robots:
+				cell = self.grid.cell_id(robot.position)
+				if robot.path:
+					self.reservations.reserve(robot.id, [cell] + [self.grid.cell_id(p) for p in robot.path], self.tick)
+				else:
+					self.reservations.park(robot.id, cell, self.tick)
+		if self.tour_planner is not None:
+			self.tour_planner.reserved = {}
+			for package in self.grid.packages:
+				if package.reserved_by is not None:
+					self.tour_planner.reserved.setdefault(package.reserved_by, []).append(package)
+		if self.replanner is not None:
+			self.replanner.searches.clear()
+
+	def fork(self, snapshot: Snapshot = None):
+		"""
+		An independent simulation with the same options, continuing from ``snapshot`` (the current state by
+		default).
+
+		The fork runs on an :class:`ArrayGrid` that shares this grid's topology arrays, read-only, and the
+		adjacency, Jump Point Search and goal distance tables computed for it, so only the mutable state is built.
+		The fork does not record a trace.
+		"""
+		fork = Simulation(shared_grid(self.grid), **self.options)
+		fork.restore(snapshot if snapshot is not None else self.snapshot())
+		return fork
+
+	def close(self):
+		"""Close the trace, writing its last tick. Also called when leaving a ``with Simulation(...)`` block."""
+		if self.trace is not None:
+			self.trace.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+	def delivered_packages(self):
+		return sum(goal.delivered_packages for goal in self.grid.goals)
+
+	def run(self, ticks: int, seed=None):
+		"""
+		Step the simulation ``ticks`` times as fast as possible, without a GUI.
+
+		:param ticks: Number of ticks to simulate.
+		:param seed: Seed for ``self.random``, which random scenario changes such as :func:`add_robots` without a
+			seed of their own draw from, and for the arrivals and origins of the order stream (``None`` keeps the
+			stream's generator). The planners are deterministic and do not use it.
+		:return: Throughput summary with ``ticks``, ``packages_delivered``, ``packages_per_tick``,
+			``mean_idle_ratio`` (share of robot-ticks not spent moving) and wall-clock ``ticks_per_second``. With
+			an order stream, ``orders`` holds its :meth:`OrderStream.summary`, throughput over this run's ticks.
+		"""
+		self.random.seed(seed)
+		if self.orders is not None and seed is not None:
+			self.orders.reseed(seed)
+		self.simulation_running = True
+		delivered_before = self.delivered_packages()
+		statuses_before = self.metrics.status_totals()
+		orders_before = self.orders.checkpoint() if self.orders is not None else None
+
+		started = time.perf_counter()
+		try:
+			for _ in range(ticks):
+				self.update_simulation()
+		finally:
+			elapsed = time.perf_counter() - started
+			self.simulation_running = False
+			if self.trace is not None:
+				self.trace.flush()
+
+		delivered = self.delivered_packages() - delivered_before
+		statuses = self.metrics.status_totals() - statuses_before
+		robot_ticks = int(statuses.sum())
+		idle_robot_ticks = robot_ticks - int(statuses[STATUS_CODES[Status.ACTIVE]])
+		summary = {
+			"ticks": ticks,
+			"packages_delivered": delivered,
+			"packages_per_tick": delivered / ticks if ticks else 0.0,
+			"mean_idle_ratio": idle_robot_ticks / robot_ticks if robot_ticks else 0.0,
+			"ticks_per_second": ticks / elapsed if elapsed > 0 else float('inf'),
+		}
+		if self.orders is not None:
+			summary["orders"] = self.orders.summary(since=orders_before)
+		return summary
+
+	def plan_batch(self, robots):
+		# Jointly plan the leg to the next checkpoint of every robot without a path
+		agents = []
+		waiting = {}
+		for robot in robots:
+			if robot.path:
+				continue
+			self.reservations.release(robot.id)
+			checkpoints = robot.find_checkpoints(self.grid, self.tour_planner)
+			if checkpoints:
+				agents.append((robot.id, self.grid.cell_id(robot.position), self.grid.cell_id(checkpoints[0])))
+				waiting[robot.id] = robot
+			else:
+				self.reservations.park(robot.id, self.grid.cell_id(robot.position), self.tick)
+				self.grid.sleep_robot(robot)
+
+		if not agents:
+			return
+		paths = self.batch_solver.solve(agents, self.tick)
+		for robot_id, path in paths.items():
+			self.reservations.reserve(robot_id, path, self.tick)
+			waiting[robot_id].add_to_path([self.grid.position_of(cell_id) for cell_id in path[1:]])
+
+
+def add_robots(simulation: Simulation, count: int, seed=None, max_packages=5):
+	"""
+	Place ``count`` new robots on random free cells, e.g. as a :func:`fork_runs` scenario with
+	``functools.partial(add_robots, count=10)``.
+
+	:param seed: Seed of the cells drawn, ``None`` to draw them from ``simulation.random``, so the placement follows the
+		seed of the simulation's last run or snapshot.
+	:return: The robots added, fewer than ``count`` when the grid runs out of free cells.
+	"""
+	grid = simulation.grid
+	rng = random.Random(seed) if seed is not None else simulation.random
+	sources, _, _ = grid.edge_arrays()
+	cells = np.unique(sources).tolist()
+	rng.shuffle(cells)
+	next_id = max((robot.id for robot in grid.robots), default=-1) + 1
+	robots = []
+	for cell_id in cells:
+		if len(robots) == count:
+			break
+		position = grid.position_of(cell_id)
+		cell = grid.get_cell(position)
+		if not cell.has_robot() and not cell.has_goal():
+			robot = Robot(next_id + len(robots), position, max_packages=max_packages)
+			grid.add_robot(position, robot)
+			robots.append(robot)
+	grid.wake_robots()
+	return robots
+
+
+def _init_fork_worker(width, height, max_load, weights, snapshot, options):
+	global _fork_base
+	simulation = Simulation(ArrayGrid(width, height, max_load=max_load, weights=weights), **options)
+	simulation.restore(snapshot)
+	# Every fork of this worker shares the goal fields computed here
+	simulation.grid.goal_fields.refresh()
+	_fork_base = (simulation, snapshot)
+
+
+def _run_fork(scenario, ticks, seed):
+	simulation, snapshot = _fork_base
+	fork = simulation.fork(snapshot)
+	if scenario is not None:
+		scenario(fork)
+	return fork.run(ticks, seed=seed)
+
+
+def fork_runs(simulation: Simulation, scenarios, ticks: int, snapshot: Snapshot = None, seed=None, workers=None):
+	"""
+	Run one continuation of ``simulation`` per scenario over a process pool, all from the same snapshot.
+
+	Each worker receives the topology and the snapshot once and computes the goal distance fields once. Every run
+	then forks a fresh simulation from it, which only builds the mutable state.
+
+	:param scenarios: Callables that change a forked :class:`Simulation` before it runs, such as :func:`add_robots`,
+		or ``None`` for an unchanged continuation. They are sent to the workers, so they must be picklable.
+	:param snapshot: State to continue from, the current state of ``simulation`` by default.
+	:param seed: Seed of every run, see :meth:`Simulation.run`.
+	:param workers: Number of worker processes, all cores by default.
+	:return: The :meth:`Simulation.run` summaries, in the order of ``scenarios``.
+	"""
+	scenarios = list(scenarios)
+	if not scenarios:
+		return []
+	snapshot = snapshot if snapshot is not None else simulation.snapshot()
+	max_load, weights = topology(simulation.grid)
+	initargs = (simulation.grid.width, simulation.grid.height, max_load, weights, snapshot, simulation.options)
+	with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count(), len(scenarios)),
+							 initializer=_init_fork_worker, initargs=initargs) as pool:
+		return list(pool.map(_run_fork, scenarios, repeat(ticks), repeat(seed)))
+
+
+class RateCounter:
+	"""Events per second over a sliding window, e.g. simulated ticks or rendered frames."""
+
+	def __init__(self, window=1.0):
+		self.window = window
+		self.events = deque()
+
+	def tick(self):
+		now = time.perf_counter()
+		self.events.append(now)
+		while self.events[0] < now - self.window:
+			self.events.popleft()
+
+	@property
+	def rate(self):
+		if not self.events or time.perf_counter() - self.events[-1] > self.window:
+			return 0.0
+		return len(self.events) / self.window
+
+
+class SimulationLoop(threading.Thread):
+	"""
+	Steps a :class:`Simulation` in a background thread, independently of any rendering.
+
+	Every tick runs while holding ``lock``; readers (such as the GUI) take the same lock to see the grid between
+	ticks, never halfway through one. A slow planning tick only delays the next tick, not the reader.
+	"""
+
+	def __init__(self, simulation: Simulation, lock=None, tick_rate=10.0):
+		"""
+		:param lock: Lock guarding the grid, a new one by default.
+		:param tick_rate: Target ticks per second, ``None`` to step as fast as possible.
+		"""
+		super().__init__(daemon=True)
+		self.simulation = simulation
+		self.lock = lock or threading.Lock()
+		self.tick_rate = tick_rate
+		self.ticks = RateCounter()
+		self.playing = threading.Event()
+		self.stopped = threading.Event()
+
+	def run(self):
+		try:
+			while not self.stopped.is_set():
+				if not self.playing.wait(0.1) or self.stopped.is_set():
+					continue
+				started = time.perf_counter()
+				with self.lock:
+					self.simulation.simulation_running = True
+					self.simulation.update_simulation()
+				self.ticks.tick()
+				if self.tick_rate:
+					self.stopped.wait(max(0.0, 1.0 / self.tick_rate - (time.perf_counter() - started)))
+		finally:
+			# Only once no tick can still be writing to it
+			with self.lock:
+				self.simulation.close()
+
+	def play(self):
+		self.playing.set()
+
+	def pause(self):
+		self.playing.clear()
+
+	def stop(self, timeout=None):
+		"""Stop stepping and wait up to ``timeout`` seconds for the thread to close the simulation's trace."""
+		self.stopped.set()
+		self.playing.set()
+		if self.ident is None:
+			self.simulation.close()
+		elif threading.current_thread() is not self:
+			self.join(timeout)
@@ -0,0 +1,205 @@
+# snapshot.py
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from src.array_grid import ArrayGrid
+from src.goal import Goal
+from src.map_format import grid_to_map_data
+from src.package import Package
+from src.robot import Robot, Status
+
+if TYPE_CHECKING:
+    from src.grid import Grid
+
+# Status codes in the order of Status, and the robot attribute counting the ticks spent in each
+STATUSES = tuple(Status)
+STATUS_TIMES = {Status.OFF: "off_time", Status.ACTIVE: "active_time", Status.IDLE: "idle_time",
+                Status.BLOCKED: "blocked_time"}
+NONE = -1
+# Where a package is: on the grid, carried by robot ``holder`` or delivered to goal ``holder``
+ON_GRID, CARRIED, DELIVERED = 0, 1, 2
+TOPOLOGY_KEY = "topology"
+
+ROBOT_DTYPE = np.dtype([("id", "<i8"), ("cell", "<u4"), ("status", "u1"), ("dormant", "?"),
+                        ("max_packages", "<i4"), ("blocked_times", "<i4"), ("max_blocked_times", "<i4"),
+                        ("status_changed_tick", "<i8"), ("status_ticks", "<i8", (len(STATUSES),)),
+                        ("assigned", "<i4")])
+PACKAGE_DTYPE = np.dtype([("id", "<i8"), ("cell", "<u4"), ("place", "u1"), ("holder", "<i4"),
+                          ("reserved_by", "<i8")])
+GOAL_DTYPE = np.dtype([("id", "<i8"), ("cell", "<u4"), ("delivered", "<i8")])
+
+
+class Snapshot:
+    """
+    The mutable state of a simulated grid as a handful of NumPy arrays, without the topology.
+
+    ``robots``, ``goals`` and ``packages`` are record arrays in the order of the grid's lists. Every package has one
+    row: packages on the grid come first, then the packages carried by each robot and the packages delivered to each
+    goal, in the order the robot or goal holds them. A robot's assigned package is the index of its row. Paths and
+    the lengths of their legs are concatenated, robot ``i`` owning ``path_cells[path_offsets[i]:path_offsets[i + 1]]``.
+
+    Snapshots are plain arrays and pickle cheaply, e.g. to worker processes.
+
+    :ivar random_state: State of the simulation's random generator, set by :meth:`Simulation.snapshot`.
+    """
+
+    def __init__(self, width, height, tick, robots, path_cells, path_offsets, legs, leg_offsets, goals, packages,
+                 random_state=None):
+        self.width = width
+        self.height = height
+        self.tick = tick
+        self.robots = robots
+        self.path_cells = path_cells
+        self.path_offsets = path_offsets
+        self.legs = legs
+        self.leg_offsets = leg_offsets
+        self.goals = goals
+        self.packages = packages
+        self.random_state = random_state
+
+    def nbytes(self):
+        return sum(array.nbytes for array in (self.robots, self.path_cells, self.path_offsets, self.legs,
+                                              self.leg_offsets, self.goals, self.packages))
+
+
+def _offsets(lists):
+    offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+    np.cumsum([len(items) for items in lists], out=offsets[1:])
+    return offsets
+
+
+def capture_state(grid: 'Grid'):
+    """
+    Capture the robots, packages and goals of ``grid`` and its tick.
+
+    The rest of a hierarchical route (``Robot.route``) is not captured; a restored robot plans again once its path
+    runs out.
+    """
+    cell_id = grid.cell_id
+    packages = [(package, ON_GRID, NONE) for package in grid.packages]
+    for slot, robot in enumerate(grid.robots):
+        packages.extend((package, CARRIED, slot) for package in robot.packages)
+    for slot, goal in enumerate(grid.goals):
+        packages.extend((package, DELIVERED, slot) for package in goal.packages)
+    row_of = {id(package): row for row, (package, _, _) in enumerate(packages)}
+
+    package_records = np.array(
+        [(package.id, cell_id(package.position), place, holder,
+          NONE if package.reserved_by is None else package.reserved_by) for package, place, holder in packages],
+        dtype=PACKAGE_DTYPE).reshape(-1)
+    robot_records = np.array(
+        [(robot.id, cell_id(robot.position), STATUSES.index(robot.status), robot in grid.dormant,
+          robot.max_packages, robot.blocked_times, robot.max_blocked_times, robot.status_changed_tick,
+          [getattr(robot, STATUS_TIMES[status]) for status in STATUSES],
+          row_of.get(id(robot.assigned_package), NONE)) for robot in grid.robots],
+        dtype=ROBOT_DTYPE).reshape(-1)
+    goal_records = np.array([(goal.id, cell_id(goal.position), goal.delivered_packages) for goal in grid.goals],
+                            dtype=GOAL_DTYPE).reshape(-1)
+
+    paths = [[cell_id(position) for position in robot.path] for robot in grid.robots]
+    legs = [robot.legs for robot in grid.robots]
+    return Snapshot(grid.width, grid.height, grid.tick, robot_records,
+                    np.fromiter((cell for path in paths for cell in path), dtype=np.uint32), _offsets(paths),
+                    np.fromiter((leg for robot_legs in legs for leg in robot_legs), dtype=np.uint32),
+                    _offsets(legs), goal_records, package_records)
+
+
+def restore_state(grid: 'Grid', snapshot: Snapshot):
+    """
+    Replace the robots, packages and goals of ``grid`` with new objects in the state of ``snapshot``.
+
+    The grid must have the snapshot's size and is expected to have its topology. Goal distance fields already
+    computed for the same goal cells are kept.
+
+    :raises ValueError: If the grid's size differs from the snapshot's.
+    """
+    if (grid.width, grid.height) != (snapshot.width, snapshot.height):
+        raise ValueError(f"Snapshot of a {snapshot.width}x{snapshot.height} grid, "
+                         f"cannot restore it on a {grid.width}x{grid.height} grid")
+    previous_fields = grid.goal_fields
+    grid.goal_fields = type(previous_fields)(grid)
+    grid.reset()
+    grid.tick = snapshot.tick
+    position_of = grid.position_of
+
+    goals = []
+    for goal_id, cell, delivered in snapshot.goals.tolist():
+        goal = Goal(goal_id, position_of(cell))
+        goal.delivered_packages = delivered
+        grid.add_goal(goal.position, goal)
+        goals.append(goal)
+    grid.goal_fields.share(previous_fields)
+
+    packages = []
+    for package_id, cell, place, holder, reserved_by in snapshot.packages.tolist():
+        package = Package(package_id, position_of(cell))
+        if reserved_by != NONE:
+            package.reserved_by = reserved_by
+        if place == ON_GRID:
+            grid.add_package(package.position, package)
+        else:
+            package.searchable = False
+            package.moving = place == CARRIED
+        packages.append(package)
+
+    robots = []
+    path_offsets, leg_offsets = snapshot.path_offsets.tolist(), snapshot.leg_offsets.tolist()
+    path_cells, legs = snapshot.path_cells.tolist(), snapshot.legs.tolist()
+    for slot, record in enumerate(snapshot.robots.tolist()):
+        robot_id, cell, status, dormant, max_packages, blocked_times, max_blocked_times, changed, times, assigned = \
+            record
+        robot = Robot(robot_id, position_of(cell), max_packages, max_blocked_times)
+        grid.add_robot(robot.position, robot)
+        robot.blocked_times = blocked_times
+        robot.status = STATUSES[status]
+        robot.status_changed_tick = changed
+        for status_time, ticks in zip(STATUSES, times):
+            setattr(robot, STATUS_TIMES[status_time], ticks)
+        robot.path = [position_of(step) for step in path_cells[path_offsets[slot]:path_offsets[slot + 1]]]
+        robot.legs = legs[leg_offsets[slot]:leg_offsets[slot + 1]]
+        if assigned != NONE:
+            robot.assigned_package = packages[assigned]
+        if dormant:
+            grid.dormant.add(robot)
+        robots.append(robot)
+
+    for package, (_, _, place, holder, _) in zip(packages, snapshot.packages.tolist()):
+        if place == CARRIED:
+            robots[holder].packages.append(package)
+        elif place == DELIVERED:
+            goals[holder].packages.append(package)
+    return grid
+
+
+def topology(grid: 'Grid'):
+    """
+    The grid's ``(max_load, weights)`` arrays in the layout of :class:`ArrayGrid`, read-only.
+
+    An :class:`ArrayGrid`'s own arrays are returned as views; other grids build them once per topology version.
+    """
+    cached = grid.adjacency_cache.get(TOPOLOGY_KEY)
+    if cached is not None and cached[0] == grid.topology_version:
+        return cached[1]
+    if type(grid) is ArrayGrid:
+        max_load, weights = grid.max_load.view(), grid.weights.view()
+    else:
+        data = grid_to_map_data(grid)
+        max_load, weights = data.max_load, data.weights
+    max_load.flags.writeable = weights.flags.writeable = False
+    grid.adjacency_cache[TOPOLOGY_KEY] = (grid.topology_version, (max_load, weights))
+    return max_load, weights
+
+
+def shared_grid(grid: 'Grid'):
+    """
+    An empty :class:`ArrayGrid` on the topology of ``grid``, sharing its arrays (read-only) and the adjacency and
+    Jump Point Search tables it has computed.
+    """
+    max_load, weights = topology(grid)
+    shared = ArrayGrid(grid.width, grid.height, max_load=max_load, weights=weights)
+    for key, (version, value) in grid.adjacency_cache.items():
+        if version == grid.topology_version:
+            shared.adjacency_cache[key] = (shared.topology_version, value)
+    shared.goal_fields.share(grid.goal_fields)
+    return shared
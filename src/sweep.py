@@ -0,0 +1,153 @@
+# sweep.py
+import argparse
+import csv
+import itertools
+import os
+import random
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src.goal import Goal
+from src.grid import Grid
+from src.package import Package
+from src.robot import Robot
+from src.sim import Simulation
+
+SUMMARY_FIELDS = ("ticks", "packages_delivered", "packages_per_tick", "mean_idle_ratio", "ticks_per_second")
+DEFAULTS = {"robots": 4, "packages": 50, "max_packages": 5, "goals": "map", "planner": "independent",
+            "ticks": 1000, "seed": 0}
+
+# Maps loaded by the current worker process, by file name
+_maps = {}
+
+
+def parameter_grid(maps, **axes):
+    """
+    Every combination of the given parameter values, one dict per run.
+
+    :param maps: Map files to run every combination on.
+    :param axes: Parameter name to list of values; missing parameters take their value from ``DEFAULTS``.
+    """
+    names = ["map"] + sorted(set(DEFAULTS) | set(axes))
+    values = [list(maps)] + [list(axes.get(name, [DEFAULTS[name]])) for name in names[1:]]
+    return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+
+def load_maps(map_files):
+    """Worker initializer: load every map once, later runs only reset the grid's entities."""
+    for map_file in map_files:
+        if map_file not in _maps:
+            grid = Grid.grid_from_json(map_file)
+            _maps[map_file] = (grid, [goal.position for goal in grid.goals])
+
+
+def build_scenario(params):
+    """
+    Reset the worker's copy of ``params["map"]`` and place goals, robots and packages drawn from ``params["seed"]``.
+
+    ``goals`` is either ``"map"``, to keep the goals stored in the map file, or a number of goals to place at random.
+    """
+    if params["map"] not in _maps:
+        load_maps([params["map"]])
+    grid, map_goals = _maps[params["map"]]
+    grid.reset()
+
+    rng = random.Random(params["seed"])
+    free = [cell.position for row in grid.grid for cell in row if cell.connections]
+    if params["goals"] == "map":
+        goal_positions = map_goals
+    else:
+        goal_positions = rng.sample(free, int(params["goals"]))
+    for goal_id, position in enumerate(goal_positions):
+        grid.add_goal(position, Goal(goal_id, position))
+
+    free = [position for position in free if not grid.get_cell(position).has_goal()]
+    for robot_id, position in enumerate(rng.sample(free, int(params["robots"]))):
+        grid.add_robot(position, Robot(robot_id, position, max_packages=int(params["max_packages"])))
+    for package_id in range(int(params["packages"])):
+        position = rng.choice(free)
+        grid.add_package(position, Package(package_id, position))
+    return grid
+
+
+def run_scenario(params):
+    """
+    Simulate one run of a sweep.
+
+    :return: ``params`` extended with the :meth:`Simulation.run` summary; a run that raises is reported through
+        the ``error`` field instead of failing the sweep.
+    """
+    row = dict(params, error="")
+    try:
+        grid = build_scenario(params)
+        simulation = Simulation(grid, planner=params["planner"])
+        row.update(simulation.run(int(params["ticks"]), seed=params["seed"]))
+    except Exception:
+        row["error"] = traceback.format_exc(limit=-1).strip().splitlines()[-1]
+    return row
+
+
+def sweep(runs, output, workers=None):
+    """
+    Run every parameter dict of ``runs`` over a process pool and append one CSV row per run as it finishes.
+
+    Each worker loads the maps once and reuses its grids (and their path caches and goal fields) for every run
+    it is given. Rows are written in completion order and flushed immediately, so a long sweep can be inspected
+    or resumed from a partial file.
+
+    :param runs: Parameter dicts, e.g. from :func:`parameter_grid`.
+    :param output: CSV file to write.
+    :param workers: Number of worker processes, all cores by default.
+    :return: Number of failed runs.
+    """
+    runs = list(runs)
+    if not runs:
+        return 0
+    parameter_names = list(runs[0])
+    fieldnames = ["run"] + parameter_names + [name for name in SUMMARY_FIELDS if name not in parameter_names]
+    fieldnames.append("error")
+    map_files = sorted({params["map"] for params in runs})
+    failed = 0
+
+    with open(output, "w", newline="") as f, ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                                                 initializer=load_maps,
+                                                                 initargs=(map_files,)) as pool:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        futures = {pool.submit(run_scenario, params): index for index, params in enumerate(runs)}
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                row = future.result()
+            except Exception as exception:
+                # The worker itself died (e.g. killed for memory); the pool replaces it for later runs
+                row = dict(runs[index], error=repr(exception))
+            failed += bool(row["error"])
+            writer.writerow(dict(row, run=index))
+            f.flush()
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a parameter sweep of headless simulations.")
+    parser.add_argument("maps", nargs="+", help="Map files written by map_generator.generate_grid")
+    parser.add_argument("--robots", type=int, nargs="+", default=[DEFAULTS["robots"]])
+    parser.add_argument("--packages", type=int, nargs="+", default=[DEFAULTS["packages"]])
+    parser.add_argument("--max-packages", type=int, nargs="+", default=[DEFAULTS["max_packages"]])
+    parser.add_argument("--goals", nargs="+", default=[DEFAULTS["goals"]],
+                        help='"map" to keep the goals of the map file, or a number of goals to place at random')
+    parser.add_argument("--planner", nargs="+", default=[DEFAULTS["planner"]])
+    parser.add_argument("--ticks", type=int, nargs="+", default=[DEFAULTS["ticks"]])
+    parser.add_argument("--seeds", type=int, nargs="+", default=[DEFAULTS["seed"]])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default="sweep.csv")
+    args = parser.parse_args(argv)
+
+    runs = parameter_grid(args.maps, robots=args.robots, packages=args.packages, max_packages=args.max_packages,
+                          goals=args.goals, planner=args.planner, ticks=args.ticks, seed=args.seeds)
+    failed = sweep(runs, args.output, args.workers)
+    print(f"{len(runs)} runs written to {args.output}, {failed} failed")
+
+
+if __name__ == "__main__":
+    main()
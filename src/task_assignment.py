@@ -0,0 +1,240 @@
+# task_assignment.py
+import time
+from typing import TYPE_CHECKING, List
+
+import numpy as np
+
+from src.pathfinding import Pathfinding
+
+if TYPE_CHECKING:
+    from src.grid import Grid
+    from src.robot import Robot
+
+METHODS = ("hungarian", "auction")
+
+
+def _finite(cost):
+    # Solvers work on finite costs: an unreachable pair costs more than any complete finite assignment
+    finite = np.isfinite(cost)
+    big = (np.abs(cost[finite]).max() + 1) * (min(cost.shape) + 1) if finite.any() else 1.0
+    return np.where(finite, cost, big)
+
+
+def hungarian(cost):
+    """
+    Minimum-cost assignment of rows to columns (Hungarian method with shortest augmenting paths, O(n^2 m)).
+
+    :param cost: ``(n, m)`` cost matrix, ``inf`` for forbidden pairs.
+    :return: ``(rows, columns)`` index arrays of the ``min(n, m)`` assigned pairs; forbidden pairs are left out.
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    if cost.shape[0] > cost.shape[1]:
+        columns, rows = hungarian(cost.T)
+        order = np.argsort(rows)
+        return rows[order], columns[order]
+    n, m = cost.shape
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    matrix = _finite(cost)
+
+    # 1-based potentials and column owners, column 0 is the virtual start of every augmenting path
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    owner = np.zeros(m + 1, dtype=np.int64)
+    way = np.zeros(m + 1, dtype=np.int64)
+    for row in range(1, n + 1):
+        owner[0] = row
+        column = 0
+        min_value = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[column] = True
+            current_row = owner[column]
+            reduced = matrix[current_row - 1] - u[current_row] - v[1:]
+            free = ~used[1:]
+            better = free & (reduced < min_value[1:])
+            min_value[1:][better] = reduced[better]
+            way[1:][better] = column
+            candidates = np.where(free, min_value[1:], np.inf)
+            next_column = int(np.argmin(candidates)) + 1
+            delta = candidates[next_column - 1]
+            u[owner[used]] += delta
+            v[used] -= delta
+            min_value[1:][free] -= delta
+            column = next_column
+            if owner[column] == 0:
+                break
+        while column:
+            previous = way[column]
+            owner[column] = owner[previous]
+            column = previous
+
+    columns = np.flatnonzero(owner[1:])
+    rows = owner[1:][columns] - 1
+    order = np.argsort(rows)
+    rows, columns = rows[order], columns[order]
+    keep = np.isfinite(cost[rows, columns])
+    return rows[keep], columns[keep]
+
+
+def auction(cost, min_epsilon=None):
+    """
+    Minimum-cost assignment with Bertsekas' auction algorithm, Jacobi variant with epsilon scaling.
+
+    Every round all unassigned rows bid at once, vectorized over the whole cost matrix, and each column goes to its
+    highest bidder. Rectangular problems are padded to square with zero-cost dummy rows, which bid for distinct
+    cheap columns so they do not start a price war among themselves. The result is within
+    ``max(n, m) * min_epsilon`` of optimal, which is exact for integer costs with the default ``min_epsilon``.
+
+    :param cost: ``(n, m)`` cost matrix, ``inf`` for forbidden pairs.
+    :return: ``(rows, columns)`` index arrays of the assigned pairs, like :func:`hungarian`.
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    if cost.shape[0] > cost.shape[1]:
+        columns, rows = auction(cost.T, min_epsilon)
+        order = np.argsort(rows)
+        return rows[order], columns[order]
+    rows_wanted, m = cost.shape
+    if rows_wanted == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    benefit = -_finite(cost)
+    # Rows past rows_wanted are zero-cost dummies that take the columns left over
+    n = m
+    if min_epsilon is None:
+        min_epsilon = 1.0 / (n + 1)
+    # Scale from the spread of the allowed costs: the stand-in for forbidden pairs would only add idle phases
+    finite = cost[np.isfinite(cost)]
+    epsilon = max(np.ptp(finite) / 4 if len(finite) else 0.0, min_epsilon)
+
+    prices = np.zeros(m)
+    while True:
+        column_of = np.full(n, -1, dtype=np.int64)
+        row_of = np.full(m, -1, dtype=np.int64)
+        while True:
+            unassigned = np.flatnonzero(column_of < 0)
+            if len(unassigned) == 0:
+                break
+            bidders = unassigned[unassigned < rows_wanted]
+            values = benefit[bidders] - prices
+            best = np.argmax(values, axis=1)
+            best_value = values[np.arange(len(bidders)), best]
+            if m > 1:
+                values[np.arange(len(bidders)), best] = -np.inf
+                second_value = values.max(axis=1)
+            else:
+                second_value = best_value
+            bids = prices[best] + best_value - second_value + epsilon
+
+            # Dummies are interchangeable: instead of all bidding for the cheapest column, the k unassigned ones
+            # bid for the k cheapest columns, each just above the (k + 1)-th cheapest price
+            dummies = unassigned[unassigned >= rows_wanted]
+            if len(dummies):
+                cheapest = np.argsort(prices, kind="stable")
+                ceiling = prices[cheapest[len(dummies)]] if len(dummies) < m else prices[cheapest[-1]]
+                bidders = np.concatenate([bidders, dummies])
+                best = np.concatenate([best, cheapest[:len(dummies)]])
+                bids = np.concatenate([bids, np.full(len(dummies), ceiling + epsilon)])
+
+            # Highest bid per column wins, ties go to the lowest row
+            order = np.lexsort((bidders, -bids, best))
+            first = np.ones(len(order), dtype=bool)
+            first[1:] = best[order][1:] != best[order][:-1]
+            won_columns, winners, winning_bids = best[order][first], bidders[order][first], bids[order][first]
+
+            previous = row_of[won_columns]
+            column_of[previous[previous >= 0]] = -1
+            row_of[won_columns] = winners
+            column_of[winners] = won_columns
+            prices[won_columns] = winning_bids
+        if epsilon <= min_epsilon:
+            break
+        epsilon = max(epsilon / 4, min_epsilon)
+
+    rows = np.arange(rows_wanted)
+    column_of = column_of[:rows_wanted]
+    keep = np.isfinite(cost[rows, column_of])
+    return rows[keep], column_of[keep]
+
+
+class TaskAssigner:
+    """
+    Assigns available packages to robots before path planning, minimizing the total travel cost to the first
+    pick-up instead of letting every robot grab its own nearest package.
+
+    The cost of a robot for a package is the real travel cost through the connection graph. It is found with a
+    Dijkstra search from the robot that stops after ``candidates`` package cells, so each row of the cost matrix
+    holds the robot's nearest candidates and the rest are forbidden. Problems are solved exactly with
+    :func:`hungarian` unless :func:`auction` is asked for. Assignments are written back as reservations:
+    ``robot.assigned_package`` and ``package.reserved_by``, which other robots leave alone.
+
+    :ivar stats: ``robots``, ``packages``, ``assigned``, ``method``, ``cost`` (total travel cost of the assignment)
+        and ``runtime`` of the last :meth:`assign`, split into ``cost_runtime`` and ``solve_runtime``.
+    """
+
+    def __init__(self, grid: 'Grid', method="hungarian", candidates=16):
+        """
+        :param method: ``"hungarian"`` or ``"auction"``, which is only faster on mid-sized square problems (see
+            ``benchmarks.task_assignment``).
+        :param candidates: Package cells each robot is costed against.
+        """
+        if method not in METHODS:
+            raise ValueError(f"Unknown assignment method {method}, expected one of {METHODS}")
+        self.grid = grid
+        self.method = method
+        self.candidates = candidates
+        self.pathfinding = Pathfinding(grid)
+        self.stats = {}
+
+    def cost_matrix(self, robots: List['Robot'], packages):
+        package_cells = {}
+        for column, package in enumerate(packages):
+            package_cells.setdefault(self.grid.cell_id(package.position), []).append(column)
+
+        cost = np.full((len(robots), len(packages)), np.inf)
+        for row, robot in enumerate(robots):
+            found = self.pathfinding.nearest_targets(self.grid.cell_id(robot.position), package_cells, self.candidates)
+            for cell, distance in found.items():
+                cost[row, package_cells[cell]] = distance
+        return cost
+
+    def solve(self, cost):
+        return hungarian(cost) if self.method == "hungarian" else auction(cost)
+
+    def assign(self, robots: List['Robot']):
+        """
+        Assign packages to the robots that can load more and drop their previous reservations.
+
+        :param robots: Robots about to plan a new path.
+        :return: Robot id to assigned package.
+        """
+        started = time.perf_counter()
+        robots = [robot for robot in robots if robot.can_load()]
+        for robot in robots:
+            robot.release_assignment()
+        packages = [package for package in self.grid.packages if package.searchable and package.reserved_by is None]
+
+        cost = self.cost_matrix(robots, packages)
+        for column, package in enumerate(packages):
+            holder = self.grid.get_cell(package.position).robot
+            if holder is not None:
+                # Out of reach for every other robot until it moves on, see Robot.can_take_package
+                cost[[row for row, robot in enumerate(robots) if robot is not holder], column] = np.inf
+        # Packages no robot has as a candidate cannot be assigned, keep them out of the solver
+        reachable = np.flatnonzero(np.isfinite(cost).any(axis=0))
+        packages = [packages[column] for column in reachable.tolist()]
+        cost = cost[:, reachable]
+        cost_runtime = time.perf_counter() - started
+        rows, columns = self.solve(cost)
+
+        assignments = {}
+        for row, column in zip(rows.tolist(), columns.tolist()):
+            robot, package = robots[row], packages[column]
+            robot.assigned_package = package
+            package.reserved_by = robot.id
+            assignments[robot.id] = package
+
+        runtime = time.perf_counter() - started
+        self.stats = {"robots": len(robots), "packages": len(packages), "assigned": len(assignments),
+                      "method": self.method, "cost": float(cost[rows, columns].sum()), "runtime": runtime,
+                      "cost_runtime": cost_runtime, "solve_runtime": runtime - cost_runtime}
+        return assignments
@@ -0,0 +1,252 @@
+# tour_planning.py
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, List
+
+import numpy as np
+
+from src.pathfinding import Pathfinding
+
+if TYPE_CHECKING:
+    from src.grid import Grid
+    from src.robot import Robot
+
+
+class TravelCostCache:
+    """
+    Bounded LRU cache of cell-to-cell travel costs through the connection graph.
+
+    Missing costs from one source are found together with a single Dijkstra search that stops once every requested
+    target is settled. The cache empties itself when the grid's ``topology_version`` changes.
+    """
+
+    def __init__(self, grid: 'Grid', capacity=65536):
+        self.grid = grid
+        self.capacity = capacity
+        self.pathfinding = Pathfinding(grid)
+        self.entries = OrderedDict()
+        self.version = grid.topology_version
+        self.hits = 0
+        self.misses = 0
+
+    def matrix(self, sources: List[int], targets: List[int]):
+        """
+        :return: ``(len(sources), len(targets))`` array of travel costs, ``inf`` where a target is unreachable.
+        """
+        if self.grid.topology_version != self.version:
+            self.entries.clear()
+            self.version = self.grid.topology_version
+
+        costs = np.empty((len(sources), len(targets)))
+        for row, source in enumerate(sources):
+            missing = [target for target in set(targets) if (source, target) not in self.entries]
+            self.hits += len(set(targets)) - len(missing)
+            self.misses += len(missing)
+            if missing:
+                found = self.pathfinding.nearest_targets(source, set(missing), len(missing))
+                for target in missing:
+                    self.entries[(source, target)] = found.get(target, np.inf)
+            for column, target in enumerate(targets):
+                key = (source, target)
+                self.entries.move_to_end(key)
+                costs[row, column] = self.entries[key]
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+        return costs
+
+    def cost(self, source: int, target: int):
+        return float(self.matrix([source], [target])[0, 0])
+
+
+class TourPlanner:
+    """
+    Plans a robot's next trip: up to its free capacity of pick-ups followed by the drop-off at the goal nearest to
+    the last one, choosing the number of pick-ups with the lowest travel cost per package.
+
+    The robot's ``candidates * capacity`` nearest takeable packages are costed against each other with a
+    :class:`TravelCostCache`. A tour is built by cheapest insertion, then improved with 2-opt (reversing a run of
+    pick-ups), or-opt (moving a run of up to three pick-ups) and exchanges with unused candidates until no move helps or
+    ``time_budget`` seconds have passed. A package assigned to the robot by a :class:`TaskAssigner` is always part of
+    the tour, and the tour's packages are reserved for the robot until it plans the next one.
+
+    :ivar stats: ``pickups``, ``cost``, ``moves`` (improving local search moves) and ``runtime`` of the last tour,
+        plus ``greedy_pickups`` and ``greedy_cost`` of the greedy checkpoint chain when ``compare`` is set.
+    :ivar totals: The same counters summed over every tour planned.
+    """
+
+    def __init__(self, grid: 'Grid', time_budget=0.005, candidates=3, compare=False, cache_size=65536):
+        """
+        :param time_budget: Seconds of local search per tour.
+        :param candidates: Packages considered per free slot.
+        :param compare: Also cost the tour :meth:`Robot.find_checkpoints` would chain greedily, for :meth:`savings`.
+        """
+        self.grid = grid
+        self.time_budget = time_budget
+        self.candidates = candidates
+        self.compare = compare
+        self.travel_costs = TravelCostCache(grid, cache_size)
+        self.reserved = {}
+        self.stats = {}
+        self.totals = {"tours": 0, "pickups": 0, "cost": 0.0, "greedy_pickups": 0, "greedy_cost": 0.0}
+
+    def plan(self, robot: 'Robot'):
+        """
+        :return: Checkpoint positions (pick-ups, then the goal), or an empty list when there is nothing to pick up.
+        """
+        started = time.perf_counter()
+        self.release(robot)
+        capacity = robot.max_packages - len(robot.packages)
+        if capacity <= 0:
+            return []
+        required = robot.assigned_package
+        if required is not None and not (required.searchable and robot.can_take_package(self.grid, required)):
+            # Picked up by another robot on its way, or under a robot that may be waiting for us
+            robot.release_assignment()
+            required = None
+        packages = self.grid.package_index.nearest(
+            robot.position, k=self.candidates * capacity,
+            predicate=lambda package: package is not required and robot.can_take_package(self.grid, package))
+        if required is not None:
+            packages.insert(0, required)
+        if not packages:
+            return []
+
+        # Node 0 is the robot, node i + 1 the i-th candidate
+        cells = [self.grid.cell_id(robot.position)] + [self.grid.cell_id(package.position) for package in packages]
+        legs = self.travel_costs.matrix(cells, cells[1:])
+        reachable = np.flatnonzero(np.isfinite(legs[0])).tolist()
+        if not reachable:
+            return []
+        # Without a reachable goal the tour just ends at its last pick-up
+        goal_costs = [self.grid.nearest_goal(package.position)[1] for package in packages]
+        goal_costs = [cost if cost != np.inf else 0.0 for cost in goal_costs]
+        tour = Tour(legs, goal_costs, fixed=0 if required is not None and 0 in reachable else None)
+
+        route = tour.insert(reachable, min(capacity, len(reachable)))
+        route, moves = tour.improve(route, reachable, started + self.time_budget)
+
+        # Other robots leave the packages of this tour alone until the robot plans its next one
+        self.reserved[robot.id] = [packages[node] for node in route]
+        for package in self.reserved[robot.id]:
+            package.reserved_by = robot.id
+        checkpoints = [packages[node].position for node in route]
+        goal, _ = self.grid.nearest_goal(checkpoints[-1])
+        if goal is not None:
+            checkpoints.append(goal.position)
+
+        self.stats = {"pickups": len(route), "cost": tour.cost(route), "moves": moves}
+        if self.compare:
+            greedy = robot.find_checkpoints(self.grid)
+            delivers = bool(greedy) and self.grid.get_cell(greedy[-1]).has_goal()
+            self.stats["greedy_pickups"] = len(greedy) - delivers
+            self.stats["greedy_cost"] = self.path_cost(robot.position, greedy)
+        self.stats["runtime"] = time.perf_counter() - started
+        self.totals["tours"] += 1
+        for key in ("pickups", "cost", "greedy_pickups", "greedy_cost"):
+            self.totals[key] += self.stats.get(key, 0)
+        return checkpoints
+
+    def release(self, robot: 'Robot'):
+        for package in self.reserved.pop(robot.id, []):
+            if package.reserved_by == robot.id and package is not robot.assigned_package:
+                package.reserved_by = None
+
+    def path_cost(self, start, checkpoints):
+        cells = [self.grid.cell_id(position) for position in [start] + list(checkpoints)]
+        return sum(self.travel_costs.cost(source, target) for source, target in zip(cells, cells[1:]))
+
+    def savings(self):
+        """
+        Share of travel cost per picked-up package saved against greedy chaining, over every tour planned with
+        ``compare`` set.
+        """
+        if not self.totals["pickups"] or not self.totals["greedy_pickups"] or not self.totals["greedy_cost"]:
+            return 0.0
+        planned = self.totals["cost"] / self.totals["pickups"]
+        greedy = self.totals["greedy_cost"] / self.totals["greedy_pickups"]
+        return 1.0 - planned / greedy
+
+
+class Tour:
+    """Open tour from the robot through pick-up nodes to the nearest goal of the last one, over a cost matrix."""
+
+    def __init__(self, legs, goal_costs, fixed=None):
+        """
+        :param legs: ``legs[0, j]`` is the cost from the robot to node ``j``, ``legs[i + 1, j]`` from node ``i``.
+        :param goal_costs: Cost from each node to its nearest goal.
+        :param fixed: Node that must stay in the tour.
+        """
+        self.legs = legs.tolist()
+        self.goal_costs = list(goal_costs)
+        self.fixed = fixed
+
+    def cost(self, route):
+        if not route:
+            return 0.0
+        legs = self.legs
+        total = legs[0][route[0]] + self.goal_costs[route[-1]]
+        for a, b in zip(route, route[1:]):
+            total += legs[a + 1][b]
+        return total
+
+    def insert(self, nodes, size):
+        """
+        Cheapest insertion, starting from the fixed node if there is one.
+
+        :return: The route of at most ``size`` nodes grown along the way with the lowest cost per pick-up.
+        """
+        route = [self.fixed] if self.fixed is not None else []
+        unused = [node for node in nodes if node != self.fixed]
+        best_route = route
+        while len(route) < size and unused:
+            best = None
+            for node in unused:
+                for index in range(len(route) + 1):
+                    candidate = route[:index] + [node] + route[index:]
+                    cost = self.cost(candidate)
+                    if best is None or cost < best[0]:
+                        best = (cost, candidate, node)
+            if best[0] == np.inf:
+                break
+            route = best[1]
+            unused.remove(best[2])
+            if not best_route or best[0] / len(route) < self.cost(best_route) / len(best_route):
+                best_route = route
+        return best_route
+
+    def neighbours(self, route, nodes):
+        # 2-opt
+        for i in range(len(route) - 1):
+            for j in range(i + 1, len(route)):
+                yield route[:i] + route[i:j + 1][::-1] + route[j + 1:]
+        # or-opt
+        for length in range(1, min(3, len(route) - 1) + 1):
+            for i in range(len(route) - length + 1):
+                segment, rest = route[i:i + length], route[:i] + route[i + length:]
+                for j in range(len(rest) + 1):
+                    if j != i:
+                        yield rest[:j] + segment + rest[j:]
+        # Swap a pick-up for an unused candidate, inserted anywhere
+        unused = [node for node in nodes if node not in route]
+        for i, node in enumerate(route):
+            if node != self.fixed:
+                rest = route[:i] + route[i + 1:]
+                for other in unused:
+                    for j in range(len(rest) + 1):
+                        yield rest[:j] + [other] + rest[j:]
+
+    def improve(self, route, nodes, deadline):
+        """First-improvement local search until a local optimum or ``deadline`` (a ``perf_counter`` value)."""
+        best = self.cost(route)
+        moves = 0
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            improved = False
+            for candidate in self.neighbours(route, nodes):
+                cost = self.cost(candidate)
+                if cost < best - 1e-9:
+                    route, best = candidate, cost
+                    moves += 1
+                    improved = True
+                    break
+        return route, moves
@@ -0,0 +1,81 @@
+import unittest
+import sys
+import os
+
+sys.path.append(os.getcwd())
+from src.array_grid import ArrayGrid
+from src.goal import Goal
+from src.grid import Grid
+from src.package import Package
+from src.position import Position
+from src.robot import Robot
+
+
+class TestArrayGrid(unittest.TestCase):
+
+	def setUp(self):
+		self.grid = ArrayGrid(4, 3)
+		self.grid.connect_neighbours()
+
+	def test_views_read_and_write_arrays(self):
+		position = Position(2, 1)
+		robot = Robot(0, position)
+		self.grid.add_robot(position, robot)
+
+		self.assertIs(self.grid.get_cell(position).robot, robot)
+		self.assertIs(self.grid.grid[1][2].robot, robot)
+		self.assertFalse(self.grid.is_valid_move(position))
+		self.assertTrue(self.grid.is_valid_move(Position(0, 0)))
+		self.assertFalse(self.grid.is_inside_grid(Position(4, 0)))
+
+		self.grid.remove_robot(position)
+		self.assertIsNone(self.grid.get_cell(position).robot)
+		self.assertEqual(self.grid.robots, [])
+		self.assertTrue(self.grid.is_valid_move(position))
+
+	def test_packages_respect_max_load(self):
+		position = Position(0, 0)
+		self.grid.get_cell(position).max_load = 2
+		for i in range(3):
+			self.grid.add_package(position, Package(i, position))
+
+		self.assertEqual(len(self.grid.get_cell(position).packages), 2)
+		self.assertEqual(self.grid.package_counts[0], 2)
+
+		package = self.grid.remove_package(position)
+		self.assertEqual(package.id, 0)
+		self.assertEqual(self.grid.package_counts[0], 1)
+		self.assertEqual(self.grid.package_count, 1)
+
+	def test_goals(self):
+		position = Position(3, 2)
+		goal = Goal(0, position)
+		self.grid.add_goal(position, goal)
+		self.assertTrue(self.grid.get_cell(position).has_goal())
+		self.grid.remove_goal(position)
+		self.assertFalse(self.grid.get_cell(position).has_goal())
+		self.assertEqual(self.grid.goals, [])
+
+	def test_connections(self):
+		corner = self.grid.get_cell(Position(0, 0))
+		self.assertEqual(sorted(c.to_cell.id for c in corner.connections), [1, 4])
+
+		corner.remove_connection(self.grid.get_cell(Position(1, 0)))
+		self.assertEqual([c.to_cell.id for c in corner.connections], [4])
+
+		corner.add_connection(self.grid.get_cell(Position(1, 0)), 3)
+		self.assertIn((1, 3.0), self.grid.neighbour_ids(0))
+		self.assertIn((0, 3.0), self.grid.incoming_ids(1))
+		self.assertEqual(sorted(cell for cell, _ in self.grid.incoming_ids(0)), [1, 4])
+
+		with self.assertRaises(ValueError):
+			corner.add_connection(self.grid.get_cell(Position(2, 2)))
+
+	def test_shares_the_grid_state(self):
+		# Everything Grid sets up besides its cells, so a field added there cannot be missing here
+		state = set(vars(Grid(4, 3))) - {"grid"}
+		self.assertLessEqual(state, set(vars(self.grid)))
+
+
+if __name__ == "__main__":
+	unittest.main()
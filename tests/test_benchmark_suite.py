@@ -0,0 +1,47 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+from benchmarks.suite import compare, fleet_sizes, generate_map
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+
+	def test_generated_maps_are_seeded(self):
+		first, second = generate_map(20, seed=3, robots=10), generate_map(20, seed=3, robots=10)
+		for name in ("weights", "robots", "goals", "packages"):
+			np.testing.assert_array_equal(getattr(first, name), getattr(second, name))
+		self.assertFalse(np.array_equal(first.weights, generate_map(20, seed=4, robots=10).weights))
+
+	def test_entities_sit_on_connected_cells(self):
+		data = generate_map(30, obstacles=0.4, robots=50)
+		connected = np.isfinite(data.weights).any(axis=0)
+		self.assertEqual((len(data.robots), len(data.goals), len(data.packages)), (50, 8, 500))
+		self.assertTrue(connected[data.robots["cell"]].all())
+		self.assertTrue(connected[data.packages["cell"]].all())
+		self.assertFalse(np.isin(data.packages["cell"], data.goals["cell"]).any())
+		self.assertEqual(len(set(data.robots["cell"]) | set(data.goals["cell"])), 58)
+		self.assertLessEqual(np.bincount(data.packages["cell"]).max(), 10)
+		# Every edge has its reverse
+		right, left = data.weights[1].reshape(30, 30), data.weights[0].reshape(30, 30)
+		np.testing.assert_array_equal(right[:, :-1], left[:, 1:])
+
+	def test_fleet_sizes(self):
+		self.assertEqual(fleet_sizes(73), [1, 10])
+		self.assertEqual(fleet_sizes(1000), [1, 10, 100, 1000])
+
+	def test_compare_flags_worse_timings_only(self):
+		baseline = {"tiers": {"10": {"queries_per_second": 100.0, "open_cells": 80,
+									 "load": {"json_seconds": 1.0, "binary_seconds": 1.0}}}}
+		current = {"tiers": {"10": {"queries_per_second": 70.0, "open_cells": 90,
+									"load": {"json_seconds": 1.1, "binary_seconds": 2.0}}}}
+		rows = {name: regressed for name, _, _, _, regressed in compare(baseline, current, threshold=0.25)}
+		self.assertEqual(rows, {"10/queries_per_second": True, "10/open_cells": False,
+								"10/load/json_seconds": False, "10/load/binary_seconds": True})
+
+
+if __name__ == '__main__':
+	unittest.main()
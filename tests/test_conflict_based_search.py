@@ -0,0 +1,46 @@
+import unittest
+import sys
+import os
+
+sys.path.append(os.getcwd())
+from src.conflict_based_search import ConflictBasedSearch, find_conflicts
+from src.grid import Grid
+from tests.test_reservation_table import corridor_with_pocket
+
+
+class TestConflictBasedSearch(unittest.TestCase):
+
+	def test_head_on_robots_use_the_pocket(self):
+		solver = ConflictBasedSearch(corridor_with_pocket(), max_nodes=200, time_limit=5)
+		paths = solver.solve([("a", 0, 4), ("b", 4, 0)], start_tick=10)
+
+		self.assertTrue(solver.solved)
+		self.assertEqual(find_conflicts(paths), [])
+		self.assertEqual((paths["a"][0], paths["a"][-1]), (0, 4))
+		self.assertEqual((paths["b"][0], paths["b"][-1]), (4, 0))
+		self.assertTrue(7 in paths["a"] or 7 in paths["b"])
+		self.assertGreater(solver.stats["conflicts_resolved"], 0)
+
+	def test_budget_returns_best_so_far(self):
+		solver = ConflictBasedSearch(corridor_with_pocket(), max_nodes=0)
+		paths = solver.solve([("a", 0, 4), ("b", 4, 0)], start_tick=0)
+		self.assertFalse(solver.solved)
+		self.assertEqual(set(paths), {"a", "b"})
+		self.assertEqual(solver.stats["high_level_expanded"], 0)
+
+	def test_bounded_suboptimal_search(self):
+		grid = Grid(6, 6)
+		grid.connect_neighbours()
+		agents = [(0, 0, 35), (1, 35, 0), (2, 5, 30), (3, 30, 5)]
+		optimal = ConflictBasedSearch(grid, max_nodes=1000, time_limit=10)
+		optimal_paths = optimal.solve(agents, 0)
+		bounded = ConflictBasedSearch(grid, suboptimality=1.5, max_nodes=1000, time_limit=10)
+		bounded_paths = bounded.solve(agents, 0)
+
+		self.assertTrue(optimal.solved and bounded.solved)
+		self.assertEqual(find_conflicts(bounded_paths), [])
+		self.assertLessEqual(ConflictBasedSearch.cost(bounded_paths), 1.5 * ConflictBasedSearch.cost(optimal_paths))
+
+
+if __name__ == "__main__":
+	unittest.main()
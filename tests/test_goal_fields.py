@@ -0,0 +1,66 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+from src.array_grid import ArrayGrid
+from src.goal import Goal
+from src.grid import Grid
+from src.position import Position
+from src.robot import Robot
+
+
+def walled_grid(grid_cls):
+	# 5x5 floor with a wall between columns 1 and 2, open only on the bottom row
+	grid = grid_cls(5, 5)
+	grid.connect_neighbours()
+	for y in range(4):
+		left, right = grid.get_cell(Position(1, y)), grid.get_cell(Position(2, y))
+		left.remove_connection(right)
+		right.remove_connection(left)
+	return grid
+
+
+class TestGoalDistanceFields(unittest.TestCase):
+
+	def test_nearest_goal_respects_walls(self):
+		for grid_cls in (Grid, ArrayGrid):
+			grid = walled_grid(grid_cls)
+			across_wall = Goal(0, Position(2, 0))
+			far_on_same_side = Goal(1, Position(0, 4))
+			grid.add_goal(across_wall.position, across_wall)
+			grid.add_goal(far_on_same_side.position, far_on_same_side)
+
+			goal, distance = grid.nearest_goal(Position(1, 0))
+			self.assertIs(goal, far_on_same_side)
+			self.assertEqual(distance, 5)
+			self.assertIs(Robot(0, Position(1, 0)).find_nearest_goal(grid), far_on_same_side)
+
+	def test_remove_goal_matches_rebuild(self):
+		grid = walled_grid(Grid)
+		positions = [Position(0, 0), Position(4, 4), Position(2, 2), Position(0, 3)]
+		for i, position in enumerate(positions):
+			grid.add_goal(position, Goal(i, position))
+		grid.nearest_goal(Position(0, 0))
+		grid.remove_goal(Position(0, 0))
+		incremental = grid.goal_fields.nearest_distance.copy(), grid.goal_fields.nearest_goal.copy()
+
+		grid.topology_changed()
+		grid.nearest_goal(Position(0, 0))
+		np.testing.assert_array_equal(incremental[0], grid.goal_fields.nearest_distance)
+		np.testing.assert_array_equal(incremental[1], grid.goal_fields.nearest_goal)
+
+	def test_no_reachable_goal(self):
+		grid = Grid(3, 3)
+		self.assertEqual(grid.nearest_goal(Position(0, 0)), (None, float('inf')))
+		grid.add_goal(Position(2, 2), Goal(0, Position(2, 2)))
+		self.assertEqual(grid.nearest_goal(Position(0, 0)), (None, float('inf')))
+
+		grid.connect_neighbours()
+		self.assertEqual(grid.nearest_goal(Position(0, 0))[1], 4)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+import sys
+import os
+
+sys.path.append(os.getcwd())
+from src.array_grid import ArrayGrid
+from src.goal import Goal
+from src.grid import Grid
+from src.package import Package
+from src.position import Position
+from src.robot import Robot
+
+
+class TestDirtyCells(unittest.TestCase):
+
+	def check(self, grid):
+		grid.take_dirty_cells()
+		robot_position, package_position, goal_position = Position(0, 0), Position(3, 1), Position(2, 2)
+		grid.add_robot(robot_position, Robot(0, robot_position))
+		grid.add_package(package_position, Package(0, package_position))
+		grid.add_goal(goal_position, Goal(0, goal_position))
+		self.assertEqual(grid.take_dirty_cells(), {0, 7, 10})
+		self.assertEqual(grid.take_dirty_cells(), set())
+
+		robot = grid.robots[0]
+		robot.add_to_path([Position(1, 0)])
+		grid.move_robots()
+		self.assertEqual(grid.take_dirty_cells(), {0, 1})
+
+		# A robot that stays put leaves its cell clean
+		grid.move_robots()
+		self.assertEqual(grid.take_dirty_cells(), set())
+
+		grid.remove_package(package_position)
+		self.assertEqual(grid.take_dirty_cells(), {7})
+
+		grid.reset()
+		self.assertEqual(grid.take_dirty_cells(), set(range(16)))
+
+	def test_grid(self):
+		self.check(Grid(4, 4))
+
+	def test_array_grid(self):
+		self.check(ArrayGrid(4, 4))
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+import random
+import sys
+import os
+
+sys.path.append(os.getcwd())
+from src.goal import Goal
+from src.grid import Grid
+from src.implicit_grid import ImplicitGrid
+from src.package import Package
+from src.pathfinding import Pathfinding
+from src.position import Position
+from src.robot import Robot
+from src.sim import Simulation
+from src.hierarchical_pathfinding import HierarchicalPathfinding
+from tests.test_pathfinding import isolate, obstacle_grid, path_cost
+
+
+class TestHierarchicalPathfinding(unittest.TestCase):
+
+	def test_paths_are_valid_and_near_optimal(self):
+		for grid_class in (Grid, ImplicitGrid):
+			grid = obstacle_grid(grid_class, width=48, height=40, obstacles=400)
+			hierarchy = HierarchicalPathfinding(grid, cluster_size=8, flat_distance=0)
+			pathfinding = Pathfinding(grid)
+			rng = random.Random(1)
+			for _ in range(100):
+				start, destination = rng.randrange(48 * 40), rng.randrange(48 * 40)
+				expected = pathfinding.a_star_ids(start, destination)
+				path = hierarchy.find_path(start, destination)
+				with self.subTest(grid=grid_class.__name__, start=start, destination=destination):
+					self.assertEqual(bool(path), bool(expected))
+					if expected:
+						self.assertEqual((path[0], path[-1]), (start, destination))
+						# Detours through entrances cost at most about a cluster side
+						self.assertLessEqual(path_cost(grid, path), 1.1 * path_cost(grid, expected) + 8)
+
+	def test_route_is_refined_lazily(self):
+		grid = Grid(64, 8)
+		grid.connect_neighbours()
+		hierarchy = HierarchicalPathfinding(grid, cluster_size=8)
+		route = hierarchy.route(0, [63])
+		first = next(route)
+		self.assertLess(len(first), 16)
+		cells = [0] + first
+		for segment in route:
+			cells.extend(segment)
+		self.assertEqual(path_cost(grid, cells), 63)
+
+	def test_topology_change_updates_affected_clusters(self):
+		# A wall down x = 8 with a single gap at y = 2
+		grid = Grid(16, 16)
+		grid.connect_neighbours()
+		for y in range(16):
+			if y != 2:
+				isolate(grid, y * 16 + 8)
+		hierarchy = HierarchicalPathfinding(grid, cluster_size=4, flat_distance=0)
+		self.assertEqual(len(hierarchy.find_path(15 * 16, 15 * 16 + 15)), 1 + 15 + 2 * 13)
+
+		rebuilt = hierarchy.clusters_rebuilt
+		isolate(grid, 2 * 16 + 8)
+		self.assertEqual(hierarchy.find_path(15 * 16, 15 * 16 + 15), [])
+		# Only the gap's cluster and the one across the wall
+		self.assertEqual(hierarchy.clusters_rebuilt - rebuilt, 2)
+
+		grid.get_cell(Position(8, 14)).add_connection(grid.get_cell(Position(7, 14)))
+		grid.get_cell(Position(7, 14)).add_connection(grid.get_cell(Position(8, 14)))
+		grid.get_cell(Position(8, 14)).add_connection(grid.get_cell(Position(9, 14)))
+		grid.get_cell(Position(9, 14)).add_connection(grid.get_cell(Position(8, 14)))
+		self.assertEqual(len(hierarchy.find_path(15 * 16, 15 * 16 + 15)), 1 + 15 + 2)
+
+	def test_one_way_border(self):
+		grid = Grid(8, 1)
+		for x in range(7):
+			grid.grid[0][x].add_connection(grid.grid[0][x + 1])
+		hierarchy = HierarchicalPathfinding(grid, cluster_size=4, flat_distance=0)
+		self.assertEqual(hierarchy.find_path(0, 7), list(range(8)))
+		self.assertEqual(hierarchy.find_path(7, 0), [])
+
+	def test_single_cluster_column(self):
+		# Clusters stacked on top of each other: cluster + 1 is the cluster below, not beside
+		grid = Grid(4, 12)
+		grid.connect_neighbours()
+		hierarchy = HierarchicalPathfinding(grid, cluster_size=8, flat_distance=0)
+		path = hierarchy.find_path(38, 1)
+		self.assertEqual((path[0], path[-1]), (38, 1))
+		self.assertEqual(path_cost(grid, path), 10)
+
+		grid = obstacle_grid(Grid, width=8, height=48, obstacles=60, seed=2)
+		hierarchy = HierarchicalPathfinding(grid, cluster_size=8, flat_distance=0)
+		pathfinding = Pathfinding(grid)
+		rng = random.Random(3)
+		for _ in range(200):
+			start, destination = rng.randrange(8 * 48), rng.randrange(8 * 48)
+			with self.subTest(start=start, destination=destination):
+				self.assertEqual(bool(hierarchy.find_path(start, destination)),
+								 bool(pathfinding.a_star_ids(start, destination)))
+
+	def test_simulation_with_clusters(self):
+		grid = Grid(24, 24)
+		grid.connect_neighbours()
+		grid.add_goal(Position(0, 0), Goal(0, Position(0, 0)))
+		for robot_id, x in enumerate((5, 12, 20)):
+			grid.add_robot(Position(x, 23), Robot(robot_id, Position(x, 23), max_packages=2))
+		for package_id in range(8):
+			position = Position((package_id * 7) % 24, 6 + (package_id * 5) % 18)
+			grid.add_package(position, Package(package_id, position))
+
+		simulation = Simulation(grid, cluster_size=6)
+		simulation.run(400, seed=0)
+		self.assertEqual(simulation.delivered_packages(), 8)
+		self.assertGreater(len(simulation.hierarchy.intra), 0)
+
+
+if __name__ == "__main__":
+	unittest.main()
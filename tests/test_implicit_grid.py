@@ -0,0 +1,94 @@
+import unittest
+import random
+import sys
+import os
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+from src.array_grid import ArrayGrid
+from src.implicit_grid import ImplicitGrid
+from src.pathfinding import Pathfinding, get_neighbours
+from src.position import Position
+
+
+def random_weights(grid, seed):
+	# Drop about a fifth of the edges and give a tenth of them a non-default weight
+	rng = random.Random(seed)
+	sources, targets, _ = grid.edge_arrays()
+	for source, target in zip(sources.tolist(), targets.tolist()):
+		roll = rng.random()
+		if roll < 0.2:
+			grid.set_edge_weight(source, target, float('inf'))
+		elif roll < 0.3:
+			grid.set_edge_weight(source, target, rng.randint(2, 5))
+	return grid
+
+
+def same_grids(width, height, seed):
+	dense, implicit = ArrayGrid(width, height), ImplicitGrid(width, height)
+	dense.connect_neighbours()
+	implicit.connect_neighbours()
+	random_weights(dense, seed)
+	random_weights(implicit, seed)
+	return dense, implicit
+
+
+def edges(grid):
+	sources, targets, weights = grid.edge_arrays()
+	return sorted(zip(sources.tolist(), targets.tolist(), weights.tolist()))
+
+
+class TestImplicitGrid(unittest.TestCase):
+
+	def test_matches_dense_weights(self):
+		for seed in range(3):
+			dense, implicit = same_grids(9, 7, seed)
+			self.assertEqual(edges(implicit), edges(dense))
+			for cell_id in range(63):
+				self.assertEqual(implicit.neighbour_ids(cell_id), dense.neighbour_ids(cell_id))
+			np.testing.assert_array_equal(implicit.weights, dense.weights)
+
+	def test_pathfinding_is_unchanged(self):
+		dense, implicit = same_grids(15, 12, 4)
+		for start, destination in [(0, 179), (17, 90), (120, 3)]:
+			self.assertEqual(Pathfinding(implicit).a_star_ids(start, destination),
+							 Pathfinding(dense).a_star_ids(start, destination))
+		np.testing.assert_array_equal(Pathfinding(implicit).distance_field([0]),
+									  Pathfinding(dense).distance_field([0]))
+		corner = implicit.get_cell(Position(0, 0))
+		self.assertEqual(sorted((c.to_cell.id, c.weight) for c in get_neighbours(corner)),
+						 sorted(implicit.neighbour_ids(0)))
+
+	def test_only_non_default_edges_are_stored(self):
+		grid = ImplicitGrid(4, 3)
+		self.assertEqual(grid.neighbour_ids(5), [])
+		grid.connect_neighbours()
+		self.assertEqual(grid.weight_overrides, {})
+		self.assertEqual(sorted(grid.neighbour_ids(0)), [(1, 1.0), (4, 1.0)])
+
+		self.assertTrue(grid.set_edge_weight(0, 1, 3))
+		self.assertEqual(grid.weight_overrides, {1: 3.0})
+		self.assertTrue(grid.set_edge_weight(0, 1, 1))
+		self.assertEqual(grid.weight_overrides, {})
+		self.assertTrue(grid.set_edge_weight(0, 1, float('inf')))
+		self.assertFalse(grid.set_edge_weight(0, 1, float('inf')))
+		self.assertEqual(grid.neighbour_ids(0), [(4, 1.0)])
+		with self.assertRaises(ValueError):
+			grid.set_edge_weight(0, 5, 1)
+
+	def test_from_dense_weights(self):
+		dense, _ = same_grids(6, 6, 1)
+		implicit = ImplicitGrid(6, 6, weights=dense.weights)
+		self.assertEqual(implicit.default_weight, 1.0)
+		self.assertEqual(edges(implicit), edges(dense))
+
+	def test_uniform_floor_is_smaller(self):
+		dense, implicit = ArrayGrid(100, 100), ImplicitGrid(100, 100)
+		dense.connect_neighbours()
+		implicit.connect_neighbours()
+		self.assertEqual(dense.nbytes() - implicit.nbytes(), 100 * 100 * 15)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,167 @@
+import unittest
+import random
+import sys
+import os
+
+sys.path.append(os.getcwd())
+from src.goal import Goal
+from src.grid import Grid
+from src.implicit_grid import ImplicitGrid
+from src.incremental_replanning import DStarLite, IncrementalReplanner
+from src.package import Package
+from src.pathfinding import Pathfinding
+from src.position import Position
+from src.robot import Robot
+from src.sim import Simulation
+from tests.test_pathfinding import is_valid, isolate, obstacle_grid
+
+
+class TestDStarLite(unittest.TestCase):
+
+	def test_repairs_match_a_star(self):
+		rng = random.Random(3)
+		repaired = fresh = 0
+		for seed in range(20):
+			grid = obstacle_grid(ImplicitGrid if seed % 2 else Grid, seed=seed)
+			pathfinding = Pathfinding(grid)
+			start, destination = rng.randrange(40 * 30), rng.randrange(40 * 30)
+			search = DStarLite(grid, start, destination)
+			self.assertTrue(search.compute())
+			path = search.path()
+			self.assertEqual(len(path), len(pathfinding.a_star_ids(start, destination, use_cache=False)))
+			if len(path) < 8:
+				continue
+
+			changed = set()
+			grid.topology_listeners.append(changed.add)
+			for cell_id in path[6:8]:
+				if cell_id != destination:
+					isolate(grid, cell_id)
+			search.move_to(path[4])
+			search.update(changed)
+			self.assertTrue(search.compute())
+			path = search.path()
+			with self.subTest(seed=seed):
+				self.assertEqual(len(path), len(pathfinding.a_star_ids(search.start, destination, use_cache=False)))
+				self.assertTrue(is_valid(grid, path))
+			full = DStarLite(grid, search.start, destination)
+			full.compute()
+			repaired += search.expanded
+			fresh += full.expanded
+		self.assertLess(repaired, fresh / 2)
+
+	def test_blocked_cells(self):
+		grid = Grid(5, 3)
+		grid.connect_neighbours()
+		search = DStarLite(grid, 5, 9)
+		search.compute()
+		self.assertEqual(search.path(), [5, 6, 7, 8, 9])
+		search.block(7)
+		search.compute()
+		self.assertEqual(len(search.path()), 7)
+		self.assertNotIn(7, search.path())
+		search.unblock(7)
+		search.compute()
+		self.assertEqual(search.path(), [5, 6, 7, 8, 9])
+
+	def test_memory_cap(self):
+		grid = Grid(30, 30)
+		grid.connect_neighbours()
+		self.assertFalse(DStarLite(grid, 0, 899, max_states=50).compute())
+		self.assertTrue(DStarLite(grid, 0, 899).compute())
+
+
+class TestIncrementalReplanner(unittest.TestCase):
+
+	def setUp(self):
+		self.grid = Grid(10, 5)
+		self.grid.connect_neighbours()
+		self.robot = Robot(0, Position(0, 2))
+		self.grid.add_robot(self.robot.position, self.robot)
+		# Along row 2 to (6, 2), then up to (6, 0)
+		self.robot.add_to_path([Position(x, 2) for x in range(1, 7)] + [Position(6, 1), Position(6, 0)])
+		self.robot.legs = [6, 2]
+
+	def test_repairs_broken_leg(self):
+		replanner = IncrementalReplanner(self.grid, compare=True)
+		isolate(self.grid, 2 * 10 + 3)
+		replanner.repair([self.robot])
+		cells = [self.grid.cell_id(self.robot.position)] + [self.grid.cell_id(position) for position in self.robot.path]
+		self.assertTrue(is_valid(self.grid, cells))
+		self.assertNotIn(23, cells)
+		self.assertEqual(self.robot.legs, [8, 2])
+		self.assertEqual(self.robot.path[-1], Position(6, 0))
+		self.assertEqual(replanner.stats["searches"], 1)
+
+		# The next change reuses the search from where the robot is now
+		for _ in range(2):
+			self.robot.update_position(self.grid)
+		isolate(self.grid, 1 * 10 + 3)
+		replanner.repair([self.robot])
+		self.assertEqual(replanner.stats["repairs"], 1)
+		self.assertGreater(replanner.stats["full_expanded"], replanner.stats["repair_expanded"])
+		self.assertLess(replanner.expansion_ratio(), 1)
+
+	def test_drops_broken_later_leg(self):
+		replanner = IncrementalReplanner(self.grid)
+		isolate(self.grid, 1 * 10 + 6)
+		replanner.repair([self.robot])
+		self.assertEqual(self.robot.legs, [6])
+		self.assertEqual(self.robot.path[-1], Position(6, 2))
+
+	def test_memory_cap_falls_back_to_a_star(self):
+		replanner = IncrementalReplanner(self.grid, max_states=3)
+		isolate(self.grid, 2 * 10 + 3)
+		replanner.repair([self.robot])
+		self.assertEqual(replanner.stats["fallbacks"], 1)
+		self.assertEqual(self.robot.legs, [8, 2])
+		self.assertNotIn(0, replanner.searches)
+
+	def test_detour_around_blocking_robot(self):
+		blocker = Robot(1, Position(2, 2))
+		self.grid.add_robot(blocker.position, blocker)
+		blocker.add_to_path([Position(2, 2)] * 10)
+		replanner = IncrementalReplanner(self.grid, patience=2)
+		self.robot.path[0:1] = []
+		self.robot.path.insert(0, Position(1, 2))
+		for _ in range(3):
+			self.robot.update_position(self.grid)
+			replanner.repair([self.robot])
+		self.assertEqual(replanner.stats["detours"], 1)
+		self.assertNotIn(Position(2, 2), self.robot.path)
+		self.assertEqual(self.robot.legs[0], len(self.robot.path) - 2)
+
+
+class TestReplanningSimulation(unittest.TestCase):
+
+	def test_robots_follow_changed_connections(self):
+		grid = Grid(24, 24)
+		grid.connect_neighbours()
+		grid.add_goal(Position(0, 0), Goal(0, Position(0, 0)))
+		for robot_id, x in enumerate((4, 12, 20)):
+			grid.add_robot(Position(x, 23), Robot(robot_id, Position(x, 23), max_packages=2))
+		for package_id in range(10):
+			position = Position((package_id * 7) % 24, 6 + (package_id * 5) % 16)
+			grid.add_package(position, Package(package_id, position))
+
+		simulation = Simulation(grid, replan_states=4096)
+		simulation.run(5, seed=0)
+		# A wall across row 12 with a gap at the right end
+		for x in range(22):
+			if not grid.get_cell(Position(x, 12)).has_robot() and not grid.get_cell(Position(x, 12)).packages:
+				isolate(grid, 12 * 24 + x)
+
+		simulation.simulation_running = True
+		for _ in range(400):
+			before = {robot.id: grid.cell_id(robot.position) for robot in grid.robots}
+			simulation.update_simulation()
+			for robot in grid.robots:
+				cell_id = grid.cell_id(robot.position)
+				if cell_id != before[robot.id]:
+					self.assertIn(cell_id, dict(grid.neighbour_ids(before[robot.id])))
+		self.assertEqual(simulation.delivered_packages(), 10)
+		self.assertGreater(simulation.replanner.stats["searches"], 0)
+
+
+if __name__ == "__main__":
+	unittest.main()
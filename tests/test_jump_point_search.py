@@ -0,0 +1,107 @@
+import unittest
+import random
+import sys
+import os
+
+sys.path.append(os.getcwd())
+from src.goal import Goal
+from src.grid import Grid
+from src.implicit_grid import ImplicitGrid
+from src.jump_point_search import JumpPointSearch, uniform_cost_mask
+from src.package import Package
+from src.pathfinding import Pathfinding
+from src.position import Position
+from src.robot import Robot
+from src.sim import Simulation
+from tests.test_pathfinding import is_valid, isolate, obstacle_grid
+
+
+class TestJumpPointSearch(unittest.TestCase):
+
+	def test_paths_match_a_star(self):
+		for grid_class in (Grid, ImplicitGrid):
+			grid = obstacle_grid(grid_class, obstacles=300)
+			pathfinding = Pathfinding(grid)
+			search = JumpPointSearch.for_grid(grid)
+			self.assertIsNotNone(search)
+			rng = random.Random(1)
+			for _ in range(100):
+				start, destination = rng.randrange(40 * 30), rng.randrange(40 * 30)
+				expected = pathfinding.a_star_ids(start, destination, use_cache=False)
+				for plus in (False, True):
+					path = search.search(start, destination, plus=plus)
+					with self.subTest(grid=grid_class.__name__, start=start, destination=destination, plus=plus):
+						self.assertEqual(len(path), len(expected))
+						if expected:
+							self.assertEqual((path[0], path[-1]), (start, destination))
+							self.assertTrue(is_valid(grid, path))
+
+	def test_expands_fewer_nodes_on_open_map(self):
+		grid = Grid(64, 64)
+		grid.connect_neighbours()
+		pathfinding = Pathfinding(grid)
+		pathfinding.a_star_ids(0, 64 * 64 - 1, use_cache=False)
+		search = JumpPointSearch.for_grid(grid)
+		self.assertEqual(len(search.search(0, 64 * 64 - 1)), 127)
+		self.assertLess(search.expanded, pathfinding.expanded)
+
+	def test_rejects_non_uniform_maps(self):
+		grid = Grid(8, 8)
+		grid.connect_neighbours()
+		self.assertIsNotNone(uniform_cost_mask(grid))
+
+		weighted = ImplicitGrid(8, 8)
+		weighted.connect_neighbours()
+		weighted.set_edge_weight(9, 10, 5)
+		self.assertIsNone(uniform_cost_mask(weighted))
+
+		one_way = Grid(8, 8)
+		one_way.connect_neighbours()
+		one_way.grid[1][1].remove_connection(one_way.grid[1][2])
+		self.assertIsNone(uniform_cost_mask(one_way))
+
+	def test_falls_back_to_a_star(self):
+		grid = ImplicitGrid(8, 1)
+		grid.connect_neighbours()
+		grid.set_edge_weight(3, 4, 10)
+		pathfinding = Pathfinding(grid, jump_points="jps+")
+		self.assertEqual(pathfinding.path_ids(0, 7), list(range(8)))
+		self.assertIsNone(grid.adjacency_cache["jump_points"][1])
+
+	def test_unknown_mode(self):
+		with self.assertRaises(ValueError):
+			Pathfinding(Grid(2, 2), jump_points="theta")
+
+	def test_topology_change_rebuilds_search(self):
+		grid = Grid(8, 3)
+		grid.connect_neighbours()
+		pathfinding = Pathfinding(grid, jump_points="jps")
+		self.assertEqual(len(pathfinding.path_ids(8, 15)), 8)
+		search = JumpPointSearch.for_grid(grid)
+
+		isolate(grid, 12)
+		self.assertIsNot(JumpPointSearch.for_grid(grid), search)
+		path = pathfinding.path_ids(8, 15)
+		self.assertEqual(len(path), 10)
+		self.assertNotIn(12, path)
+
+	def test_simulation_with_jump_points(self):
+		grid = Grid(20, 20)
+		grid.connect_neighbours()
+		for cell_id in (45, 46, 47, 48, 125, 126, 127, 205, 206, 207, 208, 209):
+			isolate(grid, cell_id)
+		grid.add_goal(Position(0, 0), Goal(0, Position(0, 0)))
+		for robot_id, x in enumerate((3, 10, 17)):
+			grid.add_robot(Position(x, 19), Robot(robot_id, Position(x, 19), max_packages=2))
+		for package_id in range(6):
+			position = Position((package_id * 7) % 20, 12 + package_id)
+			grid.add_package(position, Package(package_id, position))
+
+		simulation = Simulation(grid, jump_points="jps+")
+		simulation.run(300, seed=0)
+		self.assertEqual(simulation.delivered_packages(), 6)
+		self.assertIsNotNone(JumpPointSearch.for_grid(grid).distances)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,139 @@
+import unittest
+import json
+import sys
+import os
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+from src.array_grid import ArrayGrid
+from src.goal import Goal
+from src.grid import Grid
+from src.map_format import GOAL_DTYPE, PACKAGE_DTYPE, ROBOT_DTYPE, MapData, binary_to_json, grid_from_map_data, \
+	json_to_binary, load_map, open_cell_weights, read_map, save_map
+from src.map_generator.generator import generate_grid
+from src.package import Package
+from src.position import Position
+from src.robot import Robot
+
+
+def edges(grid):
+	sources, targets, weights = grid.edge_arrays()
+	return sorted(zip(sources.tolist(), targets.tolist(), weights.tolist()))
+
+
+class TestMapFormat(unittest.TestCase):
+
+	def setUp(self):
+		self.directory = tempfile.TemporaryDirectory()
+
+	def tearDown(self):
+		self.directory.cleanup()
+
+	def path(self, name):
+		return os.path.join(self.directory.name, name)
+
+	def sample_grid(self, grid_class):
+		grid = grid_class(6, 4)
+		grid.connect_neighbours()
+		grid.get_cell(Position(2, 1)).remove_connection(grid.get_cell(Position(3, 1)))
+		grid.get_cell(Position(0, 0)).connections[0].weight = 4
+		grid.get_cell(Position(5, 3)).max_load = 2
+		grid.add_goal(Position(0, 3), Goal(7, Position(0, 3)))
+		grid.add_robot(Position(1, 1), Robot(3, Position(1, 1), max_packages=2))
+		for package_id in range(3):
+			grid.add_package(Position(5, 3), Package(package_id, Position(5, 3)))
+		return grid
+
+	def assertSameMap(self, expected, actual):
+		self.assertEqual((expected.width, expected.height), (actual.width, actual.height))
+		self.assertEqual(edges(expected), edges(actual))
+		self.assertEqual([cell.max_load for row in expected.grid for cell in row],
+						 [cell.max_load for row in actual.grid for cell in row])
+		self.assertEqual([(r.id, r.position, r.max_packages) for r in expected.robots],
+						 [(r.id, r.position, r.max_packages) for r in actual.robots])
+		self.assertEqual([(g.id, g.position) for g in expected.goals], [(g.id, g.position) for g in actual.goals])
+		self.assertEqual(sorted((p.id, p.position.x, p.position.y) for p in expected.packages),
+						 sorted((p.id, p.position.x, p.position.y) for p in actual.packages))
+
+	def test_round_trip(self):
+		for source_class in (Grid, ArrayGrid):
+			for target_class in (Grid, ArrayGrid):
+				with self.subTest(source=source_class.__name__, target=target_class.__name__):
+					grid = self.sample_grid(source_class)
+					save_map(grid, self.path("map.wmap"))
+					self.assertSameMap(grid, load_map(self.path("map.wmap"), target_class))
+
+	def test_arrays_are_memory_mapped_copy_on_write(self):
+		save_map(self.sample_grid(ArrayGrid), self.path("map.wmap"))
+		grid = load_map(self.path("map.wmap"))
+		self.assertIsInstance(grid.weights, np.memmap)
+		grid.set_edge_weight(7, 8, 9)
+		self.assertEqual(grid.weights[1, 7], 9)
+		self.assertEqual(read_map(self.path("map.wmap")).weights[1, 7], 1)
+		self.assertNotIsInstance(load_map(self.path("map.wmap"), mmap=False).weights, np.memmap)
+
+	def test_json_conversion(self):
+		generate_grid(self.path("generated.json"), width=5, height=3)
+		json_to_binary(self.path("generated.json"), self.path("map.wmap"))
+		from_json = Grid.grid_from_json(self.path("generated.json"))
+		self.assertSameMap(from_json, load_map(self.path("map.wmap")))
+
+		save_map(self.sample_grid(Grid), self.path("sample.wmap"))
+		binary_to_json(self.path("sample.wmap"), self.path("sample.json"))
+		with open(self.path("sample.json")) as f:
+			self.assertIn("toCell", json.load(f)["cells"][0]["connections"][0])
+		self.assertSameMap(self.sample_grid(Grid), Grid.grid_from_json(self.path("sample.json")))
+
+	def test_rejects_other_files(self):
+		with open(self.path("map.json"), "w") as f:
+			f.write("{}")
+		with self.assertRaises(ValueError):
+			read_map(self.path("map.json"))
+
+		grid = Grid(3, 3)
+		grid.get_cell(Position(0, 0)).add_connection(grid.get_cell(Position(2, 2)))
+		with self.assertRaises(ValueError):
+			save_map(grid, self.path("diagonal.wmap"))
+
+	def test_large_map_opens_quickly(self):
+		grid = ArrayGrid(1000, 1000)
+		grid.connect_neighbours()
+		save_map(grid, self.path("large.wmap"))
+		started = time.perf_counter()
+		loaded = load_map(self.path("large.wmap"))
+		self.assertLess(time.perf_counter() - started, 1.0)
+		self.assertEqual(loaded.neighbour_ids(1000 * 500 + 500), grid.neighbour_ids(1000 * 500 + 500))
+
+	def test_loading_sends_one_topology_change(self):
+		generate_grid(self.path("small.json"), 6, 5)
+		save_map(self.sample_grid(Grid), self.path("small.wmap"))
+		# One version bump for the whole map, not one per connection
+		self.assertEqual(Grid.grid_from_json(self.path("small.json")).topology_version, 1)
+		self.assertEqual(load_map(self.path("small.wmap"), Grid).topology_version, 1)
+
+		grid = Grid(6, 5)
+		changes = []
+		grid.topology_listeners.append(changes.append)
+		grid.connect_neighbours()
+		self.assertEqual((changes, grid.topology_version), ([None], 1))
+
+	def test_open_cell_weights(self):
+		open_cells = np.ones((4, 5), dtype=bool)
+		open_cells[1, 2] = False
+		weights = open_cell_weights(open_cells).reshape(4, -1)
+		empty = [np.zeros(0, dtype=dtype) for dtype in (ROBOT_DTYPE, GOAL_DTYPE, PACKAGE_DTYPE)]
+		grid = grid_from_map_data(MapData(5, 4, np.full(20, 10, dtype=np.int32), weights, *empty), Grid)
+		expected = Grid(5, 4)
+		expected.connect_neighbours()
+		isolated = expected.grid[1][2]
+		for connection in list(isolated.connections):
+			connection.to_cell.remove_connection(isolated)
+			isolated.remove_connection(connection.to_cell)
+		for cell_id in range(20):
+			self.assertEqual(sorted(grid.neighbour_ids(cell_id)), sorted(expected.neighbour_ids(cell_id)))
+
+if __name__ == '__main__':
+	unittest.main()
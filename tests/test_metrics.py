@@ -0,0 +1,90 @@
+import unittest
+import sys
+import os
+
+sys.path.append(os.getcwd())
+from src.goal import Goal
+from src.grid import Grid
+from src.metrics import STATUS_CODES, FleetMetrics
+from src.package import Package
+from src.position import Position
+from src.robot import Robot, Status
+from src.sim import Simulation
+from tests.test_simulation import warehouse
+
+
+class TestStatusTime(unittest.TestCase):
+
+	def test_statuses_are_timed_in_ticks(self):
+		robot = Robot(0, Position(0, 0))
+		robot.change_status(Status.ACTIVE, 2)
+		robot.change_status(Status.BLOCKED, 5)
+		robot.change_status(Status.ACTIVE, 9)
+		self.assertEqual(robot.get_status_time(Status.IDLE, 12), 2)
+		self.assertEqual(robot.get_status_time(Status.BLOCKED, 12), 4)
+		self.assertEqual(robot.get_status_time(Status.ACTIVE, 12), 6)
+		self.assertEqual(robot.get_status_time(Status.OFF, 12), 0)
+		self.assertIsNone(robot.get_status_time("blocked", 12))
+
+	def test_robot_waiting_behind_another_is_blocked(self):
+		grid = Grid(3, 1)
+		grid.connect_neighbours()
+		robot, blocker = Robot(0, Position(0, 0)), Robot(1, Position(1, 0))
+		grid.add_robot(robot.position, robot)
+		grid.add_robot(blocker.position, blocker)
+		blocker.add_to_path([Position(1, 0)] * 3)
+		robot.add_to_path([Position(1, 0)])
+		grid.move_robots()
+		self.assertEqual(robot.status, Status.BLOCKED)
+
+
+class TestFleetMetrics(unittest.TestCase):
+
+	def test_counts_moves_waits_and_deliveries(self):
+		grid = Grid(4, 2)
+		grid.connect_neighbours()
+		grid.add_goal(Position(3, 0), Goal(0, Position(3, 0)))
+		robot, blocker = Robot(0, Position(0, 0)), Robot(1, Position(2, 0))
+		grid.add_robot(robot.position, robot)
+		grid.add_robot(blocker.position, blocker)
+		robot.load(Package(0, Position(0, 0)))
+		robot.add_to_path([Position(1, 0), Position(2, 0), Position(3, 0)])
+		# The blocker waits two ticks, then steps out of the way
+		blocker.add_to_path([Position(2, 0), Position(2, 0), Position(2, 1)])
+		metrics = FleetMetrics(grid, robots=1, ticks=2, waits=1)
+		for tick in range(6):
+			grid.tick = tick
+			grid.move_robots()
+			metrics.record()
+
+		self.assertEqual(robot.position, Position(3, 0))
+		self.assertEqual(metrics.moves[:2].tolist(), [3, 1])
+		self.assertEqual(metrics.deliveries[:2].tolist(), [1, 0])
+		self.assertEqual(metrics.waits[:2].tolist(), [2, 0])
+		self.assertEqual(metrics.wait_runs[:metrics.wait_run_count].tolist(), [2])
+		self.assertEqual(metrics.status_ticks[0, STATUS_CODES[Status.ACTIVE]], 3)
+		self.assertEqual(metrics.ticks, 6)
+		self.assertAlmostEqual(metrics.throughput(), 1 / 6)
+		self.assertEqual(metrics.throughput(window=2), 0.5)
+		self.assertEqual(metrics.wait_percentiles((50,)).tolist(), [2.0])
+		self.assertEqual(metrics.utilization(per_robot=True).tolist(), [0.5, 1 / 6])
+		self.assertEqual(robot.get_status_time(Status.BLOCKED, 6), 2)
+
+	def test_simulation_metrics(self):
+		grid = warehouse()
+		simulation = Simulation(grid)
+		summary = simulation.run(300, seed=7)
+		metrics = simulation.metrics.summary()
+		self.assertEqual(metrics["ticks"], 300)
+		self.assertEqual(metrics["deliveries"], summary["packages_delivered"])
+		self.assertEqual(simulation.metrics.status_totals().sum(), 300 * len(grid.robots))
+		self.assertAlmostEqual(metrics["utilization"], 1 - summary["mean_idle_ratio"])
+		self.assertAlmostEqual(metrics["throughput"], summary["packages_per_tick"])
+		self.assertGreater(metrics["moves"], 0)
+		self.assertEqual(grid.tick, 300)
+		for robot in grid.robots:
+			self.assertEqual(sum(robot.get_status_time(status, grid.tick) for status in Status), 300)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,137 @@
+import unittest
+import sys
+import os
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+from src.array_grid import ArrayGrid
+from src.goal import Goal
+from src.grid import Grid
+from src.order_stream import BurstyArrivals, OrderStream, PoissonArrivals, TraceArrivals
+from src.package import Package
+from src.position import Position
+from src.robot import Robot
+from src.sim import Simulation
+
+
+def build_grid(grid_cls=Grid, size=10, robots=3):
+	grid = grid_cls(size, size)
+	grid.connect_neighbours()
+	grid.add_goal(Position(0, 0), Goal(0, Position(0, 0)))
+	for robot_id in range(robots):
+		position = Position(robot_id + 1, size - 1)
+		grid.add_robot(position, Robot(robot_id, position))
+	return grid
+
+
+def arrival_counts(arrivals, ticks, seed=0):
+	rng = np.random.default_rng(seed)
+	return np.array([len(arrivals.arrivals(tick, rng)) for tick in range(ticks)])
+
+
+class TestOrderStream(unittest.TestCase):
+
+	def test_arrival_processes(self):
+		poisson = arrival_counts(PoissonArrivals(0.5), 20000)
+		np.testing.assert_array_equal(poisson, arrival_counts(PoissonArrivals(0.5), 20000))
+		self.assertAlmostEqual(poisson.mean(), 0.5, delta=0.03)
+
+		bursty = arrival_counts(BurstyArrivals(0.2, 3.0, calm_ticks=100, burst_ticks=10), 20000)
+		self.assertGreater(bursty.mean(), 0.2)
+		self.assertLess(bursty.mean(), 3.0)
+		# Far more dispersed than a Poisson process of the same mean
+		self.assertGreater(bursty.var() / bursty.mean(), 2)
+
+	def test_trace_arrivals(self):
+		with tempfile.TemporaryDirectory() as directory:
+			path = os.path.join(directory, "orders.csv")
+			with open(path, "w") as f:
+				f.write("# tick,x,y\n3,1,2\n0,4,4\n3,2,2\n")
+			arrivals = TraceArrivals(path, width=10, height=10)
+			for row in ("3,10,2", "3,1,-1", "-1,1,2"):
+				with open(path, "w") as f:
+					f.write(f"0,4,4\n{row}\n")
+				with self.assertRaisesRegex(ValueError, f"Order 2 .*\\({row}\\)"):
+					TraceArrivals(path, width=10, height=10)
+		rng = np.random.default_rng(0)
+		cells = [arrivals.arrivals(tick, rng).tolist() for tick in range(5, 10)]
+		self.assertEqual(cells, [[44], [], [], [21, 22], []])
+
+	def test_backlog_is_bounded_and_respects_max_load(self):
+		grid = build_grid(ArrayGrid)
+		grid.get_cell(Position(5, 5)).max_load = 2
+		stream = OrderStream(grid, PoissonArrivals(2.0), origins=[55], capacity=5, seed=0)
+		for tick in range(20):
+			stream.feed(tick)
+		self.assertEqual(len(grid.get_cell(Position(5, 5)).packages), 2)
+		self.assertEqual((stream.released, len(stream.backlog)), (2, 5))
+		self.assertEqual(stream.rejected, stream.orders - 7)
+		self.assertEqual(stream.max_backlog, 5)
+
+		# Released orders free a slot when picked up, the oldest waiting order takes it
+		oldest = stream.backlog[0][0]
+		grid.remove_package(Position(5, 5))
+		stream.feed(20)
+		self.assertIn(oldest, [package.id for package in grid.get_cell(Position(5, 5)).packages])
+
+	def test_max_outstanding(self):
+		grid = build_grid()
+		stream = OrderStream(grid, PoissonArrivals(3.0), capacity=100, max_outstanding=4, seed=1)
+		for tick in range(10):
+			stream.feed(tick)
+		self.assertEqual(len(grid.packages), 4)
+		self.assertEqual(stream.released + len(stream.backlog) + stream.rejected, stream.orders)
+
+	def test_simulation_delivers_the_stream(self):
+		grid = build_grid()
+		stream = OrderStream(grid, PoissonArrivals(0.1), seed=0)
+		simulation = Simulation(grid, orders=stream)
+		simulation.start_simulation()
+		self.assertTrue(simulation.simulation_running)
+		summary = simulation.run(400, seed=0)
+
+		orders = summary["orders"]
+		self.assertGreater(orders["delivered"], 10)
+		self.assertEqual(orders["delivered"], summary["packages_delivered"])
+		self.assertAlmostEqual(orders["throughput"] * 400, orders["delivered"])
+		self.assertEqual(stream.ticks, simulation.tick)
+		# The latency histogram gives the percentiles of the latencies it counts
+		latencies = np.repeat(np.arange(len(stream.latency_counts)), stream.latency_counts)
+		self.assertEqual(len(latencies), orders["delivered"])
+		self.assertGreaterEqual(latencies.min(), 1)
+		np.testing.assert_allclose(stream.latency_percentiles((0, 37.5, 50, 90, 99, 100)),
+								   np.percentile(latencies, (0, 37.5, 50, 90, 99, 100)))
+		self.assertLessEqual(orders["latency_p50"], orders["latency_p90"])
+		ids = [package.id for package in grid.goals[0].packages]
+		self.assertEqual(len(ids), len(set(ids)))
+
+	def test_run_seed_reseeds_the_stream(self):
+		def arrivals(seed):
+			grid = build_grid()
+			stream = OrderStream(grid, PoissonArrivals(0.5), seed=0)
+			Simulation(grid, orders=stream).run(100, seed=seed)
+			return [(package.id, package.position) for package in grid.packages], stream.orders
+
+		self.assertEqual(arrivals(1), arrivals(1))
+		self.assertNotEqual(arrivals(1), arrivals(2))
+
+	def test_needs_an_origin(self):
+		grid = Grid(1, 2)
+		grid.connect_neighbours()
+		grid.add_goal(Position(0, 0), Goal(0, Position(0, 0)))
+		grid.add_goal(Position(0, 1), Goal(1, Position(0, 1)))
+		with self.assertRaisesRegex(ValueError, "origin"):
+			OrderStream(grid, PoissonArrivals(1.0))
+
+	def test_ids_continue_after_existing_packages(self):
+		grid = build_grid()
+		grid.add_package(Position(3, 3), Package(41, Position(3, 3)))
+		stream = OrderStream(grid, PoissonArrivals(5.0), seed=0)
+		stream.feed(0)
+		self.assertEqual(min(package.id for package in grid.packages if package.id != 41), 42)
+
+
+if __name__ == '__main__':
+	unittest.main()
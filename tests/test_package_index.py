@@ -0,0 +1,73 @@
+import random
+import unittest
+import sys
+import os
+
+sys.path.append(os.getcwd())
+from src.grid import Grid
+from src.package import Package
+from src.package_index import PackageIndex, manhattan
+from src.position import Position
+from src.robot import Robot
+
+
+class TestPackageIndex(unittest.TestCase):
+
+	def setUp(self):
+		rng = random.Random(3)
+		self.index = PackageIndex(60, 40, bucket_size=7)
+		self.packages = [Package(i, Position(rng.randrange(60), rng.randrange(40))) for i in range(200)]
+		for package in self.packages:
+			self.index.add(package)
+
+	def test_nearest_matches_brute_force(self):
+		rng = random.Random(4)
+		for _ in range(50):
+			query = Position(rng.randrange(60), rng.randrange(40))
+			found = self.index.nearest(query, k=5)
+			expected = sorted(manhattan(query, package.position) for package in self.packages)[:5]
+			self.assertEqual([manhattan(query, package.position) for package in found], expected)
+
+	def test_within_radius(self):
+		query = Position(30, 20)
+		found = self.index.within(query, 6)
+		expected = [package for package in self.packages if manhattan(query, package.position) <= 6]
+		self.assertEqual(set(found), set(expected))
+
+	def test_searchable_flag_updates_index(self):
+		package = self.packages[0]
+		package.searchable = False
+		self.assertNotIn(package, self.index)
+		self.assertNotIn(package, self.index.nearest(package.position, k=len(self.packages)))
+
+		package.position = Position(0, 0)
+		package.searchable = True
+		self.assertIn(package, self.index.within(Position(0, 0), 0))
+
+
+class TestGridPackageIndex(unittest.TestCase):
+
+	def test_load_and_drop(self):
+		grid = Grid(10, 10)
+		near, far = Package(0, Position(2, 2)), Package(1, Position(9, 9))
+		grid.add_package(near.position, near)
+		grid.add_package(far.position, far)
+		robot = Robot(0, Position(0, 0))
+		robot.packages = []
+		self.assertIs(robot.find_nearest_package(grid), near)
+
+		robot.load(near)
+		self.assertIs(robot.find_nearest_package(grid), far)
+		self.assertIs(near.find_nearest_package(grid), far)
+
+		robot.position = Position(1, 1)
+		robot.unload(grid)
+		self.assertEqual(near.position, robot.position)
+		self.assertIs(robot.find_nearest_package(grid), near)
+
+		grid.remove_package(far.position)
+		self.assertEqual(len(grid.package_index), 1)
+
+
+if __name__ == "__main__":
+	unittest.main()
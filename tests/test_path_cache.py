@@ -0,0 +1,65 @@
+import unittest
+import sys
+import os
+
+sys.path.append(os.getcwd())
+from src.array_grid import ArrayGrid
+from src.grid import Grid
+from src.path_cache import PathCache
+from src.pathfinding import Pathfinding
+from src.position import Position
+
+
+class TestPathCache(unittest.TestCase):
+
+	def test_lru_eviction_and_counters(self):
+		cache = PathCache(capacity=2)
+		cache.put(0, 1, 0, [0, 1])
+		cache.put(0, 2, 0, [0, 2])
+		self.assertEqual(cache.get(0, 1, 0), [0, 1])
+		cache.put(0, 3, 0, [0, 3])
+
+		self.assertIsNone(cache.get(0, 2, 0))
+		self.assertEqual(cache.get(0, 3, 0), [0, 3])
+		self.assertIsNone(cache.get(0, 1, 1))
+		self.assertEqual(cache.stats()["hits"], 2)
+		self.assertEqual(cache.stats()["misses"], 2)
+		self.assertEqual(cache.stats()["evictions"], 1)
+
+	def test_repeated_query_hits(self):
+		grid = Grid(6, 6)
+		grid.connect_neighbours()
+		pathfinding = Pathfinding(grid)
+		first = pathfinding.a_star(Position(0, 0), Position(5, 5))
+		second = pathfinding.a_star(Position(0, 0), Position(5, 5))
+		self.assertEqual(first, second)
+		self.assertEqual(grid.path_cache.hits, 1)
+
+	def test_topology_changes_invalidate(self):
+		for grid_cls in (Grid, ArrayGrid):
+			grid = grid_cls(3, 1)
+			grid.connect_neighbours()
+			pathfinding = Pathfinding(grid)
+			self.assertEqual(pathfinding.a_star_ids(0, 2), [0, 1, 2])
+
+			version = grid.topology_version
+			grid.get_cell(Position(1, 0)).remove_connection(grid.get_cell(Position(2, 0)))
+			self.assertGreater(grid.topology_version, version)
+			self.assertEqual(pathfinding.a_star_ids(0, 2), [])
+
+	def test_weight_change_bumps_version(self):
+		grid = Grid(2, 1)
+		grid.connect_neighbours()
+		version = grid.topology_version
+		grid.grid[0][0].connections[0].weight = 4
+		self.assertEqual(grid.topology_version, version + 1)
+		self.assertEqual(grid.neighbour_ids(0), [(1, 4)])
+
+		array_grid = ArrayGrid(2, 1)
+		array_grid.connect_neighbours()
+		array_grid.grid[0][0].connections[0].weight = 4
+		self.assertEqual(array_grid.neighbour_ids(0), [(1, 4.0)])
+
+
+if __name__ == "__main__":
+	unittest.main()
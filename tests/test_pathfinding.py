@@ -1,3 +1,5 @@
+import heapq
+import random
 import unittest
 from unittest.mock import Mock
 import sys
@@ -5,7 +7,70 @@ import os
 
 # Modify the path to include the /src directory
 sys.path.append(os.path.join(os.getcwd(), 'src'))
+sys.path.append(os.getcwd())
 from pathfinding import Pathfinding
+from src.array_grid import ArrayGrid
+from src.grid import Grid
+from src.position import Position
+
+
+def random_grid(grid_cls, width, height, seed):
+	rng = random.Random(seed)
+	grid = grid_cls(width, height)
+	grid.connect_neighbours()
+	for y in range(height):
+		for x in range(width):
+			cell = grid.get_cell(Position(x, y))
+			for connection in cell.connections:
+				cell.remove_connection(connection.to_cell)
+				if rng.random() > 0.2:
+					cell.add_connection(connection.to_cell, rng.randint(1, 5))
+	return grid
+
+
+def isolate(grid, cell_id):
+	cell = grid.get_cell(grid.position_of(cell_id))
+	for neighbour, _ in list(grid.neighbour_ids(cell_id)):
+		other = grid.get_cell(grid.position_of(neighbour))
+		cell.remove_connection(other)
+		other.remove_connection(cell)
+
+
+def obstacle_grid(grid_class, width=40, height=30, obstacles=200, seed=0):
+	# Obstacles are cells cut off from all their neighbours
+	rng = random.Random(seed)
+	grid = grid_class(width, height)
+	grid.connect_neighbours()
+	for _ in range(obstacles):
+		isolate(grid, rng.randrange(width * height))
+	return grid
+
+
+def is_valid(grid, path):
+	return all(following in dict(grid.neighbour_ids(current)) for current, following in zip(path, path[1:]))
+
+
+def dijkstra_cost(grid, start, destination):
+	distances = {start: 0}
+	queue = [(0, start)]
+	while queue:
+		distance, current = heapq.heappop(queue)
+		if current == destination:
+			return distance
+		if distance > distances[current]:
+			continue
+		for neighbour, weight in grid.neighbour_ids(current):
+			if distance + weight < distances.get(neighbour, float('inf')):
+				distances[neighbour] = distance + weight
+				heapq.heappush(queue, (distance + weight, neighbour))
+	return None
+
+
+def path_cost(grid, path):
+	cost = 0
+	for current, following in zip(path, path[1:]):
+		cost += dict(grid.neighbour_ids(current))[following]
+	return cost
 
 
 class TestPathfinding(unittest.TestCase):
@@ -31,5 +96,40 @@ class TestPathfinding(unittest.TestCase):
 		self.assertEqual(result, [])
 
 
+class TestAStarIds(unittest.TestCase):
+
+	def test_matches_dijkstra_cost(self):
+		for seed in range(5):
+			grid = random_grid(Grid, 12, 9, seed)
+			pathfinding = Pathfinding(grid)
+			for start, destination in [(0, 107), (5, 60), (30, 2)]:
+				path = pathfinding.a_star_ids(start, destination)
+				expected = dijkstra_cost(grid, start, destination)
+				if expected is None:
+					self.assertEqual(path, [])
+				else:
+					self.assertEqual((path[0], path[-1]), (start, destination))
+					self.assertEqual(path_cost(grid, path), expected)
+
+	def test_a_star_returns_cells(self):
+		grid = Grid(5, 5)
+		grid.connect_neighbours()
+		path = Pathfinding(grid).a_star(Position(0, 0), Position(4, 4))
+		self.assertEqual(len(path), 9)
+		self.assertIs(path[0], grid.grid[0][0])
+		self.assertIs(path[-1], grid.grid[4][4])
+
+	def test_unreachable(self):
+		grid = Grid(3, 3)
+		self.assertEqual(Pathfinding(grid).a_star(Position(0, 0), Position(2, 2)), [])
+
+	def test_backends_agree(self):
+		cell_grid = random_grid(Grid, 10, 10, 7)
+		array_grid = random_grid(ArrayGrid, 10, 10, 7)
+		for destination in (99, 45, 9):
+			self.assertEqual(Pathfinding(cell_grid).a_star_ids(0, destination),
+							 Pathfinding(array_grid).a_star_ids(0, destination))
+
+
 if __name__ == "__main__":
 	unittest.main()
@@ -0,0 +1,136 @@
+import unittest
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.getcwd())
+from src.position import Position
+from src.replay import TracePlayer, TraceRecorder
+from src.robot import Robot
+from src.sim import Simulation, SimulationLoop
+from tests.test_simulation import warehouse
+
+
+def state(grid):
+	robots = {grid.cell_id(robot.position): robot.id for robot in grid.robots}
+	packages = sorted(grid.cell_id(package.position) for package in grid.packages)
+	loads = sorted((robot.id, len(robot.packages)) for robot in grid.robots)
+	return robots, packages, loads, [goal.delivered_packages for goal in grid.goals]
+
+
+def replayed(player):
+	robots = {cell_id: int(player.robot_ids[slot]) for cell_id, slot in enumerate(player.occupant.tolist()) if slot >= 0}
+	packages = sorted(cell_id for cell_id, count in enumerate(player.package_counts.tolist()) for _ in range(count))
+	loads = sorted(zip(player.robot_ids.tolist(), player.robot_loads.tolist()))
+	return robots, packages, loads, player.delivered.tolist()
+
+
+class TestReplay(unittest.TestCase):
+
+	def setUp(self):
+		handle, self.path = tempfile.mkstemp(suffix=".trace")
+		os.close(handle)
+
+	def tearDown(self):
+		os.remove(self.path)
+
+	def record(self, ticks, keyframe_interval=16, added=None):
+		grid = warehouse(seed=2, size=12, robots=4, packages=20)
+		simulation = Simulation(grid)
+		simulation.trace = TraceRecorder(grid, self.path, keyframe_interval)
+		simulation.simulation_running = True
+		states = [state(grid)]
+		for tick in range(ticks):
+			if tick == added:
+				grid.add_robot(Position(5, 0), Robot(9, Position(5, 0)))
+			simulation.update_simulation()
+			states.append(state(grid))
+		simulation.trace.close()
+		return states
+
+	def test_seek_restores_every_tick(self):
+		states = self.record(200, added=50)
+		player = TracePlayer(self.path)
+		self.assertEqual((player.first_tick, player.last_tick), (0, 200))
+		ticks = list(range(201))
+		random.Random(0).shuffle(ticks)
+		for tick in ticks + list(range(201)):
+			self.assertEqual(player.seek(tick), tick)
+			with self.subTest(tick=tick):
+				self.assertEqual(replayed(player), states[tick])
+		self.assertEqual(player.seek(500), 200)
+		player.close()
+
+	def test_cell_and_dirty_cells(self):
+		states = self.record(40)
+		player = TracePlayer(self.path)
+		player.take_dirty_cells()
+		player.seek(40)
+		robots, _, _, _ = states[40]
+		dirty = player.take_dirty_cells()
+		for cell_id, robot_id in robots.items():
+			self.assertIn(cell_id, dirty)
+			self.assertEqual(player.cell(cell_id)[0], robot_id)
+		self.assertEqual(player.cell(0), (None, 0, 0))
+		player.close()
+
+	def test_deltas_are_compact(self):
+		self.record(200, keyframe_interval=1000)
+		player = TracePlayer(self.path)
+		self.assertEqual(len(player.keyframes), 1)
+		# Four robots, mostly single steps
+		self.assertLess(os.path.getsize(self.path) / 200, 40)
+		player.close()
+
+	def test_truncated_and_invalid_files(self):
+		self.record(50)
+		with open(self.path, "rb+") as f:
+			f.truncate(os.path.getsize(self.path) - 3)
+		player = TracePlayer(self.path)
+		self.assertLess(player.last_tick, 50)
+		player.close()
+
+		with open(self.path, "wb") as f:
+			f.write(b"WMAP" + bytes(32))
+		with self.assertRaises(ValueError):
+			TracePlayer(self.path)
+
+	def test_simulation_records_trace(self):
+		grid = warehouse()
+		simulation = Simulation(grid, trace=self.path)
+		simulation.run(100, seed=7)
+		player = TracePlayer(self.path)
+		self.assertEqual(player.last_tick, 100)
+		player.seek(100)
+		self.assertEqual(replayed(player), state(grid))
+		player.close()
+		simulation.trace.close()
+
+	def test_simulation_closes_its_trace(self):
+		with Simulation(warehouse(), trace=self.path) as simulation:
+			simulation.run(20, seed=0)
+			simulation.run(10, seed=0)
+		self.assertTrue(simulation.trace.file.closed)
+		simulation.close()
+		player = TracePlayer(self.path)
+		self.assertEqual(player.last_tick, 30)
+		player.close()
+
+		# A stopped loop closes the trace once its last tick is done
+		loop = SimulationLoop(Simulation(warehouse(), trace=self.path), tick_rate=None)
+		loop.start()
+		loop.play()
+		while loop.simulation.tick < 5:
+			time.sleep(0.01)
+		loop.stop()
+		self.assertFalse(loop.is_alive())
+		self.assertTrue(loop.simulation.trace.file.closed)
+		player = TracePlayer(self.path)
+		self.assertEqual(player.last_tick, loop.simulation.tick)
+		player.close()
+
+
+if __name__ == "__main__":
+	unittest.main()
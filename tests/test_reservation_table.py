@@ -0,0 +1,99 @@
+import unittest
+import sys
+import os
+
+sys.path.append(os.getcwd())
+from src.grid import Grid
+from src.pathfinding import Pathfinding
+from src.position import Position
+from src.reservation_table import ReservationTable
+
+
+def corridor_with_pocket():
+	# 5x2 grid: a corridor on row 0 and a single pocket cell below its middle
+	grid = Grid(5, 2)
+	for a, b in [(0, 1), (1, 2), (2, 3), (3, 4), (2, 7)]:
+		first, second = grid.get_cell(grid.position_of(a)), grid.get_cell(grid.position_of(b))
+		first.add_connection(second)
+		second.add_connection(first)
+	return grid
+
+
+class TestReservationTable(unittest.TestCase):
+
+	def test_claims_and_expiry(self):
+		table = ReservationTable(horizon=8)
+		table.reserve("a", [0, 1, 2], start_tick=0)
+		self.assertEqual(table.owner(1, 1), "a")
+		self.assertEqual(table.owner(2, 50), "a")
+		self.assertFalse(table.can_move("b", 2, 1, 0))
+		self.assertFalse(table.can_move("b", 5, 1, 0))
+		self.assertTrue(table.can_move("a", 0, 1, 0))
+
+		table.expire(2)
+		self.assertIsNone(table.owner(1, 1))
+		self.assertEqual(len(table.cells), 1)
+
+		table.release("a")
+		self.assertEqual(len(table), 0)
+
+	def test_swap_is_a_conflict(self):
+		table = ReservationTable()
+		table.reserve("a", [0, 1], start_tick=0)
+		table.release("a")
+		table.reserve("a", [0, 1, 1], start_tick=0)
+		table.unpark("a")
+		self.assertFalse(table.can_move("b", 1, 0, 0))
+
+
+class TestSpaceTimeAStar(unittest.TestCase):
+
+	def assert_no_conflicts(self, paths):
+		length = max(len(path) for path in paths)
+		at = [[path[min(tick, len(path) - 1)] for tick in range(length)] for path in paths]
+		for tick in range(length):
+			cells = [robot_cells[tick] for robot_cells in at]
+			self.assertEqual(len(set(cells)), len(cells))
+			if tick:
+				for a, robot_cells in enumerate(at):
+					for b, other_cells in enumerate(at):
+						if a != b:
+							# Nobody enters the cell another robot just left
+							self.assertNotEqual(robot_cells[tick], other_cells[tick - 1])
+
+	def test_robot_waits_in_pocket(self):
+		grid = corridor_with_pocket()
+		pathfinding = Pathfinding(grid)
+		table = ReservationTable(horizon=16)
+
+		first = pathfinding.space_time_a_star(0, 4, 0, table, robot=0)
+		self.assertEqual(first, [0, 1, 2, 3, 4])
+		table.reserve(0, first, 0)
+
+		second = pathfinding.space_time_a_star(7, 0, 0, table, robot=1)
+		self.assertEqual(second, [7, 7, 7, 7, 2, 1, 0])
+		self.assert_no_conflicts([first, second])
+
+	def test_crossing_robots(self):
+		grid = Grid(7, 7)
+		grid.connect_neighbours()
+		pathfinding = Pathfinding(grid)
+		table = ReservationTable(horizon=20)
+		paths = []
+		for robot, (start, destination) in enumerate([(21, 27), (3, 45), (27, 21), (45, 3)]):
+			path = pathfinding.space_time_a_star(start, destination, 0, table, robot)
+			self.assertEqual((path[0], path[-1]), (start, destination))
+			table.reserve(robot, path, 0)
+			paths.append(path)
+		self.assert_no_conflicts(paths)
+
+	def test_parked_destination_is_unreachable(self):
+		grid = Grid(3, 1)
+		grid.connect_neighbours()
+		table = ReservationTable(horizon=4)
+		table.park("other", 2, 0)
+		self.assertEqual(Pathfinding(grid).space_time_a_star(0, 2, 0, table, robot="me"), [])
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+import subprocess
+import sys
+import os
+import random
+import time
+
+sys.path.append(os.getcwd())
+from src.goal import Goal
+from src.grid import Grid
+from src.package import Package
+from src.position import Position
+from src.robot import Robot
+from src.sim import Simulation, SimulationLoop
+
+
+def warehouse(seed=1, size=10, robots=3, packages=12):
+	grid = Grid(size, size)
+	grid.connect_neighbours()
+	rng = random.Random(seed)
+	last = size - 1
+	grid.add_goal(Position(0, 0), Goal(0, Position(0, 0)))
+	grid.add_goal(Position(last, last), Goal(1, Position(last, last)))
+	free = [Position(x, y) for y in range(2, size - 2) for x in range(size)]
+	for i, position in enumerate(rng.sample(free, robots)):
+		grid.add_robot(position, Robot(i, position))
+	for i in range(packages):
+		position = rng.choice(free)
+		grid.add_package(position, Package(i, position))
+	return grid
+
+
+class TestSimulation(unittest.TestCase):
+
+	def test_does_not_import_gui(self):
+		code = "import sys; import src.sim; print('tkinter' in sys.modules or 'src.gui' in sys.modules)"
+		output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=os.getcwd())
+		self.assertEqual(output.stdout.strip(), "False", output.stderr)
+
+	def test_run_delivers_packages(self):
+		for planner in ("independent", "cooperative", "cbs"):
+			with self.subTest(planner=planner):
+				grid = warehouse()
+				summary = Simulation(grid, planner=planner).run(300, seed=7)
+				self.assertEqual(summary["ticks"], 300)
+				self.assertEqual(summary["packages_delivered"], 12)
+				self.assertAlmostEqual(summary["packages_per_tick"], 12 / 300)
+				self.assertGreater(summary["mean_idle_ratio"], 0.0)
+				self.assertLessEqual(summary["mean_idle_ratio"], 1.0)
+				self.assertGreater(summary["ticks_per_second"], 0.0)
+
+	def test_runs_are_reproducible(self):
+		def trace(seed):
+			grid = warehouse(seed)
+			simulation = Simulation(grid, planner="cooperative")
+			summary = simulation.run(150, seed=seed)
+			del summary["ticks_per_second"]
+			return summary, [(robot.id, robot.position.x, robot.position.y) for robot in simulation.grid.robots]
+
+		self.assertEqual(trace(3), trace(3))
+
+	def test_robots_without_work_go_dormant(self):
+		grid = warehouse(packages=2)
+		simulation = Simulation(grid)
+		simulation.run(100, seed=0)
+		self.assertEqual(simulation.delivered_packages(), 2)
+		self.assertEqual(grid.active_robots(), [])
+		self.assertEqual(grid.dormant, set(grid.robots))
+
+		position = Position(5, 5)
+		grid.add_package(position, Package(99, position))
+		self.assertEqual(len(grid.active_robots()), 3)
+		simulation.run(100, seed=0)
+		self.assertEqual(simulation.delivered_packages(), 3)
+		self.assertEqual(grid.active_robots(), [])
+
+	def test_active_robots_in_row_major_order(self):
+		grid = warehouse(robots=5)
+		cells = [grid.cell_id(robot.position) for robot in grid.active_robots()]
+		self.assertEqual(cells, sorted(cells))
+		self.assertIs(grid.robot_at(grid.robots[0].position), grid.robots[0])
+
+	def test_background_loop(self):
+		grid = warehouse()
+		loop = SimulationLoop(Simulation(grid), tick_rate=None)
+		loop.start()
+		time.sleep(0.05)
+		self.assertEqual(loop.simulation.tick, 0)
+
+		loop.play()
+		deadline = time.perf_counter() + 5
+		while loop.simulation.delivered_packages() < 12 and time.perf_counter() < deadline:
+			time.sleep(0.01)
+		self.assertEqual(loop.simulation.delivered_packages(), 12)
+		self.assertGreater(loop.ticks.rate, 0)
+
+		# Holding the lock freezes the grid between two ticks
+		with loop.lock:
+			tick = loop.simulation.tick
+			time.sleep(0.05)
+			self.assertEqual(loop.simulation.tick, tick)
+
+		loop.stop()
+		loop.join(1)
+		self.assertFalse(loop.is_alive())
+
+	def test_unknown_planner(self):
+		with self.assertRaises(ValueError):
+			Simulation(Grid(2, 2), planner="teleport")
+
+
+if __name__ == '__main__':
+	unittest.main()
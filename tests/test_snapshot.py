@@ -0,0 +1,129 @@
+import unittest
+import pickle
+import sys
+import os
+from functools import partial
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+from src.array_grid import ArrayGrid
+from src.goal import Goal
+from src.grid import Grid
+from src.package import Package
+from src.position import Position
+from src.robot import Robot, Status
+from src.sim import Simulation, add_robots, fork_runs
+
+
+def build_grid(grid_cls=Grid, size=12, robots=6, packages=40):
+	grid = grid_cls(size, size)
+	grid.connect_neighbours()
+	for goal_id, (x, y) in enumerate(((0, 0), (size - 1, size - 1))):
+		grid.add_goal(Position(x, y), Goal(goal_id, Position(x, y)))
+	for robot_id in range(robots):
+		position = Position(2 + robot_id, size // 2)
+		grid.add_robot(position, Robot(robot_id, position, max_packages=3))
+	for package_id in range(packages):
+		position = Position((package_id * 7) % size, (package_id * 5 + 1) % size)
+		grid.add_package(position, Package(package_id, position))
+	return grid
+
+
+def state(simulation):
+	grid = simulation.grid
+	robots = [(robot.id, grid.cell_id(robot.position), robot.status, robot.status_changed_tick,
+			   [package.id for package in robot.packages], [grid.cell_id(step) for step in robot.path],
+			   list(robot.legs), robot.get_status_time(Status.ACTIVE, grid.tick), robot in grid.dormant)
+			  for robot in grid.robots]
+	packages = [(package.id, grid.cell_id(package.position), package.reserved_by) for package in grid.packages]
+	goals = [(goal.id, goal.delivered_packages, [package.id for package in goal.packages]) for goal in grid.goals]
+	return simulation.tick, robots, packages, goals
+
+
+class TestSnapshot(unittest.TestCase):
+
+	def test_fork_continues_like_the_original(self):
+		for options in ({}, {"planner": "cooperative"}, {"assignment": "hungarian"}):
+			with self.subTest(**options):
+				simulation = Simulation(build_grid(), **options)
+				# Fork while robots carry packages
+				while not any(robot.packages for robot in simulation.grid.robots):
+					simulation.run(5, seed=0)
+				fork = simulation.fork()
+				self.assertIsInstance(fork.grid, ArrayGrid)
+				self.assertEqual(state(fork), state(simulation))
+
+				simulation.run(30, seed=1)
+				fork.run(30, seed=1)
+				self.assertEqual(state(fork), state(simulation))
+				self.assertTrue(all(leg > 0 for robot in fork.grid.robots for leg in robot.legs))
+
+	def test_restore_rewinds(self):
+		simulation = Simulation(build_grid(ArrayGrid))
+		simulation.run(10, seed=0)
+		snapshot = simulation.snapshot()
+		before = state(simulation)
+		first = simulation.run(20, seed=1)
+		after = state(simulation)
+
+		simulation.restore(snapshot)
+		self.assertEqual(state(simulation), before)
+		second = simulation.run(20, seed=1)
+		self.assertEqual(state(simulation), after)
+		del first["ticks_per_second"], second["ticks_per_second"]
+		self.assertEqual(second, first)
+
+	def test_snapshot_is_compact_and_picklable(self):
+		simulation = Simulation(build_grid(size=50, robots=20, packages=200))
+		simulation.run(10, seed=0)
+		snapshot = simulation.snapshot()
+		self.assertLess(snapshot.nbytes(), 20 * 200 + 200 * 30)
+		copy = pickle.loads(pickle.dumps(snapshot))
+		np.testing.assert_array_equal(copy.packages, snapshot.packages)
+		self.assertEqual(state(simulation.fork(copy)), state(simulation))
+
+	def test_forks_share_the_topology(self):
+		simulation = Simulation(build_grid(ArrayGrid))
+		simulation.run(5, seed=0)
+		fork = simulation.fork()
+		self.assertTrue(np.shares_memory(fork.grid.weights, simulation.grid.weights))
+		self.assertFalse(fork.grid.weights.flags.writeable)
+		goal_cell = simulation.grid.cell_id(Position(0, 0))
+		fork.grid.nearest_goal(Position(5, 5))
+		self.assertIs(fork.grid.goal_fields.fields[goal_cell], simulation.grid.goal_fields.fields[goal_cell])
+
+		# Forks are independent of each other
+		other = simulation.fork()
+		add_robots(other, 3, seed=0)
+		self.assertEqual(len(other.grid.robots), len(fork.grid.robots) + 3)
+		self.assertEqual(len({robot.id for robot in other.grid.robots}), len(other.grid.robots))
+
+	def test_add_robots_follows_the_run_seed(self):
+		def placed(seed):
+			simulation = Simulation(build_grid())
+			simulation.run(5, seed=seed)
+			return [simulation.grid.cell_id(robot.position) for robot in add_robots(simulation, 5)]
+
+		self.assertEqual(placed(3), placed(3))
+		self.assertNotEqual(placed(3), placed(4))
+
+	def test_restore_checks_the_size(self):
+		snapshot = Simulation(build_grid(size=12)).snapshot()
+		with self.assertRaises(ValueError):
+			Simulation(build_grid(size=10)).restore(snapshot)
+
+	def test_fork_runs_in_worker_processes(self):
+		simulation = Simulation(build_grid())
+		simulation.run(10, seed=0)
+		snapshot = simulation.snapshot()
+		expected = simulation.fork(snapshot).run(20, seed=2)
+		results = fork_runs(simulation, [None, partial(add_robots, count=4, seed=0)], 20, snapshot, seed=2,
+							workers=1)
+		self.assertEqual(len(results), 2)
+		self.assertEqual(results[0]["packages_delivered"], expected["packages_delivered"])
+		self.assertEqual(results[0]["mean_idle_ratio"], expected["mean_idle_ratio"])
+
+
+if __name__ == '__main__':
+	unittest.main()
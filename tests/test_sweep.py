@@ -0,0 +1,63 @@
+import unittest
+import csv
+import sys
+import os
+import tempfile
+
+sys.path.append(os.getcwd())
+from src.grid import Grid
+from src.map_generator.generator import generate_grid
+from src.sweep import parameter_grid, run_scenario, sweep
+
+
+class TestSweep(unittest.TestCase):
+
+	def setUp(self):
+		self.directory = tempfile.TemporaryDirectory()
+		self.map_file = os.path.join(self.directory.name, "map.json")
+		generate_grid(self.map_file, width=8, height=8)
+
+	def tearDown(self):
+		self.directory.cleanup()
+
+	def test_generated_map_loads(self):
+		grid = Grid.grid_from_json(self.map_file)
+		self.assertEqual((grid.width, grid.height), (8, 8))
+		self.assertEqual(len(grid.neighbour_ids(0)), 2)
+		self.assertEqual(grid.get_cell(grid.position_of(9)).max_load, 10)
+
+	def test_parameter_grid(self):
+		runs = parameter_grid([self.map_file], robots=[1, 2], seed=[0, 1, 2])
+		self.assertEqual(len(runs), 6)
+		self.assertEqual(runs[0]["planner"], "independent")
+		self.assertEqual({(run["robots"], run["seed"]) for run in runs}, {(r, s) for r in (1, 2) for s in (0, 1, 2)})
+
+	def test_runs_are_reproducible_on_a_reused_grid(self):
+		params = parameter_grid([self.map_file], robots=[3], packages=[10], goals=[2], ticks=[100])[0]
+		first = run_scenario(params)
+		second = run_scenario(params)
+		self.assertEqual(first["error"], "")
+		self.assertEqual(first["packages_delivered"], 10)
+		del first["ticks_per_second"], second["ticks_per_second"]
+		self.assertEqual(first, second)
+
+	def test_sweep_survives_failed_run(self):
+		runs = parameter_grid([self.map_file], robots=[2], packages=[5], goals=[1], ticks=[200],
+							  planner=["independent", "teleport"], seed=[0, 1])
+		output = os.path.join(self.directory.name, "results.csv")
+		failed = sweep(runs, output, workers=2)
+		self.assertEqual(failed, 2)
+
+		with open(output, newline="") as f:
+			rows = list(csv.DictReader(f))
+		self.assertEqual(sorted(int(row["run"]) for row in rows), [0, 1, 2, 3])
+		for row in rows:
+			if row["planner"] == "teleport":
+				self.assertIn("ValueError", row["error"])
+			else:
+				self.assertEqual(row["error"], "")
+				self.assertEqual(row["packages_delivered"], "5")
+
+
+if __name__ == '__main__':
+	unittest.main()
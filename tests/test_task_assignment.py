@@ -0,0 +1,164 @@
+import unittest
+import itertools
+import random
+import sys
+import os
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+from src.goal import Goal
+from src.grid import Grid
+from src.package import Package
+from src.position import Position
+from src.robot import Robot
+from src.sim import Simulation
+from src.task_assignment import TaskAssigner, auction, hungarian
+
+
+def brute_force(cost):
+	n, m = cost.shape
+	if n > m:
+		return brute_force(cost.T)
+	best = (len(cost) + 1, np.inf)
+	for columns in itertools.permutations(range(m), n):
+		values = cost[np.arange(n), columns]
+		finite = np.isfinite(values)
+		# Most assigned pairs first, then the lowest total
+		best = min(best, (-int(finite.sum()), float(values[finite].sum())))
+	return best
+
+
+def solution(cost, rows, columns):
+	return -len(rows), float(cost[rows, columns].sum())
+
+
+class TestSolvers(unittest.TestCase):
+
+	def test_matches_brute_force(self):
+		rng = np.random.default_rng(0)
+		for shape in [(1, 1), (3, 3), (4, 6), (6, 4), (5, 5)]:
+			for _ in range(10):
+				cost = rng.integers(0, 20, size=shape).astype(float)
+				cost[rng.random(shape) < 0.2] = np.inf
+				expected = brute_force(cost)
+				for solver in (hungarian, auction):
+					with self.subTest(shape=shape, solver=solver.__name__):
+						rows, columns = solver(cost)
+						self.assertEqual(len(set(rows.tolist())), len(rows))
+						self.assertEqual(len(set(columns.tolist())), len(columns))
+						self.assertEqual(solution(cost, rows, columns), expected)
+
+	def test_large_square_problems_agree(self):
+		cost = np.random.default_rng(1).integers(0, 1000, size=(120, 120)).astype(float)
+		self.assertEqual(solution(cost, *auction(cost)), solution(cost, *hungarian(cost)))
+
+	def test_empty(self):
+		for solver in (hungarian, auction):
+			rows, columns = solver(np.zeros((0, 3)))
+			self.assertEqual((len(rows), len(columns)), (0, 0))
+
+
+class TestTaskAssigner(unittest.TestCase):
+
+	def corridor(self):
+		# Robots at both ends of a corridor, two packages near the left one: greedy sends both robots to (2, 0)
+		grid = Grid(10, 1)
+		grid.connect_neighbours()
+		grid.add_goal(Position(9, 0), Goal(0, Position(9, 0)))
+		for robot_id, x in enumerate((1, 6)):
+			grid.add_robot(Position(x, 0), Robot(robot_id, Position(x, 0)))
+		for package_id, x in enumerate((2, 0)):
+			grid.add_package(Position(x, 0), Package(package_id, Position(x, 0)))
+		return grid
+
+	def test_assignment_minimizes_total_travel(self):
+		grid = self.corridor()
+		self.assertIs(grid.robots[0].find_nearest_package(grid), grid.robots[1].find_nearest_package(grid))
+
+		assigner = TaskAssigner(grid)
+		assignments = assigner.assign(grid.robots)
+		self.assertEqual({robot_id: package.id for robot_id, package in assignments.items()}, {0: 1, 1: 0})
+		self.assertEqual(assigner.stats["cost"], 5)
+		self.assertEqual(assigner.stats["method"], "hungarian")
+		self.assertEqual(grid.packages[0].reserved_by, 1)
+		self.assertIs(grid.robots[0].find_nearest_package(grid), grid.packages[1])
+		self.assertIs(grid.robots[1].find_nearest_package(grid), grid.packages[0])
+
+	def test_reservations_are_released_on_pickup(self):
+		grid = self.corridor()
+		TaskAssigner(grid, method="auction").assign(grid.robots)
+		package = grid.robots[1].assigned_package
+		grid.robots[0].load(package)
+		self.assertIsNone(package.reserved_by)
+		# The other package is still reserved for robot 0
+		self.assertIsNone(grid.robots[1].find_nearest_package(grid))
+		self.assertIsNone(grid.robots[1].assigned_package)
+		grid.robots[0].release_assignment()
+		self.assertIs(grid.robots[1].find_nearest_package(grid), grid.packages[-1])
+
+	def test_simulation_with_assignment(self):
+		rng = random.Random(2)
+		grid = Grid(10, 10)
+		grid.connect_neighbours()
+		grid.add_goal(Position(0, 0), Goal(0, Position(0, 0)))
+		for robot_id in range(4):
+			position = Position(rng.randrange(10), rng.randrange(2, 10))
+			grid.add_robot(position, Robot(robot_id, position, max_packages=1))
+		for package_id in range(10):
+			position = Position(rng.randrange(10), rng.randrange(2, 10))
+			grid.add_package(position, Package(package_id, position))
+
+		simulation = Simulation(grid, assignment="hungarian")
+		simulation.run(400, seed=0)
+		self.assertEqual(simulation.delivered_packages(), 10)
+
+	def test_package_under_another_robot(self):
+		grid = Grid(5, 1)
+		grid.connect_neighbours()
+		grid.add_goal(Position(4, 0), Goal(0, Position(4, 0)))
+		grid.add_package(Position(2, 0), Package(0, Position(2, 0)))
+		grid.add_robot(Position(0, 0), Robot(0, Position(0, 0)))
+		grid.add_robot(Position(2, 0), Robot(1, Position(2, 0)))
+		robot, package = grid.robots[0], grid.packages[0]
+		# Not assigned to anyone but the robot parked on it
+		self.assertEqual(TaskAssigner(grid).assign([robot]), {})
+		self.assertEqual(TaskAssigner(grid).assign(grid.robots), {1: package})
+
+		# An assignment made before another robot parked on the package is given up
+		grid.robots[1].release_assignment()
+		robot.assigned_package, package.reserved_by = package, robot.id
+		self.assertIsNone(robot.find_nearest_package(grid))
+		self.assertIsNone(robot.assigned_package)
+		self.assertIsNone(package.reserved_by)
+
+	def test_cooperative_planning_with_assignment_completes(self):
+		# Robots parked on packages other robots were assigned used to wait on each other forever
+		for seed in range(12):
+			rng = random.Random(seed)
+			grid = Grid(14, 14)
+			grid.connect_neighbours()
+			free = [Position(x, y) for y in range(14) for x in range(14)]
+			for goal_id, position in enumerate(rng.sample(free, 3)):
+				grid.add_goal(position, Goal(goal_id, position))
+			free = [position for position in free if not grid.get_cell(position).has_goal()]
+			for robot_id, position in enumerate(rng.sample(free, 5)):
+				grid.add_robot(position, Robot(robot_id, position, max_packages=2))
+			for package_id in range(25):
+				position = rng.choice(free)
+				grid.add_package(position, Package(package_id, position))
+
+			simulation = Simulation(grid, planner="cooperative", assignment="hungarian")
+			simulation.start_simulation()
+			while simulation.delivered_packages() < 25 and simulation.tick < 1500:
+				simulation.update_simulation()
+			with self.subTest(seed=seed):
+				self.assertEqual(simulation.delivered_packages(), 25)
+
+	def test_unknown_method(self):
+		with self.assertRaises(ValueError):
+			TaskAssigner(Grid(2, 2), method="lottery")
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,133 @@
+import unittest
+import itertools
+import sys
+import os
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+from src.goal import Goal
+from src.grid import Grid
+from src.package import Package
+from src.position import Position
+from src.robot import Robot
+from src.sim import Simulation
+from src.tour_planning import Tour, TourPlanner, TravelCostCache
+
+
+def corridor(robot_x, package_xs, goal_x, width=12, max_packages=2):
+	grid = Grid(width, 1)
+	grid.connect_neighbours()
+	grid.add_goal(Position(goal_x, 0), Goal(0, Position(goal_x, 0)))
+	grid.add_robot(Position(robot_x, 0), Robot(0, Position(robot_x, 0), max_packages=max_packages))
+	for package_id, x in enumerate(package_xs):
+		grid.add_package(Position(x, 0), Package(package_id, Position(x, 0)))
+	return grid
+
+
+class TestTravelCostCache(unittest.TestCase):
+
+	def test_costs_are_cached_until_topology_changes(self):
+		grid = Grid(5, 5)
+		grid.connect_neighbours()
+		cache = TravelCostCache(grid)
+		costs = cache.matrix([0, 24], [4, 24])
+		np.testing.assert_array_equal(costs, [[4, 8], [4, 0]])
+		self.assertEqual(cache.misses, 4)
+
+		cache.matrix([0], [24])
+		self.assertEqual(cache.hits, 1)
+
+		for y in range(4):
+			grid.get_cell(Position(2, y)).remove_connection(grid.get_cell(Position(3, y)))
+		grid.topology_changed()
+		self.assertEqual(cache.cost(0, 4), 12)
+
+	def test_unreachable_is_inf(self):
+		grid = Grid(3, 1)
+		cache = TravelCostCache(grid)
+		self.assertEqual(cache.cost(0, 2), np.inf)
+
+
+class TestTour(unittest.TestCase):
+
+	def test_local_search_improves_insertion(self):
+		# Pick 4 of 6 points on an open floor, then drive to a goal; compare with every possible tour
+		rng = np.random.default_rng(0)
+		inserted, improved = [], []
+		for _ in range(50):
+			points = rng.integers(0, 20, size=(8, 2))
+			legs = np.abs(points[:7, None, :] - points[None, 1:7, :]).sum(axis=2).astype(float)
+			tour = Tour(legs, np.abs(points[1:7] - points[7]).sum(axis=1).astype(float))
+			route = tour.insert(range(6), 4)
+			best = min(tour.cost(list(candidate)) for candidate in itertools.permutations(range(6), 4))
+			inserted.append(tour.cost(route) / best)
+			route, _ = tour.improve(route, range(6), float("inf"))
+			improved.append(tour.cost(route) / best)
+			self.assertLessEqual(improved[-1], inserted[-1])
+		self.assertLess(np.mean(improved), np.mean(inserted))
+		self.assertLess(np.mean(improved), 1.05)
+
+	def test_fixed_node_stays(self):
+		legs = np.array([[1.0, 50.0], [0.0, 50.0], [50.0, 0.0]])
+		tour = Tour(legs, [0.0, 0.0], fixed=1)
+		route, _ = tour.improve(tour.insert([0, 1], 1), [0, 1], float("inf"))
+		self.assertEqual(route, [1])
+
+
+class TestTourPlanner(unittest.TestCase):
+
+	def test_beats_greedy_zig_zag(self):
+		# Greedy chaining goes to (6, 0) first, then back to (3, 0) and all the way to the goal
+		grid = corridor(5, (6, 3), 11)
+		planner = TourPlanner(grid, compare=True)
+		robot = grid.robots[0]
+		self.assertEqual(robot.find_checkpoints(grid), [Position(6, 0), Position(3, 0), Position(11, 0)])
+
+		checkpoints = planner.plan(robot)
+		self.assertEqual(checkpoints, [Position(3, 0), Position(6, 0), Position(11, 0)])
+		self.assertEqual(planner.stats["cost"], 10)
+		self.assertEqual(planner.stats["greedy_cost"], 12)
+		self.assertAlmostEqual(planner.savings(), 1 / 6)
+
+	def test_respects_capacity_and_assignment(self):
+		grid = corridor(5, (4, 6, 7, 1), 11, max_packages=2)
+		robot = grid.robots[0]
+		robot.assigned_package = grid.packages[3]
+		grid.packages[3].reserved_by = robot.id
+
+		planner = TourPlanner(grid)
+		checkpoints = planner.plan(robot)
+		self.assertEqual(len(checkpoints), 3)
+		self.assertIn(Position(1, 0), checkpoints)
+		self.assertEqual(checkpoints[-1], Position(11, 0))
+		reserved = [package for package in grid.packages if package.reserved_by == robot.id]
+		self.assertCountEqual([package.position for package in reserved], checkpoints[:2])
+
+		# Replanning drops the old tour's reservations but keeps the assigned package
+		robot.max_packages = 1
+		planner.plan(robot)
+		self.assertEqual([package for package in grid.packages if package.reserved_by == robot.id], [grid.packages[3]])
+
+	def test_nothing_to_pick_up(self):
+		grid = corridor(5, (), 11)
+		self.assertEqual(TourPlanner(grid).plan(grid.robots[0]), [])
+
+	def test_simulation_with_tours(self):
+		grid = Grid(10, 10)
+		grid.connect_neighbours()
+		grid.add_goal(Position(0, 0), Goal(0, Position(0, 0)))
+		for robot_id, x in enumerate((2, 5, 8)):
+			grid.add_robot(Position(x, 9), Robot(robot_id, Position(x, 9), max_packages=3))
+		for package_id in range(12):
+			position = Position((package_id * 7) % 10, 2 + (package_id * 3) % 8)
+			grid.add_package(position, Package(package_id, position))
+
+		simulation = Simulation(grid, tour_budget=0.01)
+		simulation.run(300, seed=0)
+		self.assertEqual(simulation.delivered_packages(), 12)
+		self.assertGreater(simulation.tour_planner.totals["tours"], 0)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+import sys
+import os
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+from src.array_grid import ArrayGrid
+from src.grid import Grid
+from src.map_format import grid_from_map_data, load_map, write_map
+from src.map_generator.warehouse import DOWN, UP, generate_warehouse
+from src.pathfinding import Pathfinding
+from src.sim import Simulation
+
+
+class TestWarehouseLayout(unittest.TestCase):
+
+	def test_layout_is_seeded(self):
+		first, second = generate_warehouse(40, 30, seed=3, robots=10), generate_warehouse(40, 30, seed=3, robots=10)
+		for name in ("weights", "shelves", "robots", "goals", "packages"):
+			np.testing.assert_array_equal(getattr(first, name), getattr(second, name))
+		self.assertFalse(np.array_equal(first.packages, generate_warehouse(40, 30, seed=4, robots=10).packages))
+
+	def test_every_open_cell_reaches_every_other(self):
+		for one_way in (True, False):
+			with self.subTest(one_way=one_way):
+				layout = generate_warehouse(47, 53, aisle_width=2, block_length=7, one_way=one_way, robots=10)
+				pathfinding = Pathfinding(grid_from_map_data(layout))
+				open_cells = np.isfinite(layout.weights).any(axis=0)
+				origin = int(layout.stations[0])
+				self.assertTrue(np.isfinite(pathfinding.distance_field([origin])[open_cells]).all())
+				self.assertTrue(np.isfinite(pathfinding.distance_field([origin], reverse=True)[open_cells]).all())
+
+	def test_lanes_are_one_way(self):
+		for one_way in (True, False):
+			layout = generate_warehouse(30, 30, robots=5, one_way=one_way)
+			up, down = layout.weights[UP].reshape(30, 30), layout.weights[DOWN].reshape(30, 30)
+			lanes = layout.lanes.reshape(30, 30)
+			for x in np.flatnonzero(lanes.any(axis=0)):
+				column = np.flatnonzero(lanes[:, x])
+				y = column[len(column) // 2]
+				directions = int(np.isfinite(up[y, x])) + int(np.isfinite(down[y, x]))
+				self.assertEqual(directions, 1 if one_way else 2)
+			# Cross-aisles are two-way
+			self.assertTrue(np.isfinite(up[23, 1:-1]).all() and np.isfinite(down[22, 1:-1]).all())
+
+	def test_entities(self):
+		layout = generate_warehouse(60, 40, stations=6, robots=12, charging_bays=20, packages_per_robot=5)
+		self.assertEqual((len(layout.goals), len(layout.robots), len(layout.bays), len(layout.packages)),
+						 (6, 12, 20, 60))
+		self.assertTrue((layout.stations // 60 == 39).all())
+		self.assertTrue((layout.bays // 60 == 0).all())
+		self.assertTrue(np.isin(layout.robots["cell"], layout.bays).all())
+		self.assertTrue(layout.faces[layout.packages["cell"]].all())
+		self.assertFalse(np.isfinite(layout.weights[:, layout.shelves]).any())
+		self.assertLessEqual(np.bincount(layout.packages["cell"]).max(), 10)
+
+	def test_invalid_layouts(self):
+		with self.assertRaises(ValueError):
+			generate_warehouse(2, 10)
+		with self.assertRaises(ValueError):
+			generate_warehouse(10, 10, robots=20)
+		with self.assertRaises(ValueError):
+			generate_warehouse(10, 10, robots=5, charging_bays=3)
+
+	def test_emits_grids_and_map_files(self):
+		layout = generate_warehouse(40, 40, robots=8)
+		grid = grid_from_map_data(layout)
+		self.assertIs(grid.weights, layout.weights)
+		self.assertEqual(len(grid.packages), len(layout.packages))
+		with tempfile.TemporaryDirectory() as directory:
+			path = os.path.join(directory, "warehouse.map")
+			write_map(layout, path)
+			loaded = load_map(path, Grid)
+		self.assertEqual(sorted(loaded.edge_arrays()[0].tolist()), sorted(grid.edge_arrays()[0].tolist()))
+
+		summary = Simulation(grid).run(150, seed=0)
+		self.assertGreater(summary["packages_delivered"], 0)
+
+	def test_generates_a_million_cells_quickly(self):
+		layout = generate_warehouse(1000, 1000, robots=500)
+		self.assertEqual(layout.weights.shape, (4, 1000 * 1000))
+		self.assertIsInstance(grid_from_map_data(layout), ArrayGrid)
+
+
+if __name__ == '__main__':
+	unittest.main()